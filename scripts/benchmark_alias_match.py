@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark alias-on-title matching: LIKE scan vs the FTS5 trigram index.
+
+Builds a synthetic amazon_listings_daily table in a scratch SQLite database,
+then times `title LIKE '%alias%' OR brand = alias` lookups both as a plain
+LIKE scan and through query_helper.convert_like_any (FTS5 MATCH).
+
+Usage:
+    python scripts/benchmark_alias_match.py --rows 10000000 --aliases 50
+
+On Postgres, compare EXPLAIN ANALYZE of the same predicate before and after
+sql/004_title_trgm_index.sql.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+os.environ["USE_SQLITE"] = "true"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from setup_sqlite import create_listing_title_fts
+from src.utils.query_helper import convert_like_any, convert_any_clause
+
+VOCABULARY_SIZE = 2000
+WORDS_PER_TITLE = 8
+INSERT_BATCH_SIZE = 100000
+
+
+def _word(i: int) -> str:
+    """Deterministic pseudo-word for vocabulary index i."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    word = ""
+    i += 26 * 26
+    while i:
+        i, r = divmod(i, 26)
+        word += letters[r]
+    return word
+
+
+def build_listings(conn: sqlite3.Connection, rows: int, seed: int) -> None:
+    """Create and fill a synthetic amazon_listings_daily table."""
+    rng = random.Random(seed)
+    vocabulary = [_word(i) for i in range(VOCABULARY_SIZE)]
+    
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE amazon_listings_daily (
+            dt DATE NOT NULL,
+            asin TEXT NOT NULL,
+            title TEXT,
+            brand TEXT,
+            PRIMARY KEY (dt, asin)
+        )
+    """)
+    cur.execute("CREATE INDEX idx_amazon_listings_brand ON amazon_listings_daily(brand)")
+    create_listing_title_fts(cur)
+    
+    for start in range(0, rows, INSERT_BATCH_SIZE):
+        batch = []
+        for i in range(start, min(start + INSERT_BATCH_SIZE, rows)):
+            title = " ".join(rng.choices(vocabulary, k=WORDS_PER_TITLE)).title()
+            batch.append(("2025-01-06", f"B{i:09d}", title, rng.choice(vocabulary)))
+        cur.executemany(
+            "INSERT INTO amazon_listings_daily (dt, asin, title, brand) VALUES (?, ?, ?, ?)",
+            batch
+        )
+    conn.commit()
+
+
+def time_queries(conn: sqlite3.Connection, aliases: list, use_index: bool) -> tuple:
+    """Run one alias match per alias and return (seconds, total matches)."""
+    total = 0
+    start = time.perf_counter()
+    for alias in aliases:
+        pattern = f"%{alias}%"
+        if use_index:
+            title_clause, title_params = convert_like_any("a.title", [pattern])
+        else:
+            title_clause, title_params = "a.title LIKE ?", (pattern,)
+        brand_clause, brand_params = convert_any_clause("a.brand", [alias])
+        query = f"""
+            SELECT COUNT(DISTINCT a.asin)
+            FROM amazon_listings_daily a
+            WHERE {title_clause} OR {brand_clause}
+        """
+        total += conn.execute(query, title_params + brand_params).fetchone()[0]
+    return time.perf_counter() - start, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark alias title matching")
+    parser.add_argument("--rows", type=int, default=10000000, help="Synthetic listing rows")
+    parser.add_argument("--aliases", type=int, default=50, help="Aliases to match")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--db", type=str, help="Scratch database path (default: temp file)")
+    
+    args = parser.parse_args()
+    
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "alias_bench.db")
+    conn = sqlite3.connect(db_path)
+    
+    start = time.perf_counter()
+    build_listings(conn, args.rows, args.seed)
+    print(f"Loaded {args.rows:,} listings in {time.perf_counter() - start:.1f}s ({db_path})")
+    
+    rng = random.Random(args.seed + 1)
+    vocabulary = [_word(i) for i in range(VOCABULARY_SIZE)]
+    aliases = [" ".join(rng.sample(vocabulary, 2)) for _ in range(args.aliases // 2)]
+    aliases += rng.sample(vocabulary, args.aliases - len(aliases))
+    
+    scan_seconds, scan_matches = time_queries(conn, aliases, use_index=False)
+    index_seconds, index_matches = time_queries(conn, aliases, use_index=True)
+    
+    print(f"LIKE scan:    {scan_seconds:8.3f}s  ({scan_seconds / len(aliases) * 1000:.1f} ms/alias, {scan_matches:,} matches)")
+    print(f"FTS5 trigram: {index_seconds:8.3f}s  ({index_seconds / len(aliases) * 1000:.1f} ms/alias, {index_matches:,} matches)")
+    if index_seconds > 0:
+        print(f"Speedup:      {scan_seconds / index_seconds:.1f}x")
+    if scan_matches != index_matches:
+        print("WARNING: match counts differ")
+        sys.exit(1)
+    
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
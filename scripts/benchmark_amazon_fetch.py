@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark Amazon listing fetches: sequential requests vs the async fetch engine.
+
+Starts a local stub HTTP server that serves a canned product page for every
+/dp/<asin> after a fixed latency (optionally failing a share of requests
+with 503 to exercise retries), then times
+  - fetch_amazon_listing_page per ASIN (one blocking request at a time,
+    RATE_LIMIT_DELAY sleep before each), and
+  - fetch_listing_pages (asyncio, N requests in flight, token bucket per host,
+    pages parsed in a process pool; compare --parse_workers counts).
+Nothing is written to the database.
+
+Usage:
+    python scripts/benchmark_amazon_fetch.py --pages 200 --latency 0.2 --concurrency 16 --rate 50 --parse_workers 0 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ingest import amazon_job
+from src.ingest.amazon_job import fetch_amazon_listing_page, fetch_listing_pages
+
+CANNED_PAGE = """<!DOCTYPE html>
+<html><head><title>Amazon.com: Stub Product</title></head>
+<body>
+<a id="brand">StubBrand</a>
+<span id="productTitle"> Stub Product {asin} - Stainless Steel, 12 oz </span>
+<span class="a-price-whole">24.99</span>
+<span id="acrPopover"><span class="a-icon-alt">4.5 out of 5 stars</span></span>
+<span id="acrCustomerReviewText">1,234 ratings</span>
+<div id="detailBullets"><span>Best Sellers Rank</span><span>#5,678 in Home &amp; Kitchen</span></div>
+<img id="landingImage" src="stub.jpg">
+{padding}
+</body></html>
+"""
+
+
+def make_handler(latency: float, failure_rate: float, page_size: int):
+    """Stub handler: canned page per ASIN after `latency` seconds, 503 for failure_rate of requests."""
+    padding = "<p>" + "x" * max(0, page_size - len(CANNED_PAGE)) + "</p>"
+    rng = random.Random(0)
+    lock = threading.Lock()
+    
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse connections
+        
+        def do_GET(self):
+            time.sleep(latency)
+            with lock:
+                failed = rng.random() < failure_rate
+            if failed:
+                body = b"Service Unavailable"
+                self.send_response(503)
+            else:
+                asin = self.path.rstrip("/").rsplit("/", 1)[-1]
+                body = CANNED_PAGE.format(asin=asin, padding=padding).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return StubHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_stub_server(latency: float, failure_rate: float, page_size: int) -> ThreadingHTTPServer:
+    """Serve the stub on a free localhost port in a background thread."""
+    server = StubServer(("127.0.0.1", 0), make_handler(latency, failure_rate, page_size))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_sequential(asins, url_template):
+    """Baseline: one blocking request at a time."""
+    return sum(1 for asin in asins if fetch_amazon_listing_page(asin, url_template=url_template))
+
+
+async def run_async(asins, url_template, concurrency, rate, parse_workers):
+    """Async engine: concurrent requests, rate limited per host, parsed in a process pool."""
+    fetched = 0
+    async for _, raw_data in fetch_listing_pages(asins, concurrency, rate, url_template=url_template,
+                                                 parse_workers=parse_workers):
+        fetched += raw_data is not None
+    return fetched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs async Amazon page fetching")
+    parser.add_argument("--pages", type=int, default=200, help="Pages to fetch")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub server latency per request (seconds)")
+    parser.add_argument("--page_size", type=int, default=200000, help="Approximate page size (bytes)")
+    parser.add_argument("--failure_rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--concurrency", type=int, default=16, help="Async requests in flight")
+    parser.add_argument("--rate", type=float, default=50, help="Async rate limit (requests/second)")
+    parser.add_argument("--parse_workers", type=int, nargs="+", default=[0, os.cpu_count() or 1],
+                        help="Parser process counts to compare (0 parses in the event loop)")
+    parser.add_argument("--sequential_pages", type=int, default=20,
+                        help="Pages for the (slow) sequential baseline; 0 skips it")
+    args = parser.parse_args()
+    
+    amazon_job.RETRY_DELAY = 0.05  # keep retry waits from dominating the stub benchmark
+    server = start_stub_server(args.latency, args.failure_rate, args.page_size)
+    url_template = f"http://127.0.0.1:{server.server_address[1]}/dp/{{asin}}"
+    asins = [f"B{i:09d}" for i in range(args.pages)]
+    
+    if args.sequential_pages:
+        start = time.perf_counter()
+        fetched = run_sequential(asins[:args.sequential_pages], url_template)
+        elapsed = time.perf_counter() - start
+        print(f"sequential: {fetched}/{args.sequential_pages} pages in {elapsed:.2f}s "
+              f"({fetched / elapsed:.1f} pages/s)")
+    
+    for parse_workers in args.parse_workers:
+        start = time.perf_counter()
+        fetched = asyncio.run(run_async(asins, url_template, args.concurrency, args.rate, parse_workers))
+        elapsed = time.perf_counter() - start
+        print(f"async (concurrency={args.concurrency}, rate={args.rate}/s, parse_workers={parse_workers}): "
+              f"{fetched}/{args.pages} pages in {elapsed:.2f}s ({fetched / elapsed:.1f} pages/s)")
+    
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
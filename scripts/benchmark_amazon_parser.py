@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Amazon page parser backends (bs4 vs lxml).
+
+Pads the full_listing fixture with irrelevant markup (nested divs, inline
+scripts and styles, as on real product pages) to about --page_size bytes,
+checks that every backend extracts the same listing, and reports the time
+per page of each backend.
+
+Usage:
+    python scripts/benchmark_amazon_parser.py --page_size 1500000 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ingest.amazon_parser import PARSER_BACKENDS, get_listing_parser
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "tests", "fixtures", "amazon", "full_listing.html")
+
+FILLER = """<div class="a-section a-spacing-small"><div class="a-row"><span class="a-size-base">
+Customers also viewed item {i}</span><a class="a-link-normal" href="/dp/X{i:09d}">Related {i}</a></div>
+<script type="text/javascript">P.when('A').execute(function(A) {{ var x{i} = {{"id": {i}}}; }});</script>
+<style>.c{i} {{ margin: 0 }}</style></div>
+"""
+
+
+def padded_page(page_size: int) -> bytes:
+    """The fixture page with filler inserted before </body> up to page_size bytes."""
+    with open(FIXTURE, "rb") as f:
+        html = f.read().decode("utf-8")
+    filler = []
+    size = len(html)
+    i = 0
+    while size < page_size:
+        block = FILLER.format(i=i)
+        filler.append(block)
+        size += len(block)
+        i += 1
+    head, tail = html.rsplit("</body>", 1)
+    return (head + "".join(filler) + "</body>" + tail).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Amazon page parser backends")
+    parser.add_argument("--page_size", type=int, default=1500000, help="Approximate page size (bytes)")
+    parser.add_argument("--repeat", type=int, default=10, help="Parses per backend")
+    args = parser.parse_args()
+    
+    html = padded_page(args.page_size)
+    print(f"page: {len(html) / 1e6:.2f} MB")
+    
+    listings = {}
+    for name in PARSER_BACKENDS:
+        try:
+            parse = get_listing_parser(name)
+        except ImportError as e:
+            print(f"{name}: skipped ({e})")
+            continue
+        
+        listings[name] = parse("B0BENCH000", html)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            parse("B0BENCH000", html)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{name}: {elapsed * 1000:.1f} ms/page ({1 / elapsed:.1f} pages/s)")
+    
+    if len({repr(sorted(listing.items())) for listing in listings.values()}) > 1:
+        print("WARNING: backends extracted different listings:")
+        for name, listing in listings.items():
+            print(f"  {name}: {listing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
 VENV_PATH="${VENV_PATH:-$PROJECT_DIR/venv}"
 LOG_DIR="${LOG_DIR:-/var/log/winner-engine}"
+FEATURE_WORKERS="${FEATURE_WORKERS:-1}"
 DATE=$(date +%Y-%m-%d)
 
 # Calculate week start (Monday)
@@ -63,6 +64,7 @@ log ""
 log "Step 2: Building features..."
 python -m src.features.build_features \
     --week_start "$WEEK_START" \
+    --workers "$FEATURE_WORKERS" \
     >> "$LOG_FILE" 2>&1 || {
     log "ERROR: Feature building failed"
     exit 1
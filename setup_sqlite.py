@@ -10,6 +10,67 @@ from pathlib import Path
 
 DB_PATH = "winner_engine.db"
 
+
+def create_listing_title_fts(cur):
+    """
+    Create the FTS5 trigram shadow table over amazon_listings_daily.title.
+    
+    query_helper.convert_like_any turns `title LIKE '%alias%'` matches into a
+    MATCH on this table. Triggers keep it in sync with the listings table.
+    """
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS amazon_listings_fts USING fts5(
+            title,
+            content='amazon_listings_daily',
+            content_rowid='rowid',
+            tokenize='trigram'
+        )
+    """)
+    
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS amazon_listings_fts_insert AFTER INSERT ON amazon_listings_daily BEGIN
+            INSERT INTO amazon_listings_fts(rowid, title) VALUES (new.rowid, new.title);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS amazon_listings_fts_delete AFTER DELETE ON amazon_listings_daily BEGIN
+            INSERT INTO amazon_listings_fts(amazon_listings_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS amazon_listings_fts_update AFTER UPDATE OF title ON amazon_listings_daily BEGIN
+            INSERT INTO amazon_listings_fts(amazon_listings_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+            INSERT INTO amazon_listings_fts(rowid, title) VALUES (new.rowid, new.title);
+        END
+    """)
+    
+    # Index any listings loaded before the shadow table existed
+    cur.execute("INSERT INTO amazon_listings_fts(amazon_listings_fts) VALUES ('rebuild')")
+
+
+def add_column_if_missing(cur, table, column, column_type):
+    """Add a column to a table created by an older version of this script."""
+    columns = [row[1] for row in cur.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+
+def backfill_asin_map_dates(cur):
+    """Set the matched date range of entity_asin_map rows created before it was recorded."""
+    for column, aggregate in (("first_matched_dt", "MIN"), ("last_matched_dt", "MAX")):
+        cur.execute(f"""
+            UPDATE entity_asin_map SET {column} = (
+                SELECT {aggregate}(a.dt)
+                FROM entity_aliases ea
+                JOIN amazon_listings_daily a
+                    ON a.title LIKE ('%' || ea.alias_text || '%') OR a.brand = ea.alias_text
+                WHERE ea.source = 'amazon' AND ea.entity_id = entity_asin_map.entity_id
+                    AND a.asin = entity_asin_map.asin
+            )
+            WHERE {column} IS NULL
+        """)
+
+
 def create_sqlite_schema():
     """Create SQLite schema equivalent to Postgres schema."""
     conn = sqlite3.connect(DB_PATH)
@@ -18,6 +79,10 @@ def create_sqlite_schema():
     # Enable foreign keys
     cur.execute("PRAGMA foreign_keys = ON")
     
+    # Write-ahead log (persistent): worker processes keep reading while the
+    # parent writes (e.g. build_labels --backfill --workers)
+    cur.execute("PRAGMA journal_mode = WAL")
+    
     # Entities table
     cur.execute("""
         CREATE TABLE IF NOT EXISTS entities (
@@ -67,6 +132,36 @@ def create_sqlite_schema():
         )
     """)
     
+    # Amazon reviews
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS amazon_reviews_daily (
+            dt DATE NOT NULL,
+            asin TEXT NOT NULL,
+            review_id TEXT NOT NULL,
+            review_date DATE,
+            rating INTEGER CHECK (rating >= 1 AND rating <= 5),
+            review_text TEXT,
+            PRIMARY KEY (dt, asin, review_id)
+        )
+    """)
+    
+    # Alias -> ASIN match table (maintained by src/utils/entity_resolution.py)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS entity_asin_map (
+            entity_id TEXT NOT NULL,
+            asin TEXT NOT NULL,
+            matched_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            first_matched_dt DATE,
+            last_matched_dt DATE,
+            PRIMARY KEY (entity_id, asin),
+            FOREIGN KEY (entity_id) REFERENCES entities(entity_id)
+        )
+    """)
+    
+    add_column_if_missing(cur, "entity_asin_map", "first_matched_dt", "DATE")
+    add_column_if_missing(cur, "entity_asin_map", "last_matched_dt", "DATE")
+    backfill_asin_map_dates(cur)
+    
     # TikTok metrics
     cur.execute("""
         CREATE TABLE IF NOT EXISTS tiktok_metrics_daily (
@@ -90,12 +185,17 @@ def create_sqlite_schema():
             entity_id TEXT NOT NULL,
             features TEXT NOT NULL,
             feature_version TEXT NOT NULL,
+            input_watermarks TEXT,
             created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            computed_at TIMESTAMP,
             PRIMARY KEY (week_start, entity_id, feature_version),
             FOREIGN KEY (entity_id) REFERENCES entities(entity_id)
         )
     """)
     
+    add_column_if_missing(cur, "entity_weekly_features", "input_watermarks", "TEXT")
+    add_column_if_missing(cur, "entity_weekly_features", "computed_at", "TIMESTAMP")
+    
     # Weekly labels
     cur.execute("""
         CREATE TABLE IF NOT EXISTS entity_weekly_labels (
@@ -112,6 +212,30 @@ def create_sqlite_schema():
         )
     """)
     
+    # Finished weeks of label backfills (see src/transform/build_labels.py)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS label_backfill_checkpoints (
+            week_start DATE PRIMARY KEY,
+            horizon_weeks INTEGER NOT NULL,
+            completed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Validators of the last fetch per source key (conditional fetches)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS fetch_validators (
+            source TEXT NOT NULL,
+            fetch_key TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            record_hash TEXT,
+            changed_dt DATE,
+            checked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, fetch_key)
+        )
+    """)
+    
     # Weekly scores
     cur.execute("""
         CREATE TABLE IF NOT EXISTS entity_weekly_scores (
@@ -153,11 +277,17 @@ def create_sqlite_schema():
     cur.execute("CREATE INDEX IF NOT EXISTS idx_entities_type ON entities(entity_type)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_entity_aliases_entity ON entity_aliases(entity_id)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_amazon_listings_asin ON amazon_listings_daily(asin, dt)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_amazon_listings_brand ON amazon_listings_daily(brand)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_amazon_reviews_asin ON amazon_reviews_daily(asin, dt)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_entity_asin_map_asin ON entity_asin_map(asin)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_tiktok_metrics_query ON tiktok_metrics_daily(query, query_type, dt)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_entity_features_entity ON entity_weekly_features(entity_id, week_start)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_entity_labels_entity ON entity_weekly_labels(entity_id, week_start)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_entity_scores_entity ON entity_weekly_scores(entity_id, week_start)")
     
+    # Text index for alias-on-title matching
+    create_listing_title_fts(cur)
+    
     conn.commit()
     conn.close()
     print(f"✅ SQLite database created: {DB_PATH}")
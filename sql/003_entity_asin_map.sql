@@ -0,0 +1,28 @@
+-- Winner Engine Database Schema
+-- Postgres migration: 003_entity_asin_map.sql
+--
+-- Materialized alias -> ASIN match table. Feature and label queries join
+-- amazon_listings_daily through this table with indexed equality lookups
+-- instead of `title ILIKE ANY(%alias%) OR brand = ANY(...)` scans.
+--
+-- Maintained incrementally by src/utils/entity_resolution.py:
+--   - create_entity_alias()       maps existing listings to a new Amazon alias
+--   - map_listing_to_entities()   maps a newly ingested listing to existing aliases
+
+CREATE TABLE entity_asin_map (
+    entity_id UUID NOT NULL REFERENCES entities(entity_id) ON DELETE CASCADE,
+    asin TEXT NOT NULL,
+    matched_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (entity_id, asin)
+);
+
+CREATE INDEX idx_entity_asin_map_asin ON entity_asin_map(asin);
+
+-- Initial backfill from existing aliases and listings
+INSERT INTO entity_asin_map (entity_id, asin)
+SELECT DISTINCT ea.entity_id, a.asin
+FROM entity_aliases ea
+JOIN amazon_listings_daily a
+    ON a.title ILIKE ('%' || ea.alias_text || '%') OR a.brand = ea.alias_text
+WHERE ea.source = 'amazon'
+ON CONFLICT (entity_id, asin) DO NOTHING;
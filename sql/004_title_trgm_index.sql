@@ -0,0 +1,14 @@
+-- Winner Engine Database Schema
+-- Postgres migration: 004_title_trgm_index.sql
+--
+-- Text-search indexes for ad-hoc alias matching on listing titles
+-- (aliases added from the web UI before entity_asin_map catches up).
+-- pg_trgm lets `title ILIKE '%alias%'` and `title ILIKE ANY(...)` use a
+-- bitmap index scan instead of scanning the whole partition; the brand
+-- index lets the `OR brand = ANY(...)` half of alias matches join the
+-- same BitmapOr.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX idx_amazon_listings_title_trgm ON amazon_listings_daily USING GIN (title gin_trgm_ops);
+CREATE INDEX idx_amazon_listings_brand ON amazon_listings_daily(brand);
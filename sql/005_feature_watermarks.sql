@@ -0,0 +1,9 @@
+-- Winner Engine Database Schema
+-- Postgres migration: 005_feature_watermarks.sql
+--
+-- Per-entity input watermarks recorded alongside each feature row by
+-- src/features/build_features.py. `build_features --incremental` compares
+-- them with the current source data and only recomputes entities whose
+-- inputs changed. Format: see src/features/watermarks.py.
+
+ALTER TABLE entity_weekly_features ADD COLUMN input_watermarks JSONB;
@@ -0,0 +1,13 @@
+-- Winner Engine Database Schema
+-- Postgres migration: 006_label_backfill_checkpoints.sql
+--
+-- Weeks finished by `build_labels --backfill`, with the longest horizon they
+-- were labeled for. A backfill skips weeks recorded here for at least its
+-- horizon, so a crashed run resumes where it stopped (`--restart` ignores it).
+-- Maintained by src/transform/build_labels.py.
+
+CREATE TABLE label_backfill_checkpoints (
+    week_start DATE PRIMARY KEY,
+    horizon_weeks INTEGER NOT NULL,
+    completed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,21 @@
+-- Winner Engine Database Schema
+-- Postgres migration: 008_fetch_validators.sql
+--
+-- Per-URL validators from the last successful fetch of each source key
+-- (ASIN, store domain): HTTP ETag / Last-Modified sent back as conditional
+-- request headers, plus hashes of the body and of the parsed record.
+-- Ingestion skips parsing and writing when a page is unchanged and carries
+-- the previous daily row forward instead.
+-- Maintained by src/ingest/change_detection.py.
+
+CREATE TABLE fetch_validators (
+    source TEXT NOT NULL,
+    fetch_key TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    record_hash TEXT,
+    changed_dt DATE,
+    checked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, fetch_key)
+);
@@ -0,0 +1,27 @@
+-- Winner Engine Database Schema
+-- Postgres migration: 009_entity_asin_map_dates.sql
+--
+-- Date range of each alias -> ASIN match: the first and last listing dt whose
+-- title or brand matched the alias. ENTITY_LISTINGS_JOIN
+-- (src/features/listing_context.py) only joins listing rows inside the range,
+-- so a listing retitled into an entity is not counted for the weeks before
+-- it matched (no future information in backfilled features and labels), and
+-- one retitled away stops counting after its last match.
+--
+-- Maintained by src/utils/entity_resolution.py (ranges only widen).
+
+ALTER TABLE entity_asin_map ADD COLUMN first_matched_dt DATE;
+ALTER TABLE entity_asin_map ADD COLUMN last_matched_dt DATE;
+
+-- Backfill from existing aliases and listings
+UPDATE entity_asin_map em
+SET first_matched_dt = m.first_matched_dt, last_matched_dt = m.last_matched_dt
+FROM (
+    SELECT ea.entity_id, a.asin, MIN(a.dt) AS first_matched_dt, MAX(a.dt) AS last_matched_dt
+    FROM entity_aliases ea
+    JOIN amazon_listings_daily a
+        ON a.title ILIKE ('%' || ea.alias_text || '%') OR a.brand = ea.alias_text
+    WHERE ea.source = 'amazon'
+    GROUP BY ea.entity_id, a.asin
+) m
+WHERE em.entity_id = m.entity_id AND em.asin = m.asin;
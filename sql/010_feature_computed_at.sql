@@ -0,0 +1,9 @@
+-- Winner Engine Database Schema
+-- Postgres migration: 010_feature_computed_at.sql
+--
+-- When each feature row was last written (created_at keeps the first insert).
+-- stored_features_stamp (src/features/feature_matrix.py) fingerprints a
+-- week's features as COUNT(*) and MAX(computed_at), so feature matrix caches
+-- and the scoring service can tell a rebuilt week without reading its rows.
+
+ALTER TABLE entity_weekly_features ADD COLUMN computed_at TIMESTAMP;
@@ -0,0 +1,311 @@
+"""
+Sliding-window feature backfill over a range of weeks.
+Instead of rebuilding each week's 28-day TikTok and 4-week Amazon windows from
+scratch, streams each source once in date order and slides per-entity windows
+forward a week at a time: rows entering the window are added, rows older than
+28 days are evicted, and rolling 7/14/28-day TikTok view sums are kept up to
+date incrementally. Each week's features come from the same pure feature
+functions as the weekly build, via a ListingContext built from the windows.
+"""
+import bisect
+import heapq
+import logging
+from collections import defaultdict, deque
+from datetime import date, timedelta
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+from src.features.listing_context import ListingContext, TOP_N_LISTINGS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 28
+TIKTOK_SUM_HORIZONS = (7, 14, 28)
+
+
+class RollingSum:
+    """Running sum of values dated within `horizon_days` of the current week start."""
+    
+    def __init__(self, horizon_days: int):
+        self.horizon_days = horizon_days
+        self.items = deque()
+        self.total = 0
+    
+    def add(self, dt: date, value) -> None:
+        """Add a value; values must arrive in date order."""
+        self.items.append((dt, value))
+        self.total += value
+    
+    def advance(self, week_start: date) -> None:
+        """Evict values more than horizon_days before week_start."""
+        cutoff = week_start - timedelta(days=self.horizon_days)
+        while self.items and self.items[0][0] < cutoff:
+            self.total -= self.items.popleft()[1]
+
+
+class EntityWindow:
+    """One entity's sliding 28-day view of its TikTok and Amazon listing rows."""
+    
+    def __init__(self):
+        self.tiktok_rows = deque()
+        self.tiktok_sums = [RollingSum(days) for days in TIKTOK_SUM_HORIZONS]
+        self.listings_by_day = defaultdict(list)
+    
+    def add_tiktok(self, dt: date, row: Dict[str, Any]) -> None:
+        self.tiktok_rows.append((dt, row))
+        for rolling in self.tiktok_sums:
+            rolling.add(dt, row['views'] or 0)
+    
+    def add_listing(self, dt: date, row: Dict[str, Any]) -> None:
+        self.listings_by_day[dt].append(row)
+    
+    def advance(self, week_start: date) -> None:
+        """Evict rows older than the 28-day window ending at week_start."""
+        cutoff = week_start - timedelta(days=WINDOW_DAYS)
+        while self.tiktok_rows and self.tiktok_rows[0][0] < cutoff:
+            self.tiktok_rows.popleft()
+        for rolling in self.tiktok_sums:
+            rolling.advance(week_start)
+        for dt in [dt for dt in self.listings_by_day if dt < cutoff]:
+            del self.listings_by_day[dt]
+    
+    def context(self, entity_id: str, week_start: date, reviews: "ReviewIndex") -> ListingContext:
+        """Build the entity's ListingContext for week_start from the current window."""
+        four_weeks_ago = week_start - timedelta(weeks=4)
+        
+        # Same order as load_tiktok_rows: dt DESC, query
+        tiktok_rows = sorted(
+            (row for _, row in self.tiktok_rows),
+            key=lambda row: row['query']
+        )
+        tiktok_rows.sort(key=lambda row: row['_dt'], reverse=True)
+        
+        # Same selection as load_amazon_demand_rows: top 10 by bsr NULLS LAST, dt DESC, asin
+        prior_rows = [
+            row for dt, rows in self.listings_by_day.items() if dt < week_start
+            for row in rows
+        ]
+        demand_rows = heapq.nsmallest(TOP_N_LISTINGS, prior_rows, key=_demand_order)
+        
+        context = ListingContext(
+            entity_id=entity_id,
+            week_start=week_start,
+            tiktok_rows=tiktok_rows,
+            demand_rows=demand_rows,
+            current_listings=list(self.listings_by_day.get(week_start, [])),
+            old_listings=list(self.listings_by_day.get(four_weeks_ago, [])),
+            tiktok_view_sums=tuple(rolling.total for rolling in self.tiktok_sums),
+        )
+        context.reviews_by_asin = {
+            row['asin']: [
+                review for review in reviews.since(row['asin'], four_weeks_ago)
+                if review['review_text'] is not None
+            ]
+            for row in context.top_listings()
+        }
+        return context
+
+
+class ReviewIndex:
+    """Reviews per ASIN in date order, for `dt >= cutoff` lookups."""
+    
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.by_asin = defaultdict(list)
+        for row in rows:
+            self.by_asin[row['asin']].append(row)
+        self.dates = {}
+        for asin, asin_rows in self.by_asin.items():
+            asin_rows.sort(key=lambda row: row['_dt'])
+            self.dates[asin] = [row['_dt'] for row in asin_rows]
+    
+    def since(self, asin: str, cutoff: date) -> List[Dict[str, Any]]:
+        """Reviews of asin dated on or after cutoff."""
+        if asin not in self.by_asin:
+            return []
+        return self.by_asin[asin][bisect.bisect_left(self.dates[asin], cutoff):]
+
+
+def _demand_order(row: Dict[str, Any]) -> tuple:
+    """Sort key equivalent to `ORDER BY bsr NULLS LAST, dt DESC, asin`."""
+    return (row['bsr'] is None, row['bsr'] or 0, -row['_dt'].toordinal(), row['asin'])
+
+
+def _with_date(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a row as a dict with its dt normalized to a date under `_dt`."""
+    from src.utils.query_helper import to_date
+    
+    row = dict(row)
+    row['_dt'] = to_date(row['dt'])
+    return row
+
+
+def _stream_tiktok(first_day: date, last_day: date, entity_ids: Optional[List[str]]):
+    """Stream (entity_id, TikTok row) on [first_day, last_day) ordered by dt."""
+    from src.features.listing_context import entity_filter
+    from src.utils.db import stream_query
+    from src.utils.query_helper import get_param_placeholder
+    
+    param = get_param_placeholder()
+    entity_clause, entity_params = entity_filter("ea.entity_id", entity_ids)
+    
+    query = f"""
+        SELECT ea.entity_id, t.dt, t.query, t.views, t.videos
+        FROM entity_aliases ea
+        JOIN tiktok_metrics_daily t ON t.query = ea.alias_text
+        WHERE ea.source = 'tiktok' AND t.query_type = 'hashtag'
+            AND t.dt >= {param} AND t.dt < {param}
+            {entity_clause}
+        ORDER BY t.dt
+    """
+    for row in stream_query(query, (first_day, last_day) + entity_params):
+        yield _with_date(row)
+
+
+def _stream_listings(first_day: date, last_day: date, entity_ids: Optional[List[str]]):
+    """Stream (entity_id, matched listing row) on [first_day, last_day] ordered by dt."""
+    from src.features.listing_context import ENTITY_LISTINGS_JOIN, entity_filter
+    from src.utils.db import stream_query
+    from src.utils.query_helper import get_param_placeholder
+    
+    param = get_param_placeholder()
+    entity_clause, entity_params = entity_filter("em.entity_id", entity_ids)
+    
+    query = f"""
+        SELECT em.entity_id, a.dt, a.asin, a.title, a.brand, a.category,
+            a.bsr, a.review_count, a.rating, a.price_usd, a.image_count,
+            a.video_flag, a.first_seen_date
+        {ENTITY_LISTINGS_JOIN}
+        WHERE a.dt >= {param} AND a.dt <= {param}
+            {entity_clause}
+        ORDER BY a.dt
+    """
+    for row in stream_query(query, (first_day, last_day) + entity_params):
+        yield _with_date(row)
+
+
+def _load_reviews(first_day: date, entity_ids: Optional[List[str]]) -> ReviewIndex:
+    """
+    Load reviews of every mapped ASIN from first_day on.
+    
+    Matches load_review_rows, whose window is open-ended (dt >= week_start - 4 weeks).
+    """
+    from src.features.listing_context import entity_filter
+    from src.utils.db import execute_query
+    from src.utils.query_helper import get_param_placeholder
+    
+    param = get_param_placeholder()
+    entity_clause, entity_params = entity_filter("em.entity_id", entity_ids)
+    
+    rows = execute_query(f"""
+        SELECT r.asin, r.dt, r.review_id, r.review_text, r.rating
+        FROM amazon_reviews_daily r
+        WHERE r.dt >= {param}
+            AND r.asin IN (SELECT em.asin FROM entity_asin_map em WHERE 1 = 1 {entity_clause})
+    """, (first_day,) + entity_params)
+    
+    return ReviewIndex([_with_date(row) for row in rows])
+
+
+def backfill_week_starts(start: date, end: date) -> List[date]:
+    """Week starts from start to end inclusive, 7 days apart."""
+    weeks = []
+    week_start = start
+    while week_start <= end:
+        weeks.append(week_start)
+        week_start += timedelta(weeks=1)
+    return weeks
+
+
+def compute_backfill_features(
+    start: date,
+    end: date,
+    entity_ids: Optional[List[str]] = None
+) -> Iterator[Tuple[date, str, Dict[str, Any], Dict[str, Any]]]:
+    """
+    Compute features for every week from start to end with one pass over the data.
+    
+    TikTok and listing rows are streamed once, in date order, over
+    [start - 28 days, end]; reviews for mapped ASINs are loaded once. Output
+    matches build_features_for_week run week by week.
+    
+    Args:
+        start: First week start
+        end: Last week start (inclusive)
+        entity_ids: Optional list of entity IDs. If None, processes all entities.
+    
+    Yields:
+        (week_start, entity_id, features, input_watermarks), week by week
+    """
+    from src.features.build_features import compute_entity_features
+    from src.features.listing_context import load_entity_ids
+    from src.features.watermarks import load_input_watermarks
+    
+    weeks = backfill_week_starts(start, end)
+    if not weeks:
+        return
+    
+    first_day = weeks[0] - timedelta(days=WINDOW_DAYS)
+    ids = load_entity_ids(entity_ids)
+    reviews = _load_reviews(first_day, entity_ids)
+    logger.info(f"Backfilling {len(weeks)} weeks for {len(ids)} entities")
+    
+    windows = defaultdict(EntityWindow)
+    tiktok_stream = _stream_tiktok(first_day, weeks[-1], entity_ids)
+    listing_stream = _stream_listings(first_day, weeks[-1], entity_ids)
+    pending_tiktok = next(tiktok_stream, None)
+    pending_listing = next(listing_stream, None)
+    
+    for week_start in weeks:
+        # Slide every window forward: TikTok rows up to the day before
+        # week_start, listings up to and including week_start
+        while pending_tiktok is not None and pending_tiktok['_dt'] < week_start:
+            windows[pending_tiktok['entity_id']].add_tiktok(pending_tiktok['_dt'], pending_tiktok)
+            pending_tiktok = next(tiktok_stream, None)
+        while pending_listing is not None and pending_listing['_dt'] <= week_start:
+            windows[pending_listing['entity_id']].add_listing(pending_listing['_dt'], pending_listing)
+            pending_listing = next(listing_stream, None)
+        for window in windows.values():
+            window.advance(week_start)
+        
+        # Grouped queries over the week's windows, as in build_features_for_week
+        watermarks = load_input_watermarks(week_start, entity_ids)
+        
+        for entity_id in ids:
+            try:
+                window = windows[entity_id]
+                features = compute_entity_features(window.context(entity_id, week_start, reviews))
+            except Exception as e:
+                logger.error(f"Error computing features for entity {entity_id} week {week_start}: {e}")
+                continue
+            
+            yield week_start, entity_id, features, watermarks.get(entity_id)
+        
+        logger.info(f"Backfilled features for {week_start}")
+
+
+def backfill_features(
+    start: date,
+    end: date,
+    entity_ids: Optional[List[str]] = None,
+    write_batch_size: Optional[int] = None
+) -> None:
+    """
+    Build and store features for every week from start to end.
+    
+    Args:
+        start: First week start
+        end: Last week start (inclusive)
+        entity_ids: Optional list of entity IDs. If None, processes all entities.
+        write_batch_size: Rows per database write (default: DB_WRITE_BATCH_SIZE)
+    """
+    from src.features.build_features import feature_row, feature_writer
+    
+    logger.info(f"Backfilling features from {start} to {end}")
+    
+    with feature_writer(write_batch_size) as writer:
+        for week_start, entity_id, features, watermark in compute_backfill_features(start, end, entity_ids):
+            writer.add(feature_row(week_start, entity_id, features, watermark))
+    
+    if writer.rows_failed:
+        logger.error(f"Failed to store {writer.rows_failed} feature rows")
+    logger.info(f"Completed feature backfill from {start} to {end} ({writer.rows_written} rows stored)")
@@ -5,192 +5,194 @@ Implements feature spec from docs/05_feature_spec.md
 import argparse
 import json
 import logging
-from datetime import date
-from typing import Dict, Any, Optional, List
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+from src.features.listing_context import ListingContext, load_entity_context
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 FEATURE_VERSION = "v1.0"
 
+# Shards per worker process when building in parallel; more, smaller shards
+# stream results back sooner and balance uneven entities
+SHARDS_PER_WORKER = 4
 
-def compute_demand_features(entity_id: str, week_start: date) -> Dict[str, Any]:
+EMPTY_AMAZON_DEMAND_FEATURES = {
+    "demand_amazon_bsr_median_top10": None,
+    "demand_amazon_bsr_improvement_4w": 0.0,
+    "demand_amazon_review_velocity_4w": 0,
+}
+
+EMPTY_COMPETITION_FEATURES = {
+    "comp_amazon_top10_review_median": 0,
+    "comp_amazon_top10_review_p90": 0,
+    "comp_amazon_concentration_hhi": 1.0,
+    "comp_amazon_new_entrant_rate_4w": 0.0,
+    "comp_price_dispersion": 0.0,
+    "comp_price_compression_4w": 0.0,
+    "comp_listing_quality_gap": 0.0,
+}
+
+EMPTY_ECONOMICS_FEATURES = {
+    "econ_price_median": 0.0,
+    "econ_price_trend_4w": 0.0,
+    "econ_estimated_fba_fee_proxy": 0.0,
+    "econ_shipping_risk_proxy": 0.0,
+    "econ_margin_proxy": 0.0,
+    "econ_cogs_proxy": 0.0,
+}
+
+EMPTY_RISK_FEATURES = {
+    "risk_return_proxy": 0.0,
+    "risk_regulatory_proxy": 0.0,
+    "risk_ip_copyability_proxy": 0.0,
+    "risk_hazmat_proxy": 0.0,
+    "risk_seasonality_spike_proxy": 0.0,
+}
+
+
+def average_price(rows: List[Dict[str, Any]]) -> Optional[float]:
     """
-    Compute demand features (TikTok views, Amazon BSR, etc.)
+    Average price_usd over listing rows (equivalent to SQL AVG(price_usd)).
+    
+    Args:
+        rows: Listing rows with a price_usd column
+    
+    Returns:
+        Average price, or None if no row has a price
+    """
+    import statistics
+    
+    prices = [float(row['price_usd']) for row in rows if row['price_usd'] is not None]
+    return statistics.mean(prices) if prices else None
+
+
+def tiktok_demand_from_rows(
+    week_start: date,
+    tiktok_data: List[Dict[str, Any]],
+    view_sums: Optional[Tuple[int, int, int]] = None
+) -> Dict[str, Any]:
+    """
+    Aggregate TikTok demand features from daily hashtag metrics.
     
     Args:
-        entity_id: Entity UUID
         week_start: Week to compute features for
-        
+        tiktok_data: tiktok_metrics_daily rows for the 28 days before week_start,
+            ordered by dt DESC, query
+        view_sums: Optional precomputed (7d, 14d, 28d) view totals, e.g. from
+            the rolling windows in src/features/backfill.py
+    
     Returns:
-        Dictionary of demand features
+        Dictionary of TikTok demand features
     """
-    from datetime import timedelta
-    from src.utils.db import execute_query
+    from src.utils.query_helper import to_date
     
     features = {}
     
-    # Get entity aliases to find related data
-    from src.utils.query_helper import get_param_placeholder
+    # Aggregate views by date ranges
+    if view_sums is not None:
+        views_7d, views_14d, views_28d = view_sums
+    else:
+        views_7d = sum(row['views'] or 0 for row in tiktok_data
+                      if (week_start - to_date(row['dt'])).days <= 7)
+        views_14d = sum(row['views'] or 0 for row in tiktok_data
+                       if (week_start - to_date(row['dt'])).days <= 14)
+        views_28d = sum(row['views'] or 0 for row in tiktok_data)
     
-    param = get_param_placeholder()
-    aliases = execute_query(
-        f"SELECT alias_text, source FROM entity_aliases WHERE entity_id = {param}",
-        (entity_id,)
-    )
+    features.update({
+        "demand_tiktok_views_7d": views_7d,
+        "demand_tiktok_views_14d": views_14d,
+        "demand_tiktok_views_28d": views_28d,
+    })
+    
+    # Compute slope (simple linear regression on last 4 weeks)
+    if len(tiktok_data) >= 2:
+        recent_views = [row['views'] or 0 for row in tiktok_data[:28]]
+        x = list(range(len(recent_views)))
+        y = recent_views
+        n = len(x)
+        slope = (n * sum(x[i] * y[i] for i in range(n)) - sum(x) * sum(y)) / \
+               (n * sum(xi**2 for xi in x) - sum(x)**2)
+        features["demand_tiktok_views_slope_4w"] = slope
+    else:
+        features["demand_tiktok_views_slope_4w"] = 0.0
     
-    # TikTok demand features
-    tiktok_queries = [a['alias_text'] for a in aliases if a['source'] == 'tiktok']
+    return features
+
+
+def amazon_demand_from_rows(
+    amazon_data: List[Dict[str, Any]],
+    old_data: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Aggregate Amazon demand features from matched listings.
     
-    if tiktok_queries:
-        # Get TikTok metrics for last 28 days
-        import os
-        USE_SQLITE = os.getenv("USE_SQLITE", "false").lower() == "true"
-        
-        if USE_SQLITE:
-            placeholders = ",".join(["?"] * len(tiktok_queries))
-            query = f"""
-                SELECT dt, views, videos
-                FROM tiktok_metrics_daily
-                WHERE query IN ({placeholders}) AND query_type = 'hashtag'
-                    AND date(dt) >= date(?) AND date(dt) < date(?)
-                ORDER BY dt DESC
-            """
-            tiktok_data = execute_query(query, tuple(tiktok_queries) + (
-                (week_start - timedelta(days=28)).isoformat(),
-                week_start.isoformat()
-            ))
-        else:
-            query = """
-                SELECT dt, views, videos
-                FROM tiktok_metrics_daily
-                WHERE query = ANY(%s) AND query_type = 'hashtag'
-                    AND dt >= %s - INTERVAL '28 days' AND dt < %s
-                ORDER BY dt DESC
-            """
-            tiktok_data = execute_query(query, (tiktok_queries, week_start, week_start))
-        
-        # Aggregate views by date ranges
-        views_7d = sum(row['views'] or 0 for row in tiktok_data 
-                      if (week_start - row['dt']).days <= 7)
-        views_14d = sum(row['views'] or 0 for row in tiktok_data 
-                       if (week_start - row['dt']).days <= 14)
-        views_28d = sum(row['views'] or 0 for row in tiktok_data)
-        
-        features.update({
-            "demand_tiktok_views_7d": views_7d,
-            "demand_tiktok_views_14d": views_14d,
-            "demand_tiktok_views_28d": views_28d,
-        })
-        
-        # Compute slope (simple linear regression on last 4 weeks)
-        if len(tiktok_data) >= 2:
-            recent_views = [row['views'] or 0 for row in tiktok_data[:28]]
-            if len(recent_views) >= 2:
-                # Simple slope calculation
-                x = list(range(len(recent_views)))
-                y = recent_views
-                n = len(x)
-                slope = (n * sum(x[i] * y[i] for i in range(n)) - sum(x) * sum(y)) / \
-                       (n * sum(xi**2 for xi in x) - sum(x)**2) if n > 1 else 0
-                features["demand_tiktok_views_slope_4w"] = slope
-            else:
-                features["demand_tiktok_views_slope_4w"] = 0.0
-        else:
-            features["demand_tiktok_views_slope_4w"] = 0.0
+    Args:
+        amazon_data: Top 10 matched listings by BSR over the 4 weeks before week_start
+        old_data: All matched listings on week_start - 4 weeks
+    
+    Returns:
+        Dictionary of Amazon demand features
+    """
+    if not amazon_data:
+        return dict(EMPTY_AMAZON_DEMAND_FEATURES)
+    
+    features = {}
+    
+    # Median BSR of top 10
+    bsrs = [row['bsr'] for row in amazon_data if row['bsr']]
+    if bsrs:
+        bsrs_sorted = sorted(bsrs)
+        median_idx = len(bsrs_sorted) // 2
+        features["demand_amazon_bsr_median_top10"] = bsrs_sorted[median_idx]
     else:
-        features.update({
-            "demand_tiktok_views_7d": 0,
-            "demand_tiktok_views_14d": 0,
-            "demand_tiktok_views_28d": 0,
-            "demand_tiktok_views_slope_4w": 0.0,
-        })
-    
-    # Amazon demand features
-    amazon_aliases = [a['alias_text'] for a in aliases if a['source'] == 'amazon']
-    
-    if amazon_aliases:
-        # Get Amazon listings mapped to this entity (via aliases or direct mapping)
-        # For now, simplified - in production, use proper entity resolution
-        # Build query with SQLite/PostgreSQL compatibility
-        from src.utils.query_helper import convert_like_any, convert_any_clause, convert_date_interval, get_param_placeholder
-        
-        like_clause, like_params = convert_like_any("title", [f'%{alias}%' for alias in amazon_aliases])
-        brand_clause, brand_params = convert_any_clause("brand", amazon_aliases)
-        date_clause, date_param = convert_date_interval(week_start, "4 weeks")
-        param = get_param_placeholder()
-        
-        query = f"""
-            SELECT bsr, review_count, dt
-            FROM amazon_listings_daily
-            WHERE dt >= {date_clause} AND dt < {param}
-                AND ({like_clause} OR {brand_clause})
-            ORDER BY bsr
-            LIMIT 10
-        """
-        
-        # Combine parameters in correct order
-        if USE_SQLITE:
-            params = (date_param, week_start.isoformat()) + like_params + brand_params
-        else:
-            params = (date_param, week_start, like_params[0], brand_params[0])
-        
-        amazon_data = execute_query(query, params)
-        
-        if amazon_data:
-            # Median BSR of top 10
-            bsrs = [row['bsr'] for row in amazon_data if row['bsr']]
-            if bsrs:
-                bsrs_sorted = sorted(bsrs)
-                median_idx = len(bsrs_sorted) // 2
-                features["demand_amazon_bsr_median_top10"] = bsrs_sorted[median_idx]
-            else:
-                features["demand_amazon_bsr_median_top10"] = None
-            
-            # BSR improvement (compare current week to 4 weeks ago)
-            current_bsr = amazon_data[0]['bsr'] if amazon_data else None
-            old_data = execute_query("""
-                SELECT bsr FROM amazon_listings_daily
-                WHERE dt = %s - INTERVAL '4 weeks'
-                    AND (title ILIKE ANY(%s) OR brand = ANY(%s))
-                ORDER BY bsr NULLS LAST LIMIT 1
-            """, (
-                week_start,
-                [f'%{alias}%' for alias in amazon_aliases],
-                amazon_aliases
-            ))
-            old_bsr = old_data[0]['bsr'] if old_data else None
-            
-            if current_bsr and old_bsr:
-                # Lower BSR is better, so improvement = (old - new) / old
-                features["demand_amazon_bsr_improvement_4w"] = (old_bsr - current_bsr) / old_bsr
-            else:
-                features["demand_amazon_bsr_improvement_4w"] = 0.0
-            
-            # Review velocity (delta reviews in last 4 weeks)
-            current_reviews = sum(row['review_count'] or 0 for row in amazon_data)
-            old_reviews = sum(row['review_count'] or 0 for row in execute_query("""
-                SELECT review_count FROM amazon_listings_daily
-                WHERE dt = %s - INTERVAL '4 weeks'
-                    AND (title ILIKE ANY(%s) OR brand = ANY(%s))
-            """, (
-                week_start,
-                [f'%{alias}%' for alias in amazon_aliases],
-                amazon_aliases
-            )))
-            features["demand_amazon_review_velocity_4w"] = current_reviews - old_reviews
-        else:
-            features.update({
-                "demand_amazon_bsr_median_top10": None,
-                "demand_amazon_bsr_improvement_4w": 0.0,
-                "demand_amazon_review_velocity_4w": 0,
-            })
+        features["demand_amazon_bsr_median_top10"] = None
+    
+    # BSR improvement (compare current week to 4 weeks ago)
+    current_bsr = amazon_data[0]['bsr']
+    old_bsrs = [row['bsr'] for row in old_data if row['bsr'] is not None]
+    old_bsr = min(old_bsrs) if old_bsrs else None
+    
+    if current_bsr and old_bsr:
+        # Lower BSR is better, so improvement = (old - new) / old
+        features["demand_amazon_bsr_improvement_4w"] = (old_bsr - current_bsr) / old_bsr
     else:
-        features.update({
-            "demand_amazon_bsr_median_top10": None,
-            "demand_amazon_bsr_improvement_4w": 0.0,
-            "demand_amazon_review_velocity_4w": 0,
-        })
+        features["demand_amazon_bsr_improvement_4w"] = 0.0
+    
+    # Review velocity (delta reviews in last 4 weeks)
+    current_reviews = sum(row['review_count'] or 0 for row in amazon_data)
+    old_reviews = sum(row['review_count'] or 0 for row in old_data)
+    features["demand_amazon_review_velocity_4w"] = current_reviews - old_reviews
+    
+    return features
+
+
+def demand_features_from_rows(
+    week_start: date,
+    tiktok_data: List[Dict[str, Any]],
+    amazon_data: List[Dict[str, Any]],
+    old_amazon_data: List[Dict[str, Any]],
+    tiktok_view_sums: Optional[Tuple[int, int, int]] = None
+) -> Dict[str, Any]:
+    """
+    Compute demand features from already-fetched TikTok and Amazon rows.
+    
+    Args:
+        week_start: Week to compute features for
+        tiktok_data: See tiktok_demand_from_rows
+        amazon_data: See amazon_demand_from_rows
+        old_amazon_data: See amazon_demand_from_rows
+        tiktok_view_sums: See tiktok_demand_from_rows
+    
+    Returns:
+        Dictionary of demand features
+    """
+    features = {
+        **tiktok_demand_from_rows(week_start, tiktok_data, tiktok_view_sums),
+        **amazon_demand_from_rows(amazon_data, old_amazon_data),
+    }
     
     # Cross-channel alignment (simplified)
     has_tiktok = features.get("demand_tiktok_views_7d", 0) > 0
@@ -202,81 +204,69 @@ def compute_demand_features(entity_id: str, week_start: date) -> Dict[str, Any]:
     return features
 
 
-def compute_competition_features(entity_id: str, week_start: date) -> Dict[str, Any]:
+def demand_features_from_context(context: ListingContext) -> Dict[str, Any]:
     """
-    Compute competition features.
+    Compute demand features from a listing context.
+    
+    Args:
+        context: Entity's ListingContext for the week
+    
+    Returns:
+        Dictionary of demand features
+    """
+    return demand_features_from_rows(
+        context.week_start, context.tiktok_rows, context.demand_rows, context.old_listings,
+        context.tiktok_view_sums
+    )
+
+
+def compute_demand_features(entity_id: str, week_start: date) -> Dict[str, Any]:
+    """
+    Compute demand features (TikTok views, Amazon BSR, etc.)
     
     Args:
         entity_id: Entity UUID
         week_start: Week to compute features for
-        
+    
     Returns:
-        Dictionary of competition features
+        Dictionary of demand features
     """
-    from src.utils.db import execute_query
-    from datetime import timedelta
-    import statistics
-    
-    features = {}
+    return demand_features_from_context(load_entity_context(entity_id, week_start))
+
+
+
+def competition_features_from_rows(
+    top_listings: List[Dict[str, Any]],
+    new_entrant_count: int,
+    old_avg_price: Optional[float]
+) -> Dict[str, Any]:
+    """
+    Compute competition features from already-fetched listings.
     
-    # Get entity aliases
-    aliases = execute_query(
-        "SELECT alias_text, source FROM entity_aliases WHERE entity_id = %s",
-        (entity_id,)
-    )
-    amazon_aliases = [a['alias_text'] for a in aliases if a['source'] == 'amazon']
-    
-    if not amazon_aliases:
-        return {
-            "comp_amazon_top10_review_median": 0,
-            "comp_amazon_top10_review_p90": 0,
-            "comp_amazon_concentration_hhi": 1.0,
-            "comp_amazon_new_entrant_rate_4w": 0.0,
-            "comp_price_dispersion": 0.0,
-            "comp_price_compression_4w": 0.0,
-            "comp_listing_quality_gap": 0.0,
-        }
+    Args:
+        top_listings: Top 10 matched listings on week_start with a BSR, ordered by BSR
+        new_entrant_count: Distinct matched ASINs on week_start first seen in the last 4 weeks
+        old_avg_price: Average matched price on week_start - 4 weeks
     
-    # Get top 10 listings by BSR for this concept
-    query = """
-        SELECT asin, review_count, rating, price_usd, image_count, video_flag, first_seen_date, dt
-        FROM amazon_listings_daily
-        WHERE dt = %s
-            AND (title ILIKE ANY(%s) OR brand = ANY(%s))
-            AND bsr IS NOT NULL
-        ORDER BY bsr
-        LIMIT 10
-    """
-    top_listings = execute_query(query, (
-        week_start,
-        [f'%{alias}%' for alias in amazon_aliases],
-        amazon_aliases
-    ))
+    Returns:
+        Dictionary of competition features
+    """
+    import statistics
     
     if not top_listings:
-        return {
-            "comp_amazon_top10_review_median": 0,
-            "comp_amazon_top10_review_p90": 0,
-            "comp_amazon_concentration_hhi": 1.0,
-            "comp_amazon_new_entrant_rate_4w": 0.0,
-            "comp_price_dispersion": 0.0,
-            "comp_price_compression_4w": 0.0,
-            "comp_listing_quality_gap": 0.0,
-        }
+        return dict(EMPTY_COMPETITION_FEATURES)
+    
+    features = {}
     
     # Review median and p90
     review_counts = [row['review_count'] or 0 for row in top_listings]
-    if review_counts:
-        features["comp_amazon_top10_review_median"] = int(statistics.median(review_counts))
-        sorted_reviews = sorted(review_counts)
-        p90_idx = int(len(sorted_reviews) * 0.9)
-        features["comp_amazon_top10_review_p90"] = sorted_reviews[p90_idx] if p90_idx < len(sorted_reviews) else sorted_reviews[-1]
-    else:
-        features["comp_amazon_top10_review_median"] = 0
-        features["comp_amazon_top10_review_p90"] = 0
+    features["comp_amazon_top10_review_median"] = int(statistics.median(review_counts))
+    sorted_reviews = sorted(review_counts)
+    p90_idx = int(len(sorted_reviews) * 0.9)
+    features["comp_amazon_top10_review_p90"] = sorted_reviews[p90_idx] if p90_idx < len(sorted_reviews) else sorted_reviews[-1]
     
     # HHI (Herfindahl-Hirschman Index) - concentration based on review share
-    total_reviews = sum(review_counts) if review_counts else 1
+    total_reviews = sum(review_counts)
     if total_reviews > 0:
         review_shares = [rc / total_reviews for rc in review_counts]
         hhi = sum(share ** 2 for share in review_shares)
@@ -285,23 +275,7 @@ def compute_competition_features(entity_id: str, week_start: date) -> Dict[str,
         features["comp_amazon_concentration_hhi"] = 1.0
     
     # New entrant rate (listings that appeared in last 4 weeks)
-    four_weeks_ago = week_start - timedelta(weeks=4)
-    new_entrants_query = """
-        SELECT COUNT(DISTINCT asin) as new_count
-        FROM amazon_listings_daily
-        WHERE dt = %s
-            AND (title ILIKE ANY(%s) OR brand = ANY(%s))
-            AND first_seen_date >= %s
-            AND bsr IS NOT NULL
-    """
-    new_entrants_result = execute_query(new_entrants_query, (
-        week_start,
-        [f'%{alias}%' for alias in amazon_aliases],
-        amazon_aliases,
-        four_weeks_ago
-    ))
-    new_entrant_count = new_entrants_result[0]['new_count'] if new_entrants_result else 0
-    features["comp_amazon_new_entrant_rate_4w"] = new_entrant_count / len(top_listings) if top_listings else 0.0
+    features["comp_amazon_new_entrant_rate_4w"] = new_entrant_count / len(top_listings)
     
     # Price dispersion (std dev)
     prices = [float(row['price_usd']) for row in top_listings if row['price_usd']]
@@ -311,20 +285,6 @@ def compute_competition_features(entity_id: str, week_start: date) -> Dict[str,
         features["comp_price_dispersion"] = 0.0
     
     # Price compression (trend down over 4 weeks)
-    old_prices_query = """
-        SELECT AVG(price_usd) as avg_price
-        FROM amazon_listings_daily
-        WHERE dt = %s
-            AND (title ILIKE ANY(%s) OR brand = ANY(%s))
-            AND price_usd IS NOT NULL
-        LIMIT 10
-    """
-    old_prices_result = execute_query(old_prices_query, (
-        four_weeks_ago,
-        [f'%{alias}%' for alias in amazon_aliases],
-        amazon_aliases
-    ))
-    old_avg_price = old_prices_result[0]['avg_price'] if old_prices_result and old_prices_result[0]['avg_price'] else None
     current_avg_price = statistics.mean(prices) if prices else None
     
     if old_avg_price and current_avg_price and old_avg_price > 0:
@@ -334,80 +294,77 @@ def compute_competition_features(entity_id: str, week_start: date) -> Dict[str,
     
     # Listing quality gap (avg images/video for top vs median)
     image_counts = [row['image_count'] or 0 for row in top_listings]
-    video_counts = [1 if row['video_flag'] else 0 for row in top_listings]
-    
-    if image_counts:
-        top_avg_images = statistics.mean(image_counts[:3]) if len(image_counts) >= 3 else statistics.mean(image_counts)
-        median_avg_images = statistics.mean(image_counts[3:]) if len(image_counts) > 3 else top_avg_images
-        features["comp_listing_quality_gap"] = top_avg_images - median_avg_images
-    else:
-        features["comp_listing_quality_gap"] = 0.0
+    top_avg_images = statistics.mean(image_counts[:3]) if len(image_counts) >= 3 else statistics.mean(image_counts)
+    median_avg_images = statistics.mean(image_counts[3:]) if len(image_counts) > 3 else top_avg_images
+    features["comp_listing_quality_gap"] = top_avg_images - median_avg_images
     
     return features
 
 
-def compute_economics_features(entity_id: str, week_start: date) -> Dict[str, Any]:
+def competition_features_from_context(context: ListingContext) -> Dict[str, Any]:
     """
-    Compute economics/feasibility features.
+    Compute competition features from a listing context.
     
     Args:
-        entity_id: Entity UUID
-        week_start: Week to compute features for
-        
+        context: Entity's ListingContext for the week
+    
     Returns:
-        Dictionary of economics features
+        Dictionary of competition features
     """
-    from src.utils.db import execute_query
     from datetime import timedelta
-    import statistics
+    from src.utils.query_helper import to_date
+    
+    # New entrants among all BSR-ranked listings (appeared in the last 4 weeks)
+    four_weeks_ago = context.week_start - timedelta(weeks=4)
+    new_entrant_count = len({
+        row['asin'] for row in context.current_listings
+        if row['bsr'] is not None and row['first_seen_date'] is not None
+        and to_date(row['first_seen_date']) >= four_weeks_ago
+    })
+    
+    return competition_features_from_rows(
+        context.top_listings('bsr'), new_entrant_count, average_price(context.old_listings)
+    )
+
+
+def compute_competition_features(entity_id: str, week_start: date) -> Dict[str, Any]:
+    """
+    Compute competition features.
     
-    features = {}
+    Args:
+        entity_id: Entity UUID
+        week_start: Week to compute features for
     
-    # Get entity aliases
-    aliases = execute_query(
-        "SELECT alias_text, source FROM entity_aliases WHERE entity_id = %s",
-        (entity_id,)
-    )
-    amazon_aliases = [a['alias_text'] for a in aliases if a['source'] == 'amazon']
-    
-    if not amazon_aliases:
-        return {
-            "econ_price_median": 0.0,
-            "econ_price_trend_4w": 0.0,
-            "econ_estimated_fba_fee_proxy": 0.0,
-            "econ_shipping_risk_proxy": 0.0,
-            "econ_margin_proxy": 0.0,
-            "econ_cogs_proxy": 0.0,
-        }
+    Returns:
+        Dictionary of competition features
+    """
+    return competition_features_from_context(load_entity_context(entity_id, week_start))
+
+
+
+def economics_features_from_rows(
+    listings: List[Dict[str, Any]],
+    old_avg_price: Optional[float]
+) -> Dict[str, Any]:
+    """
+    Compute economics/feasibility features from already-fetched listings.
+    
+    Args:
+        listings: Top 10 matched listings on week_start with a price, ordered by BSR
+        old_avg_price: Average matched price on week_start - 4 weeks
     
-    # Get current prices
-    query = """
-        SELECT price_usd, category
-        FROM amazon_listings_daily
-        WHERE dt = %s
-            AND (title ILIKE ANY(%s) OR brand = ANY(%s))
-            AND price_usd IS NOT NULL
-        ORDER BY bsr NULLS LAST
-        LIMIT 10
-    """
-    listings = execute_query(query, (
-        week_start,
-        [f'%{alias}%' for alias in amazon_aliases],
-        amazon_aliases
-    ))
+    Returns:
+        Dictionary of economics features
+    """
+    import statistics
     
     if not listings:
-        return {
-            "econ_price_median": 0.0,
-            "econ_price_trend_4w": 0.0,
-            "econ_estimated_fba_fee_proxy": 0.0,
-            "econ_shipping_risk_proxy": 0.0,
-            "econ_margin_proxy": 0.0,
-            "econ_cogs_proxy": 0.0,
-        }
+        return dict(EMPTY_ECONOMICS_FEATURES)
+    
+    features = {}
     
     prices = [float(row['price_usd']) for row in listings if row['price_usd']]
-    category = listings[0].get('category', 'Unknown') if listings else 'Unknown'
+    category = listings[0].get('category') or 'Unknown'
     
     # Price median
     if prices:
@@ -416,25 +373,10 @@ def compute_economics_features(entity_id: str, week_start: date) -> Dict[str, An
         features["econ_price_median"] = 0.0
     
     # Price trend (4 weeks)
-    four_weeks_ago = week_start - timedelta(weeks=4)
-    old_query = """
-        SELECT AVG(price_usd) as avg_price
-        FROM amazon_listings_daily
-        WHERE dt = %s
-            AND (title ILIKE ANY(%s) OR brand = ANY(%s))
-            AND price_usd IS NOT NULL
-        LIMIT 10
-    """
-    old_result = execute_query(old_query, (
-        four_weeks_ago,
-        [f'%{alias}%' for alias in amazon_aliases],
-        amazon_aliases
-    ))
-    old_avg = old_result[0]['avg_price'] if old_result and old_result[0]['avg_price'] else None
     current_avg = statistics.mean(prices) if prices else None
     
-    if old_avg and current_avg and old_avg > 0:
-        features["econ_price_trend_4w"] = (current_avg - old_avg) / old_avg
+    if old_avg_price and current_avg and old_avg_price > 0:
+        features["econ_price_trend_4w"] = (current_avg - old_avg_price) / old_avg_price
     else:
         features["econ_price_trend_4w"] = 0.0
     
@@ -488,74 +430,57 @@ def compute_economics_features(entity_id: str, week_start: date) -> Dict[str, An
     return features
 
 
-def compute_risk_features(entity_id: str, week_start: date) -> Dict[str, Any]:
+def economics_features_from_context(context: ListingContext) -> Dict[str, Any]:
     """
-    Compute risk features.
+    Compute economics/feasibility features from a listing context.
+    
+    Args:
+        context: Entity's ListingContext for the week
+    
+    Returns:
+        Dictionary of economics features
+    """
+    return economics_features_from_rows(
+        context.top_listings('price_usd'), average_price(context.old_listings)
+    )
+
+
+def compute_economics_features(entity_id: str, week_start: date) -> Dict[str, Any]:
+    """
+    Compute economics/feasibility features.
     
     Args:
         entity_id: Entity UUID
         week_start: Week to compute features for
-        
+    
     Returns:
-        Dictionary of risk features
+        Dictionary of economics features
     """
-    from src.utils.db import execute_query
-    
-    features = {}
+    return economics_features_from_context(load_entity_context(entity_id, week_start))
+
+
+
+def risk_features_from_rows(
+    listings: List[Dict[str, Any]],
+    reviews: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Compute risk features from already-fetched listings and reviews.
     
-    # Get entity aliases
-    aliases = execute_query(
-        "SELECT alias_text, source FROM entity_aliases WHERE entity_id = %s",
-        (entity_id,)
-    )
-    amazon_aliases = [a['alias_text'] for a in aliases if a['source'] == 'amazon']
-    
-    if not amazon_aliases:
-        return {
-            "risk_return_proxy": 0.0,
-            "risk_regulatory_proxy": 0.0,
-            "risk_ip_copyability_proxy": 0.0,
-            "risk_hazmat_proxy": 0.0,
-            "risk_seasonality_spike_proxy": 0.0,
-        }
+    Args:
+        listings: Top 10 matched listings on week_start, ordered by BSR
+        reviews: Up to 100 recent reviews (with text) of those listings
     
-    # Get listings and reviews for risk analysis
-    query = """
-        SELECT a.asin, a.title, a.category, a.brand
-        FROM amazon_listings_daily a
-        WHERE a.dt = %s
-            AND (a.title ILIKE ANY(%s) OR a.brand = ANY(%s))
-        LIMIT 10
+    Returns:
+        Dictionary of risk features
     """
-    listings = execute_query(query, (
-        week_start,
-        [f'%{alias}%' for alias in amazon_aliases],
-        amazon_aliases
-    ))
-    
     if not listings:
-        return {
-            "risk_return_proxy": 0.0,
-            "risk_regulatory_proxy": 0.0,
-            "risk_ip_copyability_proxy": 0.0,
-            "risk_hazmat_proxy": 0.0,
-            "risk_seasonality_spike_proxy": 0.0,
-        }
+        return dict(EMPTY_RISK_FEATURES)
     
-    # Get review text for return risk analysis
-    asins = [row['asin'] for row in listings]
-    reviews_query = """
-        SELECT review_text, rating
-        FROM amazon_reviews_daily
-        WHERE asin = ANY(%s)
-            AND dt >= %s - INTERVAL '4 weeks'
-            AND review_text IS NOT NULL
-        LIMIT 100
-    """
-    reviews = execute_query(reviews_query, (asins, week_start))
+    features = {}
     
     # Return risk proxy (from review text analysis)
-    return_keywords = ['broke', 'broken', 'leak', 'leaked', 'doesn\'t work', 
+    return_keywords = ['broke', 'broken', 'leak', 'leaked', 'doesn\'t work',
                        'stopped working', 'defective', 'returned', 'refund']
     negative_keywords = ['terrible', 'awful', 'worst', 'disappointed', 'waste']
     
@@ -622,13 +547,13 @@ def compute_risk_features(entity_id: str, week_start: date) -> Dict[str, Any]:
         features["risk_ip_copyability_proxy"] = 0.5  # Medium
     
     # Hazmat proxy
-    hazmat_keywords = ['battery', 'lithium', 'chemical', 'flammable', 'aerosol', 
+    hazmat_keywords = ['battery', 'lithium', 'chemical', 'flammable', 'aerosol',
                       'perfume', 'nail polish', 'paint', 'solvent']
     hazmat_count = sum(1 for kw in hazmat_keywords if kw in combined_text)
     features["risk_hazmat_proxy"] = min(1.0, hazmat_count * 0.3)
     
     # Seasonality spike proxy (simplified - would need historical data)
-    seasonal_keywords = ['christmas', 'holiday', 'valentine', 'halloween', 
+    seasonal_keywords = ['christmas', 'holiday', 'valentine', 'halloween',
                         'summer', 'winter', 'beach', 'snow']
     seasonal_count = sum(1 for kw in seasonal_keywords if kw in combined_text)
     features["risk_seasonality_spike_proxy"] = min(1.0, seasonal_count * 0.4)
@@ -636,6 +561,35 @@ def compute_risk_features(entity_id: str, week_start: date) -> Dict[str, Any]:
     return features
 
 
+def risk_features_from_context(context: ListingContext) -> Dict[str, Any]:
+    """
+    Compute risk features from a listing context.
+    
+    Args:
+        context: Entity's ListingContext for the week
+    
+    Returns:
+        Dictionary of risk features
+    """
+    listings = context.top_listings()
+    return risk_features_from_rows(listings, context.recent_reviews(listings))
+
+
+def compute_risk_features(entity_id: str, week_start: date) -> Dict[str, Any]:
+    """
+    Compute risk features.
+    
+    Args:
+        entity_id: Entity UUID
+        week_start: Week to compute features for
+    
+    Returns:
+        Dictionary of risk features
+    """
+    return risk_features_from_context(load_entity_context(entity_id, week_start))
+
+
+
 def compute_nlp_features(entity_id: str, week_start: date) -> Dict[str, Any]:
     """
     Compute NLP innovation/pain point features.
@@ -643,7 +597,7 @@ def compute_nlp_features(entity_id: str, week_start: date) -> Dict[str, Any]:
     Args:
         entity_id: Entity UUID
         week_start: Week to compute features for
-        
+    
     Returns:
         Dictionary of NLP features
     """
@@ -663,7 +617,7 @@ def compute_dtc_features(entity_id: str, week_start: date) -> Dict[str, Any]:
     Args:
         entity_id: Entity UUID
         week_start: Week to compute features for
-        
+    
     Returns:
         Dictionary of DTC features
     """
@@ -675,72 +629,350 @@ def compute_dtc_features(entity_id: str, week_start: date) -> Dict[str, Any]:
     }
 
 
-def build_features_for_week(week_start: date, entity_ids: Optional[List[str]] = None) -> None:
+def compute_entity_features(context: ListingContext) -> Dict[str, Any]:
     """
-    Build all features for all entities for a given week.
+    Compute all feature groups for one entity from its listing context.
+    
+    Args:
+        context: Entity's ListingContext for the week
+    
+    Returns:
+        Dictionary of all features
+    """
+    return {
+        **demand_features_from_context(context),
+        **competition_features_from_context(context),
+        **economics_features_from_context(context),
+        **risk_features_from_context(context),
+        **compute_nlp_features(context.entity_id, context.week_start),
+        **compute_dtc_features(context.entity_id, context.week_start),
+    }
+
+
+FEATURE_COLUMNS = ("week_start", "entity_id", "features", "feature_version", "input_watermarks", "computed_at")
+
+
+def feature_row(
+    week_start: date,
+    entity_id: str,
+    features: Dict[str, Any],
+    input_watermarks: Optional[Dict[str, Any]] = None
+) -> Tuple[Any, ...]:
+    """
+    Build an entity_weekly_features row in FEATURE_COLUMNS order, computed now.
+    
+    Args:
+        week_start: Week the features were built for
+        entity_id: Entity UUID
+        features: Feature dictionary
+        input_watermarks: Optional input watermark the features were built
+            from (see src/features/watermarks.py)
+    
+    Returns:
+        Row tuple
+    """
+    watermarks_json = json.dumps(input_watermarks) if input_watermarks is not None else None
+    return (week_start, entity_id, json.dumps(features), FEATURE_VERSION, watermarks_json, datetime.now())
+
+
+def feature_writer(batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+    """
+    Buffered upsert writer for entity_weekly_features.
+    
+    Args:
+        batch_size: Rows per flush (default: DB_WRITE_BATCH_SIZE)
+        flush_interval: Seconds after a flush from which the next add() flushes (default: DB_WRITE_FLUSH_SECONDS)
+    
+    Returns:
+        BulkUpsertWriter taking feature_row() tuples
+    """
+    from src.utils.db import BulkUpsertWriter
+    
+    return BulkUpsertWriter(
+        "entity_weekly_features",
+        FEATURE_COLUMNS,
+        conflict_columns=["week_start", "entity_id", "feature_version"],
+        update_columns=["features", "input_watermarks", "computed_at"],
+        batch_size=batch_size,
+        flush_interval=flush_interval
+    )
+
+
+def store_entity_features(
+    week_start: date,
+    entity_id: str,
+    features: Dict[str, Any],
+    input_watermarks: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Upsert one entity's features into entity_weekly_features.
+    
+    Bulk builds go through feature_writer() instead.
+    
+    Args:
+        week_start: Week the features were built for
+        entity_id: Entity UUID
+        features: Feature dictionary
+        input_watermarks: Optional input watermark the features were built
+            from (see src/features/watermarks.py)
+    """
+    from src.utils.db import execute_query
+    
+    execute_query("""
+        INSERT INTO entity_weekly_features 
+            (week_start, entity_id, features, feature_version, input_watermarks, computed_at)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (week_start, entity_id, feature_version) 
+        DO UPDATE SET features = EXCLUDED.features, input_watermarks = EXCLUDED.input_watermarks,
+            computed_at = EXCLUDED.computed_at
+    """, feature_row(week_start, entity_id, features, input_watermarks), fetch=False)
+    
+    logger.debug(f"Stored features for entity {entity_id}")
+
+
+def compute_features_for_entities(
+    week_start: date,
+    entity_ids: Optional[List[str]] = None,
+    batch: bool = False
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Compute all features for a set of entities, one listing context per entity.
+    
+    Entities that fail are logged and skipped.
     
     Args:
         week_start: Week to build features for
         entity_ids: Optional list of entity IDs. If None, processes all entities.
-    """
-    from src.utils.db import execute_query, get_db_cursor
-    import json
+        batch: If True, load every entity's context up front with a fixed number
+            of set-based queries (see src/features/listing_context.py) instead of
+            four queries per entity
     
-    logger.info(f"Building features for week {week_start}")
+    Yields:
+        (entity_id, features) for each entity computed successfully
+    """
+    from src.features.listing_context import load_entity_ids, load_week_contexts
     
-    # Get entities to process
-    if entity_ids:
-        query = "SELECT entity_id FROM entities WHERE entity_id = ANY(%s)"
-        entities = execute_query(query, (entity_ids,))
+    if batch:
+        contexts = load_week_contexts(week_start, entity_ids)
+        ids = list(contexts)
     else:
-        query = "SELECT entity_id FROM entities"
-        entities = execute_query(query)
+        contexts = None
+        ids = load_entity_ids(entity_ids)
     
-    logger.info(f"Processing {len(entities)} entities")
+    logger.info(f"Processing {len(ids)} entities")
     
-    for entity_row in entities:
-        entity_id = entity_row['entity_id']
-        
+    for entity_id in ids:
         try:
-            # Compute all feature groups
-            features = {
-                **compute_demand_features(entity_id, week_start),
-                **compute_competition_features(entity_id, week_start),
-                **compute_economics_features(entity_id, week_start),
-                **compute_risk_features(entity_id, week_start),
-                **compute_nlp_features(entity_id, week_start),
-                **compute_dtc_features(entity_id, week_start),
-            }
-            
-            # Store in DB
-            with get_db_cursor() as cur:
-                cur.execute("""
-                    INSERT INTO entity_weekly_features 
-                        (week_start, entity_id, features, feature_version)
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (week_start, entity_id, feature_version) 
-                    DO UPDATE SET features = EXCLUDED.features
-                """, (week_start, entity_id, json.dumps(features), FEATURE_VERSION))
-            
-            logger.debug(f"Stored features for entity {entity_id}")
+            if contexts is not None:
+                context = contexts[entity_id]
+            else:
+                context = load_entity_context(entity_id, week_start)
             
+            yield entity_id, compute_entity_features(context)
+        
         except Exception as e:
             logger.error(f"Error computing features for entity {entity_id}: {e}")
             continue
+
+
+def shard_entity_ids(entity_ids: List[str], num_shards: int) -> List[List[str]]:
+    """
+    Split entity IDs into at most num_shards contiguous, non-empty shards.
+    
+    Args:
+        entity_ids: Entity IDs to split
+        num_shards: Maximum number of shards
+    
+    Returns:
+        List of shards
+    """
+    shard_size = max(1, -(-len(entity_ids) // max(1, num_shards)))
+    return [entity_ids[i:i + shard_size] for i in range(0, len(entity_ids), shard_size)]
+
+
+def _init_feature_worker() -> None:
+    """Process pool initializer: give each worker its own DB connection pool."""
+    from src.utils.db import reset_connection_pool
     
-    logger.info(f"Completed feature building for {week_start}")
+    reset_connection_pool()
+
+
+def _compute_feature_shard(
+    week_start: date,
+    entity_ids: List[str],
+    batch: bool
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Worker entry point: compute one shard's features (see compute_features_for_entities)."""
+    return list(compute_features_for_entities(week_start, entity_ids, batch))
+
+
+def compute_features_parallel(
+    week_start: date,
+    entity_ids: Optional[List[str]] = None,
+    batch: bool = False,
+    workers: int = 1
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Compute features in a process pool, sharded by entity.
+    
+    Results are yielded shard by shard as workers finish, so the caller can
+    write them from a single process. Entity failures are isolated as in
+    compute_features_for_entities; a shard that fails as a whole is logged
+    and skipped without aborting the others.
+    
+    Args:
+        week_start: Week to build features for
+        entity_ids: Optional list of entity IDs. If None, processes all entities.
+        batch: Load contexts with set-based queries, once per shard
+        workers: Number of worker processes
+    
+    Yields:
+        (entity_id, features) for each entity computed successfully
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from src.features.listing_context import load_entity_ids
+    
+    ids = load_entity_ids(entity_ids)
+    shards = shard_entity_ids(ids, workers * SHARDS_PER_WORKER)
+    logger.info(f"Processing {len(ids)} entities in {len(shards)} shards on {workers} workers")
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_feature_worker) as pool:
+        futures = {
+            pool.submit(_compute_feature_shard, week_start, shard, batch): shard
+            for shard in shards
+        }
+        
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                logger.error(f"Feature shard failed ({len(shard)} entities starting at {shard[0]}): {e}")
+                continue
+            
+            yield from results
+
+
+def build_features_for_week(
+    week_start: date,
+    entity_ids: Optional[List[str]] = None,
+    batch: bool = False,
+    workers: int = 1,
+    incremental: bool = False,
+    write_batch_size: Optional[int] = None,
+    matrix_dir: Optional[Path] = None,
+    record_watermarks: bool = True
+):
+    """
+    Build all features for all entities for a given week.
+    
+    Each entity's listing context is loaded once and shared by every feature group.
+    Stored feature rows record the input watermark they were built from, unless
+    record_watermarks is off. Rows are written in batches through feature_writer().
+    
+    Args:
+        week_start: Week to build features for
+        entity_ids: Optional list of entity IDs. If None, processes all entities.
+        batch: If True, load listing contexts with set-based queries
+            (see src/features/listing_context.py) instead of per entity
+        workers: Number of worker processes. With more than one, entities are
+            sharded across a process pool and results are written by this process.
+        incremental: Only recompute entities whose input watermark differs from
+            the one stored with their features (or that have no features yet)
+        write_batch_size: Rows per database write (default: DB_WRITE_BATCH_SIZE)
+        matrix_dir: Optional directory to cache the week's feature matrix in
+            (see src/features/feature_matrix.py)
+        record_watermarks: Store input watermarks with the features. Without
+            them, the next incremental build recomputes these entities.
+    
+    Returns:
+        WeekFeatureMatrix of the week. A full build returns the features it
+        just computed; partial and incremental builds reload the stored week.
+    """
+    from src.features.feature_matrix import WeekFeatureMatrix, matrix_cache_path, stored_features_stamp
+    from src.features.watermarks import load_input_watermarks, load_stored_watermarks, changed_entity_ids
+    
+    logger.info(f"Building features for week {week_start}")
+    
+    # Taken before reading any inputs: rows that land during the build leave
+    # the stored watermark behind, so the next incremental run picks them up
+    watermarks = {}
+    if incremental or record_watermarks:
+        watermarks = load_input_watermarks(week_start, entity_ids)
+    
+    full_build = entity_ids is None and not incremental
+    
+    if incremental:
+        stored = load_stored_watermarks(week_start, FEATURE_VERSION, entity_ids)
+        entity_ids = changed_entity_ids(watermarks, stored)
+        logger.info(f"Incremental: {len(entity_ids)} of {len(watermarks)} entities have changed inputs")
+        if not record_watermarks:
+            watermarks = {}
+    
+    computed = []
+    if entity_ids is None or entity_ids:
+        if workers > 1:
+            results = compute_features_parallel(week_start, entity_ids, batch, workers)
+        else:
+            results = compute_features_for_entities(week_start, entity_ids, batch)
+        
+        with feature_writer(write_batch_size) as writer:
+            for entity_id, features in results:
+                writer.add(feature_row(week_start, entity_id, features, watermarks.get(entity_id)))
+                computed.append((entity_id, features))
+        
+        if writer.rows_failed:
+            logger.error(f"Failed to store features for {writer.rows_failed} entities")
+    
+    if full_build:
+        computed.sort(key=lambda item: item[0])
+        matrix = WeekFeatureMatrix.from_feature_dicts(week_start, computed)
+    else:
+        matrix = WeekFeatureMatrix.from_db(week_start)
+    
+    if matrix_dir is not None:
+        matrix.stamp = stored_features_stamp(week_start, FEATURE_VERSION)
+        matrix.save(matrix_cache_path(week_start, FEATURE_VERSION, matrix_dir))
+    
+    logger.info(f"Completed feature building for {week_start} ({len(computed)} entities computed)")
+    return matrix
 
 
 def main():
     parser = argparse.ArgumentParser(description="Build weekly features")
-    parser.add_argument("--week_start", type=str, required=True, help="Week start (YYYY-MM-DD)")
+    parser.add_argument("--week_start", type=str, help="Week start (YYYY-MM-DD)")
+    parser.add_argument("--backfill", type=str, nargs=2, metavar=("START", "END"),
+                        help="Build every week from START to END (YYYY-MM-DD) in one sliding-window pass")
     parser.add_argument("--entity_id", type=str, help="Optional: specific entity ID")
+    parser.add_argument("--batch", action="store_true", help="Load all listing contexts with set-based queries")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default: 1, no pool)")
+    parser.add_argument("--incremental", action="store_true", help="Only recompute entities whose inputs changed")
+    parser.add_argument("--no_watermarks", action="store_true",
+                        help="Do not store input watermarks (the next --incremental run recomputes these entities)")
+    parser.add_argument("--write_batch_size", type=int, help="Feature rows per database write (default: DB_WRITE_BATCH_SIZE or 1000)")
+    parser.add_argument("--matrix_dir", type=str, help="Cache the week's feature matrix in this directory")
     args = parser.parse_args()
     
+    entity_ids = [args.entity_id] if args.entity_id else None
+    
+    if args.backfill:
+        from src.features.backfill import backfill_features
+        
+        start, end = (date.fromisoformat(value) for value in args.backfill)
+        backfill_features(start, end, entity_ids, write_batch_size=args.write_batch_size)
+        return
+    
+    if not args.week_start:
+        parser.error("one of --week_start or --backfill is required")
+    
     week_start = date.fromisoformat(args.week_start)
-    build_features_for_week(week_start)
+    build_features_for_week(
+        week_start, entity_ids, batch=args.batch, workers=args.workers, incremental=args.incremental,
+        write_batch_size=args.write_batch_size,
+        matrix_dir=Path(args.matrix_dir) if args.matrix_dir else None,
+        record_watermarks=not args.no_watermarks
+    )
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,353 @@
+"""
+Columnar feature matrix for one week.
+A WeekFeatureMatrix holds every entity's features as a float64 array with a
+fixed column order (FEATURE_NAMES), the entity ID of each row and a mask of
+values that were missing (absent or None in the feature dict). It is built
+by the feature pipeline, or loaded from entity_weekly_features or a cached
+.npz file, so consumers don't have to decode one JSON blob per entity.
+Cached files carry a stamp of the stored rows they were built from and are
+replaced when the stored features change (see stored_features_stamp).
+"""
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path("data/feature_matrices")
+
+# Column order of the matrix (feature version v1.0)
+FEATURE_NAMES = (
+    "demand_tiktok_views_7d",
+    "demand_tiktok_views_14d",
+    "demand_tiktok_views_28d",
+    "demand_tiktok_views_slope_4w",
+    "demand_amazon_bsr_median_top10",
+    "demand_amazon_bsr_improvement_4w",
+    "demand_amazon_review_velocity_4w",
+    "demand_cross_channel_alignment",
+    "comp_amazon_top10_review_median",
+    "comp_amazon_top10_review_p90",
+    "comp_amazon_concentration_hhi",
+    "comp_amazon_new_entrant_rate_4w",
+    "comp_price_dispersion",
+    "comp_price_compression_4w",
+    "comp_listing_quality_gap",
+    "econ_price_median",
+    "econ_price_trend_4w",
+    "econ_estimated_fba_fee_proxy",
+    "econ_shipping_risk_proxy",
+    "econ_cogs_proxy",
+    "econ_margin_proxy",
+    "risk_return_proxy",
+    "risk_regulatory_proxy",
+    "risk_ip_copyability_proxy",
+    "risk_hazmat_proxy",
+    "risk_seasonality_spike_proxy",
+    "nlp_neg_sentiment_rate",
+    "nlp_fixability_score",
+    "nlp_feature_request_rate",
+    "nlp_top_pain_point_score",
+    "dtc_new_product_count_4w",
+    "dtc_sold_out_rate_4w",
+    "dtc_price_premium_vs_amazon",
+)
+
+# Count-valued features, converted back to int by WeekFeatureMatrix.features()
+INTEGER_FEATURES = frozenset({
+    "demand_tiktok_views_7d",
+    "demand_tiktok_views_14d",
+    "demand_tiktok_views_28d",
+    "demand_amazon_bsr_median_top10",
+    "demand_amazon_review_velocity_4w",
+    "comp_amazon_top10_review_median",
+    "comp_amazon_top10_review_p90",
+    "dtc_new_product_count_4w",
+})
+
+
+@dataclass
+class WeekFeatureMatrix:
+    """
+    One week's features as a dense matrix.
+    
+    values[i, j] is feature feature_names[j] of entity entity_ids[i]; where
+    missing[i, j] is True the value is NaN and the entity's feature dict had
+    no (or a None) value for it. Both arrays are kept column-major, so
+    reading one feature for every entity is a contiguous scan. stamp is the
+    stored_features_stamp of the rows the matrix was built from, if known.
+    """
+    week_start: date
+    feature_version: str
+    entity_ids: np.ndarray
+    feature_names: Tuple[str, ...]
+    values: np.ndarray
+    missing: np.ndarray
+    stamp: Optional[str] = None
+    
+    def __post_init__(self):
+        self.values = np.asfortranarray(self.values, dtype=np.float64)
+        self.missing = np.asfortranarray(self.missing, dtype=bool)
+        self._columns = {name: j for j, name in enumerate(self.feature_names)}
+        self._rows = None
+    
+    def __len__(self) -> int:
+        return len(self.entity_ids)
+    
+    @classmethod
+    def from_feature_dicts(
+        cls,
+        week_start: date,
+        items: Iterable[Tuple[str, Dict[str, Any]]],
+        feature_version: Optional[str] = None,
+        feature_names: Tuple[str, ...] = FEATURE_NAMES
+    ) -> "WeekFeatureMatrix":
+        """
+        Build a matrix from (entity_id, features) pairs.
+        
+        Features not in feature_names are ignored.
+        
+        Args:
+            week_start: Week the features were built for
+            items: (entity_id, feature dict) pairs, e.g. from compute_features_for_entities
+            feature_version: Feature version (default: build_features.FEATURE_VERSION)
+            feature_names: Column order
+        
+        Returns:
+            WeekFeatureMatrix
+        """
+        if feature_version is None:
+            from src.features.build_features import FEATURE_VERSION
+            feature_version = FEATURE_VERSION
+        
+        entity_ids = []
+        rows = []
+        for entity_id, features in items:
+            entity_ids.append(entity_id)
+            rows.append([features.get(name) for name in feature_names])
+        
+        values = np.array(rows, dtype=np.float64).reshape(len(rows), len(feature_names))
+        return cls(
+            week_start=week_start,
+            feature_version=feature_version,
+            entity_ids=np.array(entity_ids, dtype=str),
+            feature_names=tuple(feature_names),
+            values=values,
+            missing=np.isnan(values),
+        )
+    
+    @classmethod
+    def from_db(
+        cls,
+        week_start: date,
+        feature_version: Optional[str] = None,
+        entity_ids: Optional[List[str]] = None
+    ) -> "WeekFeatureMatrix":
+        """
+        Load a week's stored features from entity_weekly_features.
+        
+        Args:
+            week_start: Week to load
+            feature_version: Feature version (default: build_features.FEATURE_VERSION)
+            entity_ids: Optional entity filter
+        
+        Returns:
+            WeekFeatureMatrix, rows ordered by entity_id
+        """
+        from src.features.build_features import FEATURE_VERSION
+        from src.features.listing_context import entity_filter
+        from src.utils.db import execute_query
+        from src.utils.query_helper import get_param_placeholder
+        
+        feature_version = feature_version or FEATURE_VERSION
+        param = get_param_placeholder()
+        entity_clause, entity_params = entity_filter("entity_id", entity_ids)
+        
+        rows = execute_query(f"""
+            SELECT entity_id, features
+            FROM entity_weekly_features
+            WHERE week_start = {param} AND feature_version = {param}
+                {entity_clause}
+            ORDER BY entity_id
+        """, (week_start, feature_version) + entity_params)
+        
+        return cls.from_feature_dicts(
+            week_start,
+            ((row['entity_id'], decode_features(row['features'])) for row in rows),
+            feature_version=feature_version
+        )
+    
+    @classmethod
+    def load(cls, path: Path) -> "WeekFeatureMatrix":
+        """
+        Load a matrix written by save().
+        
+        Args:
+            path: .npz file
+        
+        Returns:
+            WeekFeatureMatrix
+        """
+        with np.load(path, allow_pickle=False) as data:
+            stamp = str(data["stamp"]) if "stamp" in data.files else ""
+            return cls(
+                week_start=date.fromisoformat(str(data["week_start"])),
+                feature_version=str(data["feature_version"]),
+                entity_ids=data["entity_ids"],
+                feature_names=tuple(str(name) for name in data["feature_names"]),
+                values=data["values"],
+                missing=data["missing"],
+                stamp=stamp or None,
+            )
+    
+    def save(self, path: Path) -> None:
+        """
+        Write the matrix to a compressed .npz file.
+        
+        Args:
+            path: Output file (parent directories are created)
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write next to the target and rename, so readers never see a partial file
+        tmp_path = path.with_name(path.name + ".tmp.npz")
+        np.savez_compressed(
+            tmp_path,
+            week_start=np.array(self.week_start.isoformat()),
+            feature_version=np.array(self.feature_version),
+            entity_ids=self.entity_ids,
+            feature_names=np.array(self.feature_names, dtype=str),
+            values=self.values,
+            missing=self.missing,
+            stamp=np.array(self.stamp or ""),
+        )
+        tmp_path.replace(path)
+    
+    def column(self, name: str) -> np.ndarray:
+        """Values of one feature for every entity (NaN where missing)."""
+        return self.values[:, self._columns[name]]
+    
+    def row_index(self, entity_id: str) -> int:
+        """Row of an entity (KeyError if absent)."""
+        if self._rows is None:
+            self._rows = {entity_id: i for i, entity_id in enumerate(self.entity_ids.tolist())}
+        return self._rows[entity_id]
+    
+    def features(self, i: int) -> Dict[str, Any]:
+        """
+        Feature dict of row i, in the shape the feature pipeline produces.
+        
+        Missing values are left out, so dict.get defaults still apply.
+        
+        Args:
+            i: Row index
+        
+        Returns:
+            feature name -> value
+        """
+        features = {}
+        for j, name in enumerate(self.feature_names):
+            if self.missing[i, j]:
+                continue
+            value = self.values[i, j].item()
+            features[name] = int(value) if name in INTEGER_FEATURES else value
+        return features
+    
+    def iter_features(self) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        """Yield (entity_id, feature dict) for every row."""
+        for i, entity_id in enumerate(self.entity_ids.tolist()):
+            yield entity_id, self.features(i)
+
+
+def decode_features(value: Any) -> Dict[str, Any]:
+    """Decode a features column (JSON text on SQLite, already a dict from JSONB)."""
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def matrix_cache_path(week_start: date, feature_version: str, cache_dir: Path = DEFAULT_CACHE_DIR) -> Path:
+    """Cache file of a week's matrix."""
+    return Path(cache_dir) / f"{week_start.isoformat()}_{feature_version}.npz"
+
+
+def stored_features_stamp(week_start: date, feature_version: Optional[str] = None) -> str:
+    """
+    Fingerprint of a week's stored feature rows: row count and latest computed_at.
+    
+    Every feature write sets computed_at, so any rebuild, and any added or
+    removed row, changes the stamp. One aggregate query; no rows are read.
+    
+    Args:
+        week_start: Week of the features
+        feature_version: Feature version (default: build_features.FEATURE_VERSION)
+    
+    Returns:
+        "<row count>:<latest computed_at>"
+    """
+    from src.features.build_features import FEATURE_VERSION
+    from src.utils.db import execute_query
+    from src.utils.query_helper import get_param_placeholder
+    
+    param = get_param_placeholder()
+    rows = execute_query(f"""
+        SELECT COUNT(*) AS row_count, MAX(computed_at) AS computed_at
+        FROM entity_weekly_features
+        WHERE week_start = {param} AND feature_version = {param}
+    """, (week_start, feature_version or FEATURE_VERSION))
+    
+    return f"{rows[0]['row_count']}:{rows[0]['computed_at']}"
+
+
+def load_week_feature_matrix(
+    week_start: date,
+    feature_version: Optional[str] = None,
+    cache_dir: Optional[Path] = None,
+    stamp: Optional[str] = None
+) -> WeekFeatureMatrix:
+    """
+    Load a week's feature matrix, from the cache file if it is current.
+    
+    Without cache_dir the matrix is always read from the database. With it,
+    a cached file is used if its stamp matches the stored features;
+    otherwise (no file, or features rebuilt since it was written) the matrix
+    is read from the database and cached.
+    
+    Args:
+        week_start: Week to load
+        feature_version: Feature version (default: build_features.FEATURE_VERSION)
+        cache_dir: Optional cache directory (e.g. DEFAULT_CACHE_DIR)
+        stamp: stored_features_stamp of the week, if the caller already has it
+    
+    Returns:
+        WeekFeatureMatrix
+    """
+    from src.features.build_features import FEATURE_VERSION
+    
+    feature_version = feature_version or FEATURE_VERSION
+    
+    if cache_dir is None:
+        matrix = WeekFeatureMatrix.from_db(week_start, feature_version)
+        matrix.stamp = stamp
+        return matrix
+    
+    # Taken before reading the rows: a rebuild landing in between leaves the
+    # cache stamped as older than its contents, so the next load refreshes it
+    stamp = stamp or stored_features_stamp(week_start, feature_version)
+    path = matrix_cache_path(week_start, feature_version, cache_dir)
+    if path.exists():
+        matrix = WeekFeatureMatrix.load(path)
+        if matrix.stamp == stamp:
+            logger.info(f"Loading feature matrix from {path}")
+            return matrix
+        logger.info(f"Feature matrix cache {path} is out of date; reloading from the database")
+    
+    matrix = WeekFeatureMatrix.from_db(week_start, feature_version)
+    matrix.stamp = stamp
+    matrix.save(path)
+    logger.info(f"Cached feature matrix for {week_start} ({len(matrix)} entities) at {path}")
+    return matrix
@@ -0,0 +1,338 @@
+"""
+Week-scoped listing context for feature building.
+Loads everything the feature groups read (TikTok hashtag metrics, matched
+Amazon listings on week_start and week_start - 4 weeks, and recent reviews)
+once, either for one entity or for a whole week with a fixed number of set-based
+queries, so every feature group in build_features.py is a pure function of a
+ListingContext.
+"""
+import heapq
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Any, Optional, List, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Listings mapped to an entity through the materialized alias -> ASIN match table
+# (sql/003_entity_asin_map.sql), limited to the dates the listing matched the
+# alias (sql/009_entity_asin_map_dates.sql); filter with `em.entity_id = %s`
+ENTITY_LISTINGS_JOIN = """
+    FROM entity_asin_map em
+    JOIN amazon_listings_daily a ON a.asin = em.asin
+        AND a.dt >= em.first_matched_dt AND a.dt <= em.last_matched_dt
+"""
+
+TOP_N_LISTINGS = 10
+MAX_REVIEWS_PER_ENTITY = 100
+
+
+@dataclass
+class ListingContext:
+    """
+    Everything the feature groups need for one entity and week.
+    
+    Attributes:
+        entity_id: Entity UUID
+        week_start: Week the features are built for
+        tiktok_rows: tiktok_metrics_daily rows for the entity's TikTok aliases
+            over the 28 days before week_start, ordered by dt DESC, query
+        demand_rows: Top 10 matched listings by BSR over the 4 weeks before week_start
+        current_listings: All matched listings on week_start
+        old_listings: All matched listings on week_start - 4 weeks
+        reviews_by_asin: asin -> recent reviews (with text) for the top 10
+            listings on week_start; may cover other entities' ASINs too
+        tiktok_view_sums: Optional precomputed (7d, 14d, 28d) TikTok view
+            totals; if None they are summed from tiktok_rows
+    """
+    entity_id: str
+    week_start: date
+    tiktok_rows: List[Dict[str, Any]] = field(default_factory=list)
+    demand_rows: List[Dict[str, Any]] = field(default_factory=list)
+    current_listings: List[Dict[str, Any]] = field(default_factory=list)
+    old_listings: List[Dict[str, Any]] = field(default_factory=list)
+    reviews_by_asin: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    tiktok_view_sums: Optional[Tuple[int, int, int]] = None
+    
+    def top_listings(self, required_column: Optional[str] = None, n: int = None) -> List[Dict[str, Any]]:
+        """
+        Top n listings on week_start, equivalent to `ORDER BY bsr NULLS LAST, asin LIMIT n`.
+        
+        Args:
+            required_column: Only consider listings where this column is not NULL
+            n: Number of listings (default TOP_N_LISTINGS)
+        """
+        rows = self.current_listings
+        if required_column:
+            rows = [row for row in rows if row[required_column] is not None]
+        return heapq.nsmallest(n or TOP_N_LISTINGS, rows, key=_bsr_order)
+    
+    def recent_reviews(self, listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Most recent reviews of the given listings, equivalent to
+        `ORDER BY dt DESC, asin, review_id LIMIT MAX_REVIEWS_PER_ENTITY`.
+        """
+        from src.utils.query_helper import to_date
+        
+        reviews = []
+        for row in listings:
+            reviews.extend(self.reviews_by_asin.get(row['asin'], []))
+        reviews.sort(key=lambda r: (r['asin'], r['review_id']))
+        reviews.sort(key=lambda r: to_date(r['dt']), reverse=True)
+        return reviews[:MAX_REVIEWS_PER_ENTITY]
+
+
+def entity_filter(column: str, entity_ids: Optional[List[str]]) -> Tuple[str, tuple]:
+    """Build an optional `AND column IN (...)` filter."""
+    from src.utils.query_helper import convert_any_clause
+    
+    if not entity_ids:
+        return "", ()
+    clause, params = convert_any_clause(column, list(entity_ids))
+    return f"AND {clause}", params
+
+
+def _bsr_order(row: Dict[str, Any]) -> tuple:
+    """Sort key equivalent to `ORDER BY bsr NULLS LAST, asin`."""
+    return (row['bsr'] is None, row['bsr'] or 0, row['asin'])
+
+
+def load_entity_ids(entity_ids: Optional[List[str]] = None) -> List[str]:
+    """
+    Load the entity IDs to build features for.
+    
+    Args:
+        entity_ids: Optional list of entity IDs. If None, returns all entities.
+    
+    Returns:
+        List of entity IDs
+    """
+    from src.utils.db import execute_query
+    
+    entity_clause, entity_params = entity_filter("entity_id", entity_ids)
+    rows = execute_query(f"SELECT entity_id FROM entities WHERE 1 = 1 {entity_clause}", entity_params)
+    return [row['entity_id'] for row in rows]
+
+
+def load_tiktok_rows(week_start: date, entity_ids: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Load the 28-day TikTok hashtag window for every entity in one join.
+    
+    Args:
+        week_start: Week to compute features for
+        entity_ids: Optional entity filter
+    
+    Returns:
+        entity_id -> tiktok_metrics_daily rows, ordered by dt DESC, query
+    """
+    from src.utils.db import execute_query
+    from src.utils.query_helper import get_param_placeholder
+    
+    param = get_param_placeholder()
+    entity_clause, entity_params = entity_filter("ea.entity_id", entity_ids)
+    
+    query = f"""
+        SELECT ea.entity_id, t.dt, t.query, t.views, t.videos
+        FROM entity_aliases ea
+        JOIN tiktok_metrics_daily t ON t.query = ea.alias_text
+        WHERE ea.source = 'tiktok' AND t.query_type = 'hashtag'
+            AND t.dt >= {param} AND t.dt < {param}
+            {entity_clause}
+        ORDER BY ea.entity_id, t.dt DESC, t.query
+    """
+    rows = execute_query(query, (week_start - timedelta(days=28), week_start) + entity_params)
+    
+    by_entity = defaultdict(list)
+    for row in rows:
+        by_entity[row['entity_id']].append(row)
+    return by_entity
+
+
+def load_amazon_demand_rows(week_start: date, entity_ids: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Load each entity's top 10 listings by BSR over the 4 weeks before week_start.
+    
+    Args:
+        week_start: Week to compute features for
+        entity_ids: Optional entity filter
+    
+    Returns:
+        entity_id -> listing rows, ordered by BSR
+    """
+    from src.utils.db import execute_query
+    from src.utils.query_helper import get_param_placeholder
+    
+    param = get_param_placeholder()
+    entity_clause, entity_params = entity_filter("em.entity_id", entity_ids)
+    
+    query = f"""
+        SELECT entity_id, dt, asin, bsr, review_count
+        FROM (
+            SELECT m.entity_id, m.dt, m.asin, m.bsr, m.review_count,
+                ROW_NUMBER() OVER (
+                    PARTITION BY m.entity_id
+                    ORDER BY m.bsr NULLS LAST, m.dt DESC, m.asin
+                ) AS rn
+            FROM (
+                SELECT em.entity_id, a.dt, a.asin, a.bsr, a.review_count
+                {ENTITY_LISTINGS_JOIN}
+                WHERE a.dt >= {param} AND a.dt < {param}
+                    {entity_clause}
+            ) m
+        ) ranked
+        WHERE rn <= {TOP_N_LISTINGS}
+        ORDER BY entity_id, rn
+    """
+    rows = execute_query(query, (week_start - timedelta(weeks=4), week_start) + entity_params)
+    
+    by_entity = defaultdict(list)
+    for row in rows:
+        by_entity[row['entity_id']].append(row)
+    return by_entity
+
+
+def load_amazon_day_rows(
+    week_start: date,
+    entity_ids: Optional[List[str]] = None
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, List[Dict[str, Any]]]]:
+    """
+    Load every matched listing on week_start and on week_start - 4 weeks.
+    
+    Args:
+        week_start: Week to compute features for
+        entity_ids: Optional entity filter
+    
+    Returns:
+        (current, old): entity_id -> listing rows for each of the two days
+    """
+    from src.utils.db import execute_query
+    from src.utils.query_helper import get_param_placeholder, to_date
+    
+    param = get_param_placeholder()
+    entity_clause, entity_params = entity_filter("em.entity_id", entity_ids)
+    
+    query = f"""
+        SELECT em.entity_id, a.dt, a.asin, a.title, a.brand, a.category,
+            a.bsr, a.review_count, a.rating, a.price_usd, a.image_count,
+            a.video_flag, a.first_seen_date
+        {ENTITY_LISTINGS_JOIN}
+        WHERE a.dt IN ({param}, {param})
+            {entity_clause}
+    """
+    rows = execute_query(query, (week_start, week_start - timedelta(weeks=4)) + entity_params)
+    
+    current = defaultdict(list)
+    old = defaultdict(list)
+    for row in rows:
+        if to_date(row['dt']) == week_start:
+            current[row['entity_id']].append(row)
+        else:
+            old[row['entity_id']].append(row)
+    return current, old
+
+
+def load_review_rows(week_start: date, entity_ids: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Load recent reviews for every ASIN in some entity's top 10 listings on week_start.
+    
+    Args:
+        week_start: Week to compute features for
+        entity_ids: Optional entity filter
+    
+    Returns:
+        asin -> amazon_reviews_daily rows
+    """
+    from src.utils.db import execute_query
+    from src.utils.query_helper import get_param_placeholder
+    
+    param = get_param_placeholder()
+    entity_clause, entity_params = entity_filter("em.entity_id", entity_ids)
+    
+    query = f"""
+        SELECT r.asin, r.dt, r.review_id, r.review_text, r.rating
+        FROM amazon_reviews_daily r
+        WHERE r.dt >= {param} AND r.review_text IS NOT NULL
+            AND r.asin IN (
+                SELECT asin FROM (
+                    SELECT m.asin,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY m.entity_id
+                            ORDER BY m.bsr NULLS LAST, m.asin
+                        ) AS rn
+                    FROM (
+                        SELECT em.entity_id, a.asin, a.bsr
+                        {ENTITY_LISTINGS_JOIN}
+                        WHERE a.dt = {param}
+                            {entity_clause}
+                    ) m
+                ) ranked
+                WHERE rn <= {TOP_N_LISTINGS}
+            )
+    """
+    rows = execute_query(query, (week_start - timedelta(weeks=4), week_start) + entity_params)
+    
+    by_asin = defaultdict(list)
+    for row in rows:
+        by_asin[row['asin']].append(row)
+    return by_asin
+
+
+def _build_contexts(
+    week_start: date,
+    ids: List[str],
+    entity_ids: Optional[List[str]]
+) -> Dict[str, ListingContext]:
+    """Run the set-based loaders once and split their rows into per-entity contexts."""
+    tiktok = load_tiktok_rows(week_start, entity_ids)
+    demand = load_amazon_demand_rows(week_start, entity_ids)
+    current, old = load_amazon_day_rows(week_start, entity_ids)
+    reviews_by_asin = load_review_rows(week_start, entity_ids)
+    
+    return {
+        entity_id: ListingContext(
+            entity_id=entity_id,
+            week_start=week_start,
+            tiktok_rows=tiktok.get(entity_id, []),
+            demand_rows=demand.get(entity_id, []),
+            current_listings=current.get(entity_id, []),
+            old_listings=old.get(entity_id, []),
+            reviews_by_asin=reviews_by_asin,
+        )
+        for entity_id in ids
+    }
+
+
+def load_entity_context(entity_id: str, week_start: date) -> ListingContext:
+    """
+    Load one entity's listing context with four queries.
+    
+    Args:
+        entity_id: Entity UUID
+        week_start: Week to compute features for
+    
+    Returns:
+        ListingContext for the entity
+    """
+    return _build_contexts(week_start, [entity_id], [entity_id])[entity_id]
+
+
+def load_week_contexts(week_start: date, entity_ids: Optional[List[str]] = None) -> Dict[str, ListingContext]:
+    """
+    Load listing contexts for every entity in a week with set-based queries.
+    
+    The number of queries is fixed (one per input set) regardless of how many
+    entities there are.
+    
+    Args:
+        week_start: Week to compute features for
+        entity_ids: Optional list of entity IDs. If None, loads all entities.
+    
+    Returns:
+        entity_id -> ListingContext (entities with no data get empty contexts)
+    """
+    logger.info(f"Loading listing contexts for week {week_start}")
+    
+    ids = load_entity_ids(entity_ids)
+    return _build_contexts(week_start, ids, entity_ids)
@@ -0,0 +1,218 @@
+"""
+Per-entity input watermarks for incremental feature builds.
+A watermark summarizes the source rows an entity's features were built from:
+for each source, the latest dt, the row count and a checksum over the same
+windows ListingContext reads, plus a hash of the entity's alias set. If none of
+these changed since the stored features were built, recomputing the entity
+would give the same result.
+
+The checksum is the sum of a 32-bit hash of every row (query_helper.row_checksum_sql),
+taken over all the columns ListingContext loads, so any edit to a row (a retitle,
+a new category, rewritten review text) changes it and edits to different rows
+cannot cancel. It is computed by the database; only per-entity totals are read.
+"""
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Any, Optional, List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WATERMARK_SOURCES = ("amazon_listings", "amazon_reviews", "tiktok")
+
+# Columns hashed per row: everything ListingContext loads from each source
+LISTING_HASH_COLUMNS = ("asin", "dt", "title", "brand", "category", "bsr", "review_count", "rating",
+                        "price_usd", "image_count", "video_flag", "first_seen_date")
+REVIEW_HASH_COLUMNS = ("asin", "dt", "review_id", "review_text", "rating")
+TIKTOK_HASH_COLUMNS = ("query", "dt", "views", "videos")
+
+
+def _source_watermark(row: Dict[str, Any]) -> List[Any]:
+    """Normalize a (max_dt, row_count, checksum) aggregate row to a JSON-safe list."""
+    from src.utils.query_helper import to_date
+    
+    return [
+        to_date(row['max_dt']).isoformat(),
+        int(row['row_count']),
+        format(int(row['checksum']), "x"),
+    ]
+
+
+def alias_set_hash(aliases: List[Dict[str, Any]]) -> str:
+    """
+    Hash an entity's alias set, independent of row order.
+    
+    Args:
+        aliases: entity_aliases rows with source and alias_text
+    
+    Returns:
+        Hex digest
+    """
+    keys = sorted(f"{row['source']}:{row['alias_text']}" for row in aliases)
+    return hashlib.md5("\n".join(keys).encode("utf-8")).hexdigest()
+
+
+def empty_watermark(alias_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Watermark of an entity with no source rows (and no aliases if alias_hash is None)."""
+    return {
+        "aliases": alias_hash or alias_set_hash([]),
+        **{source: None for source in WATERMARK_SOURCES},
+    }
+
+
+def load_alias_hashes(entity_ids: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Hash every entity's alias set.
+    
+    Args:
+        entity_ids: Optional entity filter
+    
+    Returns:
+        entity_id -> alias_set_hash (entities without aliases are omitted)
+    """
+    from src.features.listing_context import entity_filter
+    from src.utils.db import execute_query
+    
+    entity_clause, entity_params = entity_filter("entity_id", entity_ids)
+    aliases_by_entity = defaultdict(list)
+    for row in execute_query(
+        f"SELECT entity_id, source, alias_text FROM entity_aliases WHERE 1 = 1 {entity_clause}",
+        entity_params
+    ):
+        aliases_by_entity[row['entity_id']].append(row)
+    
+    return {entity_id: alias_set_hash(aliases) for entity_id, aliases in aliases_by_entity.items()}
+
+
+def load_input_watermarks(week_start: date, entity_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Compute the current input watermark of every entity for a week.
+    
+    Uses one grouped query per source, covering the same windows and columns as
+    src/features/listing_context.py: listings on [week_start - 4 weeks, week_start],
+    reviews from week_start - 4 weeks, TikTok hashtags on [week_start - 28 days, week_start).
+    
+    Args:
+        week_start: Week to compute features for
+        entity_ids: Optional list of entity IDs. If None, covers all entities.
+    
+    Returns:
+        entity_id -> {"aliases": hash, "<source>": [max_dt, row_count, checksum] or None}
+    """
+    from src.features.listing_context import ENTITY_LISTINGS_JOIN, load_entity_ids, entity_filter
+    from src.utils.db import execute_query
+    from src.utils.query_helper import get_param_placeholder, row_checksum_sql
+    
+    param = get_param_placeholder()
+    four_weeks_ago = week_start - timedelta(weeks=4)
+    
+    alias_hashes = load_alias_hashes(entity_ids)
+    watermarks = {
+        entity_id: empty_watermark(alias_hashes.get(entity_id))
+        for entity_id in load_entity_ids(entity_ids)
+    }
+    
+    entity_clause, entity_params = entity_filter("em.entity_id", entity_ids)
+    listing_rows = execute_query(f"""
+        SELECT em.entity_id, MAX(a.dt) AS max_dt, COUNT(*) AS row_count,
+            SUM({row_checksum_sql([f"a.{column}" for column in LISTING_HASH_COLUMNS])}) AS checksum
+        {ENTITY_LISTINGS_JOIN}
+        WHERE a.dt >= {param} AND a.dt <= {param}
+            {entity_clause}
+        GROUP BY em.entity_id
+    """, (four_weeks_ago, week_start) + entity_params)
+    
+    review_rows = execute_query(f"""
+        SELECT em.entity_id, MAX(r.dt) AS max_dt, COUNT(*) AS row_count,
+            SUM({row_checksum_sql([f"r.{column}" for column in REVIEW_HASH_COLUMNS])}) AS checksum
+        FROM entity_asin_map em
+        JOIN amazon_reviews_daily r ON r.asin = em.asin
+        WHERE r.dt >= {param}
+            {entity_clause}
+        GROUP BY em.entity_id
+    """, (four_weeks_ago,) + entity_params)
+    
+    entity_clause, entity_params = entity_filter("ea.entity_id", entity_ids)
+    tiktok_rows = execute_query(f"""
+        SELECT ea.entity_id, MAX(t.dt) AS max_dt, COUNT(*) AS row_count,
+            SUM({row_checksum_sql([f"t.{column}" for column in TIKTOK_HASH_COLUMNS])}) AS checksum
+        FROM entity_aliases ea
+        JOIN tiktok_metrics_daily t ON t.query = ea.alias_text
+        WHERE ea.source = 'tiktok' AND t.query_type = 'hashtag'
+            AND t.dt >= {param} AND t.dt < {param}
+            {entity_clause}
+        GROUP BY ea.entity_id
+    """, (week_start - timedelta(days=28), week_start) + entity_params)
+    
+    for source, rows in (
+        ("amazon_listings", listing_rows),
+        ("amazon_reviews", review_rows),
+        ("tiktok", tiktok_rows),
+    ):
+        for row in rows:
+            if row['entity_id'] in watermarks:
+                watermarks[row['entity_id']][source] = _source_watermark(row)
+    
+    return watermarks
+
+
+def load_stored_watermarks(
+    week_start: date,
+    feature_version: str,
+    entity_ids: Optional[List[str]] = None
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Load the input watermarks recorded with each entity's stored features.
+    
+    Args:
+        week_start: Week the features were built for
+        feature_version: Feature version to match
+        entity_ids: Optional entity filter
+    
+    Returns:
+        entity_id -> watermark (None if the row predates watermarks)
+    """
+    from src.features.listing_context import entity_filter
+    from src.utils.db import execute_query
+    from src.utils.query_helper import get_param_placeholder
+    
+    param = get_param_placeholder()
+    entity_clause, entity_params = entity_filter("entity_id", entity_ids)
+    
+    rows = execute_query(f"""
+        SELECT entity_id, input_watermarks
+        FROM entity_weekly_features
+        WHERE week_start = {param} AND feature_version = {param}
+            {entity_clause}
+    """, (week_start, feature_version) + entity_params)
+    
+    stored = {}
+    for row in rows:
+        value = row['input_watermarks']
+        stored[row['entity_id']] = json.loads(value) if isinstance(value, str) else value
+    return stored
+
+
+def changed_entity_ids(
+    current: Dict[str, Dict[str, Any]],
+    stored: Dict[str, Optional[Dict[str, Any]]]
+) -> List[str]:
+    """
+    Entities whose inputs changed since their features were stored.
+    
+    Entities without stored features, or stored without a watermark, count as changed.
+    
+    Args:
+        current: Output of load_input_watermarks
+        stored: Output of load_stored_watermarks
+    
+    Returns:
+        Entity IDs to recompute, in the order of current
+    """
+    return [
+        entity_id for entity_id, watermark in current.items()
+        if stored.get(entity_id) != watermark
+    ]
@@ -6,13 +6,12 @@ import argparse
 import json
 import logging
 import os
-import re
 import time
 from datetime import date, datetime
 from typing import Optional, List, Dict, Any
 import requests
-from bs4 import BeautifulSoup
 from src.utils.db import get_db_cursor, execute_query
+from src.utils.entity_resolution import rebuild_entity_asin_map
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,12 +20,31 @@ logger = logging.getLogger(__name__)
 RATE_LIMIT_DELAY = 0.5  # seconds between requests
 MAX_RETRIES = 3
 RETRY_DELAY = 2  # seconds between retries
+PARSE_QUEUE_SIZE = 64  # fetched pages waiting for a parser
+
+# fetch_listing_pages marker: the listing is the same as at its last store
+UNCHANGED = object()
 
 # Amazon Product Advertising API (optional - set in environment)
 AMAZON_API_ACCESS_KEY = os.getenv("AMAZON_API_ACCESS_KEY")
 AMAZON_API_SECRET_KEY = os.getenv("AMAZON_API_SECRET_KEY")
 AMAZON_API_ASSOCIATE_TAG = os.getenv("AMAZON_API_ASSOCIATE_TAG")
 
+AMAZON_PRODUCT_URL = "https://www.amazon.com/dp/{asin}"
+
+# Headers to mimic a browser
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',  # no brotli decoder installed
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+}
+
 
 def fetch_amazon_via_api(asin: str) -> Optional[Dict[str, Any]]:
     """
@@ -34,7 +52,7 @@ def fetch_amazon_via_api(asin: str) -> Optional[Dict[str, Any]]:
     
     Args:
         asin: Amazon ASIN
-        
+    
     Returns:
         Dictionary with listing data or None
     """
@@ -45,14 +63,37 @@ def fetch_amazon_via_api(asin: str) -> Optional[Dict[str, Any]]:
     return None
 
 
-def fetch_amazon_listing_page(asin: str, use_api: bool = False) -> Optional[Dict[str, Any]]:
+def parse_listing_page(asin: str, html, parser: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extract listing fields from an Amazon product page.
+    
+    Args:
+        asin: Amazon ASIN
+        html: Page HTML (bytes or str)
+        parser: Parser backend, 'lxml' or 'bs4' (default: config
+            ingestion.amazon.parser, else lxml; see amazon_parser.py)
+    
+    Returns:
+        Dictionary with listing data
+    """
+    from src.ingest.amazon_parser import get_listing_parser
+    
+    return get_listing_parser(parser)(asin, html)
+
+
+def fetch_amazon_listing_page(
+    asin: str,
+    use_api: bool = False,
+    url_template: str = AMAZON_PRODUCT_URL
+) -> Optional[Dict[str, Any]]:
     """
     Fetch a single Amazon listing page using web scraping or API.
     
     Args:
         asin: Amazon ASIN
         use_api: If True and API credentials available, use Product Advertising API
-        
+        url_template: Product page URL with an {asin} placeholder
+    
     Returns:
         Dictionary with listing data or None
     """
@@ -65,134 +106,17 @@ def fetch_amazon_listing_page(asin: str, use_api: bool = False) -> Optional[Dict
     # Otherwise use web scraping
     time.sleep(RATE_LIMIT_DELAY)  # Rate limiting
     
-    url = f"https://www.amazon.com/dp/{asin}"
-    
-    # Headers to mimic a browser
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-    }
+    url = url_template.format(asin=asin)
     
-    # Retry logic
+    # Retry logic (network only; a page that fails to parse is not refetched)
+    html = None
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
+            response = requests.get(url, headers=BROWSER_HEADERS, timeout=15, allow_redirects=True)
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract title
-            title_elem = soup.find('span', {'id': 'productTitle'})
-            title = title_elem.get_text(strip=True) if title_elem else None
-            
-            # Extract brand
-            brand_elem = soup.find('a', {'id': 'brand'}) or soup.find('span', class_='po-brand')
-            brand = brand_elem.get_text(strip=True) if brand_elem else None
-            if not brand:
-                # Try to extract from title or other places
-                brand = "Unknown"
-            
-            # Extract price
-            price = None
-            price_elem = soup.find('span', {'id': 'priceblock_ourprice'}) or \
-                         soup.find('span', {'id': 'priceblock_dealprice'}) or \
-                         soup.find('span', class_='a-price-whole')
-            if price_elem:
-                price_text = price_elem.get_text(strip=True)
-                # Extract numeric price
-                price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
-                if price_match:
-                    try:
-                        price = float(price_match.group().replace(',', ''))
-                    except ValueError:
-                        pass
-            
-            # Extract rating
-            rating = None
-            rating_elem = soup.find('span', {'id': 'acrPopover'}) or \
-                         soup.find('span', class_='a-icon-alt')
-            if rating_elem:
-                rating_text = rating_elem.get_text(strip=True)
-                rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-                if rating_match:
-                    try:
-                        rating = float(rating_match.group(1))
-                    except ValueError:
-                        pass
-            
-            # Extract review count
-            review_count = 0
-            review_elem = soup.find('span', {'id': 'acrCustomerReviewText'})
-            if review_elem:
-                review_text = review_elem.get_text(strip=True)
-                review_match = re.search(r'([\d,]+)', review_text.replace(',', ''))
-                if review_match:
-                    try:
-                        review_count = int(review_match.group().replace(',', ''))
-                    except ValueError:
-                        pass
-            
-            # Extract BSR (Best Seller Rank)
-            bsr = None
-            bsr_elem = soup.find('span', string=re.compile(r'Best Sellers Rank'))
-            if bsr_elem:
-                bsr_text = bsr_elem.find_next('span').get_text(strip=True) if bsr_elem.find_next('span') else ''
-                bsr_match = re.search(r'#([\d,]+)', bsr_text.replace(',', ''))
-                if bsr_match:
-                    try:
-                        bsr = int(bsr_match.group(1).replace(',', ''))
-                    except ValueError:
-                        pass
-            
-            # Extract category
-            category = None
-            category_elem = soup.find('a', {'id': 'wayfinding-breadcrumbs_feature_div'})
-            if category_elem:
-                categories = category_elem.find_all('a', class_='a-link-normal')
-                if categories:
-                    category = categories[-1].get_text(strip=True)
-            
-            # Check for Prime
-            prime_flag = bool(soup.find('span', {'id': 'primeBadge_feature_div'}))
-            
-            # Check for coupon
-            coupon_flag = bool(soup.find('span', string=re.compile(r'coupon|save', re.I)))
-            
-            # Count images
-            image_elements = soup.find_all('img', {'id': re.compile(r'landingImage|main-image')})
-            image_count = len(image_elements)
-            
-            # Check for video
-            video_flag = bool(soup.find('div', {'id': 'dv-action-box-video-container'}))
-            
-            # Check seller count (simplified - would need more parsing)
-            seller_count = 1  # Default to 1, would need to check "Ships from and sold by" vs "Fulfilled by Amazon"
-            
-            result = {
-                "asin": asin,
-                "title": title or f"Product {asin}",
-                "brand": brand or "Unknown",
-                "category": category or "Unknown",
-                "price": price,
-                "coupon_flag": coupon_flag,
-                "bsr": bsr,
-                "rating": rating,
-                "review_count": review_count,
-                "seller_count": seller_count,
-                "prime_flag": prime_flag,
-                "image_count": image_count,
-                "video_flag": video_flag,
-            }
-            
-            return result  # Success, return result
-            
+            html = response.content
+            break
+        
         except requests.exceptions.RequestException as e:
             if attempt < MAX_RETRIES - 1:
                 logger.warning(f"Request failed for ASIN {asin} (attempt {attempt + 1}/{MAX_RETRIES}): {e}")
@@ -200,11 +124,15 @@ def fetch_amazon_listing_page(asin: str, use_api: bool = False) -> Optional[Dict
             else:
                 logger.error(f"Request failed for ASIN {asin} after {MAX_RETRIES} attempts: {e}")
                 return None
-        except Exception as e:
-            logger.error(f"Error parsing Amazon page for ASIN {asin}: {e}")
-            return None
-    else:
+    
+    if html is None:
         return None  # All retries exhausted
+    
+    try:
+        return parse_listing_page(asin, html)
+    except Exception as e:
+        logger.error(f"Error parsing Amazon page for ASIN {asin}: {e}")
+        return None
 
 
 def store_listing_raw(dt: date, asin: str, raw_data: Dict[str, Any]) -> None:
@@ -236,6 +164,9 @@ def parse_and_store_listing(dt: date, asin: str, raw_data: Dict[str, Any]) -> No
     """
     Parse raw listing data and store in staging table.
     
+    Alias matches are not updated here; callers map what they stored in
+    chunks with map_stored_listings.
+    
     Args:
         dt: Date
         asin: ASIN
@@ -352,14 +283,380 @@ def parse_and_store_listing(dt: date, asin: str, raw_data: Dict[str, Any]) -> No
     logger.debug(f"Stored listing for {asin} on {dt}")
 
 
-def fetch_amazon_listings(dt: date, asins: Optional[List[str]] = None) -> None:
+def map_stored_listings(dt: date, asins: List[str]) -> None:
+    """
+    Keep the alias -> ASIN match table current for listings just stored under dt.
+    
+    New and retitled listings are matched against every Amazon alias with one
+    set-based rebuild_entity_asin_map per LOAD_CHUNK_SIZE ASINs, instead of a
+    match query and upsert per listing.
+    
+    Args:
+        dt: Date the listings were stored under
+        asins: Stored ASINs
+    """
+    from src.ingest.change_detection import LOAD_CHUNK_SIZE
+    
+    for i in range(0, len(asins), LOAD_CHUNK_SIZE):
+        rebuild_entity_asin_map(dt, asins[i:i + LOAD_CHUNK_SIZE])
+
+
+def carry_forward_listings(dt: date, asins: List[str]) -> set:
+    """
+    Copy unchanged listings' latest amazon_listings_daily rows to dt.
+    
+    Replaces parsing and upserting a page whose fields did not change; one
+    INSERT ... SELECT per chunk of ASINs. The carried rows' alias matches are
+    extended to dt, as map_stored_listings does for parsed ones.
+    
+    Args:
+        dt: Date to store the listings under
+        asins: Unchanged ASINs
+    
+    Returns:
+        ASINs that now have a row for dt (those without an earlier row are missing)
+    """
+    from src.utils.query_helper import convert_any_clause, get_param_placeholder
+    from src.ingest.change_detection import LOAD_CHUNK_SIZE
+    
+    param = get_param_placeholder()
+    carried = set()
+    for i in range(0, len(asins), LOAD_CHUNK_SIZE):
+        chunk = asins[i:i + LOAD_CHUNK_SIZE]
+        clause, params = convert_any_clause("d.asin", chunk)
+        with get_db_cursor() as cur:
+            cur.execute(f"""
+                INSERT INTO amazon_listings_daily (
+                    dt, asin, title, brand, category, price_usd, coupon_flag,
+                    bsr, rating, review_count, seller_count, prime_flag,
+                    image_count, video_flag, first_seen_date, last_seen_date
+                )
+                SELECT {param}, d.asin, d.title, d.brand, d.category, d.price_usd, d.coupon_flag,
+                       d.bsr, d.rating, d.review_count, d.seller_count, d.prime_flag,
+                       d.image_count, d.video_flag, d.first_seen_date, {param}
+                FROM amazon_listings_daily d
+                WHERE {clause}
+                  AND d.dt = (SELECT MAX(prev.dt) FROM amazon_listings_daily prev
+                              WHERE prev.asin = d.asin AND prev.dt <= {param})
+                ON CONFLICT (dt, asin) DO UPDATE SET last_seen_date = excluded.last_seen_date
+            """, (dt, dt) + params + (dt,))
+        
+        rebuild_entity_asin_map(dt, chunk)
+        
+        clause, params = convert_any_clause("asin", chunk)
+        rows = execute_query(f"SELECT asin FROM amazon_listings_daily WHERE dt = {param} AND {clause}",
+                             (dt,) + params)
+        carried.update(row["asin"] for row in rows or [])
+    return carried
+
+
+def amazon_fetch_settings() -> Dict[str, Any]:
+    """
+    Fetch settings from config.yaml's ingestion.amazon section.
+    
+    Returns:
+        concurrency, rate_limit_per_second, max_retries, parse_workers and
+        parse_queue_size
+    """
+    from src.utils.config import get_setting
+    from src.ingest.fetch_engine import DEFAULT_CONCURRENCY
+    
+    return {
+        "concurrency": int(get_setting("ingestion", "amazon", "concurrency", default=DEFAULT_CONCURRENCY)),
+        "rate_limit_per_second": float(get_setting("ingestion", "amazon", "rate_limit_per_second",
+                                                   default=1 / RATE_LIMIT_DELAY)),
+        "max_retries": int(get_setting("ingestion", "amazon", "max_retries", default=MAX_RETRIES)),
+        "parse_workers": int(get_setting("ingestion", "amazon", "parse_workers", default=os.cpu_count() or 1)),
+        "parse_queue_size": int(get_setting("ingestion", "amazon", "parse_queue_size", default=PARSE_QUEUE_SIZE)),
+    }
+
+
+def _parse_listing_page_safely(asin: str, html: bytes) -> Optional[Dict[str, Any]]:
+    """parse_listing_page for pool workers: logs and returns None instead of raising."""
+    try:
+        return parse_listing_page(asin, html)
+    except Exception as e:
+        logger.error(f"Error parsing Amazon page for ASIN {asin}: {e}")
+        return None
+
+
+async def fetch_listing_pages(
+    asins: List[str],
+    concurrency: Optional[int] = None,
+    rate_limit_per_second: Optional[float] = None,
+    url_template: str = AMAZON_PRODUCT_URL,
+    parse_workers: Optional[int] = None,
+    parse_queue_size: Optional[int] = None,
+    dt: Optional[date] = None,
+    page_store=None,
+    validators: Optional[Dict[str, Any]] = None
+):
+    """
+    Fetch and parse listing pages as a two-stage pipeline.
+    
+    The fetch stage (asyncio) only downloads raw HTML and puts it on a
+    bounded queue; parsers hand each page to a process pool. When parsing
+    (or the caller) falls behind, the queues fill up and the fetch stage
+    stops taking new ASINs, so memory stays bounded while both stages are
+    kept busy.
+    
+    With validators (see change_detection.py), requests are conditional and
+    a listing is reported as UNCHANGED, without parsing when the server
+    answers 304 or the body hash matches, or after parsing when the parsed
+    fields match. `validators` is updated in place with the validators of
+    this fetch.
+    
+    Args:
+        asins: ASINs to fetch
+        concurrency: Requests in flight (default: config)
+        rate_limit_per_second: Requests per second per host (default: config)
+        url_template: Product page URL with an {asin} placeholder
+        parse_workers: Parser processes (default: config, else CPU count);
+            0 parses in the event loop
+        parse_queue_size: Pages buffered between the stages (default: config)
+        dt: Fetch date pages are archived under
+        page_store: PageStore to archive fetched HTML in (None: not archived)
+        validators: ASIN -> FetchValidator of the last stored fetch (None: fetch in full)
+    
+    Yields:
+        (asin, listing data, UNCHANGED or None), in completion order
+    """
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor
+    from src.ingest.fetch_engine import AsyncFetcher
+    from src.ingest.page_store import archive_page, archive_unchanged
+    from src.ingest.change_detection import content_hash, record_hash, response_validator
+    
+    settings = amazon_fetch_settings()
+    parse_workers = settings["parse_workers"] if parse_workers is None else parse_workers
+    queue_size = parse_queue_size or settings["parse_queue_size"]
+    fetcher = AsyncFetcher(
+        concurrency=concurrency or settings["concurrency"],
+        rate_limit_per_second=settings["rate_limit_per_second"] if rate_limit_per_second is None else rate_limit_per_second,
+        max_retries=settings["max_retries"],
+        retry_delay=RETRY_DELAY,
+        headers=BROWSER_HEADERS,
+    )
+    
+    loop = asyncio.get_running_loop()
+    pages = asyncio.Queue(maxsize=queue_size)
+    parsed = asyncio.Queue(maxsize=queue_size)
+    done = object()
+    # Enough parsers to keep every worker process busy while results are handed back
+    num_parsers = max(1, 2 * parse_workers)
+    pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+    
+    def request(asin: str) -> tuple:
+        url = url_template.format(asin=asin)
+        previous = validators.get(asin) if validators is not None else None
+        return (asin, url, previous.conditional_headers()) if previous is not None else (asin, url)
+    
+    async def end_of_pages() -> None:
+        for _ in range(num_parsers):
+            await pages.put(done)
+    
+    async def fetch_stage() -> None:
+        try:
+            async with fetcher:
+                async for result in fetcher.fetch_all(request(asin) for asin in asins):
+                    await pages.put(result)
+        except Exception:
+            # Let the parsers drain and stop; the error is re-raised to the caller
+            await end_of_pages()
+            raise
+        await end_of_pages()
+    
+    async def parse_stage() -> None:
+        while True:
+            result = await pages.get()
+            if result is done:
+                break
+            listing = None
+            previous = validators.get(result.key) if validators is not None else None
+            if result.not_modified and previous is not None:
+                listing = UNCHANGED
+                if page_store is not None:
+                    await loop.run_in_executor(None, archive_unchanged, page_store, "amazon", result.key, dt,
+                                               previous.content_hash)
+            elif result.ok:
+                if page_store is not None:
+                    await loop.run_in_executor(None, archive_page, page_store, "amazon", result.key, dt,
+                                               result.body, (result.headers or {}).get("Content-Type"))
+                body_hash = content_hash(result.body) if validators is not None else None
+                if previous is not None and body_hash == previous.content_hash:
+                    listing = UNCHANGED
+                    validators[result.key] = response_validator(result.headers, body_hash, previous.record_hash,
+                                                                previous.changed_dt)
+                elif pool is None:
+                    listing = _parse_listing_page_safely(result.key, result.body)
+                else:
+                    try:
+                        listing = await loop.run_in_executor(pool, _parse_listing_page_safely, result.key, result.body)
+                    except Exception as e:
+                        logger.error(f"Error parsing Amazon page for ASIN {result.key}: {e}")
+                
+                if validators is not None and listing is not None and listing is not UNCHANGED:
+                    parsed_hash = record_hash(listing)
+                    unchanged = previous is not None and parsed_hash == previous.record_hash
+                    validators[result.key] = response_validator(result.headers, body_hash, parsed_hash,
+                                                                previous.changed_dt if unchanged else dt)
+                    if unchanged:
+                        listing = UNCHANGED
+            await parsed.put((result.key, listing))
+        await parsed.put(done)
+    
+    tasks = [asyncio.ensure_future(fetch_stage())]
+    tasks += [asyncio.ensure_future(parse_stage()) for _ in range(num_parsers)]
+    try:
+        finished = 0
+        while finished < num_parsers:
+            item = await parsed.get()
+            if item is done:
+                finished += 1
+                continue
+            yield item
+        await tasks[0]  # surface fetch stage errors
+    finally:
+        for task in tasks:
+            task.cancel()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def store_listing(dt: date, asin: str, raw_data: Dict[str, Any]) -> None:
+    """Store one fetched listing in the raw and staging tables."""
+    # Store raw
+    store_listing_raw(dt, asin, raw_data)
+    # Parse and store staging
+    parse_and_store_listing(dt, asin, raw_data)
+
+
+async def fetch_and_store_listings(
+    dt: date,
+    asins: List[str],
+    concurrency: Optional[int] = None,
+    url_template: str = AMAZON_PRODUCT_URL,
+    parse_workers: Optional[int] = None,
+    page_store=None,
+    conditional: bool = False
+) -> int:
+    """
+    Fetch listing pages concurrently and store each one as it is parsed.
+    
+    Database writes run on one background thread, so they don't stall
+    the event loop driving the fetches. Alias matches of the stored listings
+    are updated every LOAD_CHUNK_SIZE listings. With `conditional`, requests carry
+    the validators of each ASIN's last stored fetch; unchanged listings are
+    not parsed or upserted but carried forward from their latest row.
+    
+    Args:
+        dt: Date to store the listings under
+        asins: ASINs to fetch
+        concurrency: Requests in flight (default: config)
+        url_template: Product page URL with an {asin} placeholder
+        parse_workers: Parser processes (default: config, else CPU count)
+        page_store: PageStore to archive fetched HTML in (None: not archived)
+        conditional: Use and update fetch_validators (skip unchanged listings)
+    
+    Returns:
+        Number of listings stored (including carried forward ones)
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from src.ingest.change_detection import load_validators, save_validators, clear_validators, LOAD_CHUNK_SIZE
+    
+    loop = asyncio.get_running_loop()
+    stored = 0
+    unchanged = []
+    unmapped = []
+    stored_validators = {}
+    
+    async def map_unmapped() -> None:
+        try:
+            await loop.run_in_executor(db_thread, map_stored_listings, dt, list(unmapped))
+        except Exception as e:
+            logger.error(f"Error matching {len(unmapped)} stored listings to entities: {e}")
+        unmapped.clear()
+    
+    with ThreadPoolExecutor(max_workers=1) as db_thread:
+        validators = None
+        if conditional:
+            validators = await loop.run_in_executor(db_thread, load_validators, "amazon", asins, dt)
+        
+        async for asin, raw_data in fetch_listing_pages(asins, concurrency, url_template=url_template,
+                                                        parse_workers=parse_workers, dt=dt,
+                                                        page_store=page_store, validators=validators):
+            try:
+                if raw_data is UNCHANGED:
+                    unchanged.append(asin)
+                elif raw_data:
+                    await loop.run_in_executor(db_thread, store_listing, dt, asin, raw_data)
+                    stored += 1
+                    unmapped.append(asin)
+                    if validators is not None:
+                        stored_validators[asin] = validators[asin]
+                    if len(unmapped) >= LOAD_CHUNK_SIZE:
+                        await map_unmapped()
+                else:
+                    logger.warning(f"Failed to fetch listing for {asin}")
+            except Exception as e:
+                logger.error(f"Error processing ASIN {asin}: {e}")
+                continue
+        
+        if unmapped:
+            await map_unmapped()
+        
+        if unchanged:
+            try:
+                carried = await loop.run_in_executor(db_thread, carry_forward_listings, dt, unchanged)
+                stored += len(carried)
+                stored_validators.update((asin, validators[asin]) for asin in carried)
+                missing = [asin for asin in unchanged if asin not in carried]
+                if missing:
+                    # Refetched in full next time
+                    logger.warning(f"No earlier listing row to carry forward for {len(missing)} unchanged ASINs")
+                    await loop.run_in_executor(db_thread, clear_validators, "amazon", missing)
+            except Exception as e:
+                logger.error(f"Error carrying forward {len(unchanged)} unchanged listings: {e}")
+        
+        if stored_validators:
+            try:
+                await loop.run_in_executor(db_thread, save_validators, "amazon", stored_validators)
+            except Exception as e:
+                logger.error(f"Error saving fetch validators: {e}")
+    
+    if conditional:
+        logger.info(f"{len(unchanged)}/{len(asins)} Amazon listings unchanged since their last fetch")
+    return stored
+
+
+def fetch_amazon_listings(
+    dt: date,
+    asins: Optional[List[str]] = None,
+    concurrency: Optional[int] = None,
+    parse_workers: Optional[int] = None,
+    conditional: Optional[bool] = None
+) -> None:
     """
     Fetch Amazon listings for given date and ASINs.
     
+    Pages are fetched concurrently, rate limited per config.yaml's
+    ingestion.amazon settings, and parsed in a process pool. The HTML is
+    archived in the page store (ingestion.page_store) for re-parsing.
+    Requests are conditional and unchanged listings are carried forward
+    instead of re-parsed (ingestion.conditional_fetch).
+    
     Args:
         dt: Date to fetch data for
         asins: Optional list of ASINs to fetch. If None, uses seed list.
+        concurrency: Requests in flight (default: ingestion.amazon.concurrency)
+        parse_workers: Parser processes (default: ingestion.amazon.parse_workers, else CPU count)
+        conditional: Skip unchanged listings (default: ingestion.conditional_fetch)
     """
+    import asyncio
+    from src.ingest.page_store import get_page_store
+    from src.ingest.change_detection import conditional_fetch_enabled
+    
     logger.info(f"Fetching Amazon listings for {dt}")
     
     if asins is None:
@@ -368,20 +665,11 @@ def fetch_amazon_listings(dt: date, asins: Optional[List[str]] = None) -> None:
         logger.warning("No ASINs provided. Use --asins flag or configure seed list.")
         return
     
-    for asin in asins:
-        try:
-            # Fetch raw data
-            raw_data = fetch_amazon_listing_page(asin)
-            if raw_data:
-                # Store raw
-                store_listing_raw(dt, asin, raw_data)
-                # Parse and store staging
-                parse_and_store_listing(dt, asin, raw_data)
-            else:
-                logger.warning(f"Failed to fetch listing for {asin}")
-        except Exception as e:
-            logger.error(f"Error processing ASIN {asin}: {e}")
-            continue
+    if conditional is None:
+        conditional = conditional_fetch_enabled()
+    stored = asyncio.run(fetch_and_store_listings(dt, asins, concurrency, parse_workers=parse_workers,
+                                                  page_store=get_page_store(), conditional=conditional))
+    logger.info(f"Stored {stored}/{len(asins)} Amazon listings for {dt}")
 
 
 def fetch_amazon_reviews(dt: date, asins: List[str], max_reviews_per_asin: int = 50) -> None:
@@ -411,10 +699,15 @@ def main():
     parser.add_argument("--dt", type=str, required=True, help="Date (YYYY-MM-DD)")
     parser.add_argument("--asins", type=str, nargs="+", help="Optional ASINs to fetch")
     parser.add_argument("--reviews", action="store_true", help="Also fetch reviews")
+    parser.add_argument("--concurrency", type=int, help="Requests in flight (default: config)")
+    parser.add_argument("--parse_workers", type=int, help="Parser processes (default: config, else CPU count)")
+    parser.add_argument("--full", action="store_true",
+                        help="Fetch, parse and store every listing, ignoring unchanged-page validators")
     args = parser.parse_args()
     
     dt = date.fromisoformat(args.dt)
-    fetch_amazon_listings(dt, args.asins)
+    fetch_amazon_listings(dt, args.asins, concurrency=args.concurrency, parse_workers=args.parse_workers,
+                          conditional=False if args.full else None)
     
     if args.reviews and args.asins:
         fetch_amazon_reviews(dt, args.asins)
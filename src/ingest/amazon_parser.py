@@ -0,0 +1,388 @@
+"""
+Amazon product page parsers.
+Two backends extract the same listing fields from a product page:
+  - "lxml": parses with libxml2 and collects the needed nodes in one pass
+    over the tree (fast; default when lxml is installed)
+  - "bs4": the original BeautifulSoup/html.parser implementation, kept as
+    the reference the lxml backend is tested against (tests/fixtures/amazon)
+Both backends collect the raw texts and flags of a page and share
+listing_from_fields, so numbers are extracted the same way.
+"""
+import logging
+import re
+from typing import Dict, Any, Optional, Callable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARSER = "lxml"
+
+PRICE_PATTERN = re.compile(r'[\d,]+\.?\d*')
+RATING_PATTERN = re.compile(r'(\d+\.?\d*)')
+REVIEW_COUNT_PATTERN = re.compile(r'([\d,]+)')
+BSR_PATTERN = re.compile(r'#([\d,]+)')
+BSR_LABEL_PATTERN = re.compile(r'Best Sellers Rank')
+COUPON_PATTERN = re.compile(r'coupon|save', re.I)
+IMAGE_ID_PATTERN = re.compile(r'landingImage|main-image')
+
+
+def listing_from_fields(
+    asin: str,
+    title: Optional[str],
+    brand: Optional[str],
+    price_text: Optional[str],
+    rating_text: Optional[str],
+    review_text: Optional[str],
+    bsr_text: Optional[str],
+    category: Optional[str],
+    prime_flag: bool,
+    coupon_flag: bool,
+    image_count: int,
+    video_flag: bool
+) -> Dict[str, Any]:
+    """
+    Build the listing dict from a page's extracted texts.
+    
+    Args:
+        asin: Amazon ASIN
+        title, brand, category: Element texts (None if the element is missing)
+        price_text, rating_text, review_text, bsr_text: Texts numbers are read from
+        prime_flag, coupon_flag, video_flag: Whether the marker elements exist
+        image_count: Number of product images
+    
+    Returns:
+        Dictionary with listing data
+    """
+    # Extract numeric price
+    price = None
+    if price_text is not None:
+        price_match = PRICE_PATTERN.search(price_text.replace(',', ''))
+        if price_match:
+            try:
+                price = float(price_match.group().replace(',', ''))
+            except ValueError:
+                pass
+    
+    rating = None
+    if rating_text is not None:
+        rating_match = RATING_PATTERN.search(rating_text)
+        if rating_match:
+            try:
+                rating = float(rating_match.group(1))
+            except ValueError:
+                pass
+    
+    review_count = 0
+    if review_text is not None:
+        review_match = REVIEW_COUNT_PATTERN.search(review_text.replace(',', ''))
+        if review_match:
+            try:
+                review_count = int(review_match.group().replace(',', ''))
+            except ValueError:
+                pass
+    
+    bsr = None
+    if bsr_text is not None:
+        bsr_match = BSR_PATTERN.search(bsr_text.replace(',', ''))
+        if bsr_match:
+            try:
+                bsr = int(bsr_match.group(1).replace(',', ''))
+            except ValueError:
+                pass
+    
+    # Check seller count (simplified - would need more parsing)
+    seller_count = 1  # Default to 1, would need to check "Ships from and sold by" vs "Fulfilled by Amazon"
+    
+    return {
+        "asin": asin,
+        "title": title or f"Product {asin}",
+        "brand": brand or "Unknown",
+        "category": category or "Unknown",
+        "price": price,
+        "coupon_flag": coupon_flag,
+        "bsr": bsr,
+        "rating": rating,
+        "review_count": review_count,
+        "seller_count": seller_count,
+        "prime_flag": prime_flag,
+        "image_count": image_count,
+        "video_flag": video_flag,
+    }
+
+
+def parse_listing_page_bs4(asin: str, html) -> Dict[str, Any]:
+    """
+    Extract listing fields with BeautifulSoup (html.parser).
+    
+    Args:
+        asin: Amazon ASIN
+        html: Page HTML (bytes or str)
+    
+    Returns:
+        Dictionary with listing data
+    """
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    def text(elem) -> Optional[str]:
+        return elem.get_text(strip=True) if elem else None
+    
+    title_elem = soup.find('span', {'id': 'productTitle'})
+    brand_elem = soup.find('a', {'id': 'brand'}) or soup.find('span', class_='po-brand')
+    price_elem = soup.find('span', {'id': 'priceblock_ourprice'}) or \
+                 soup.find('span', {'id': 'priceblock_dealprice'}) or \
+                 soup.find('span', class_='a-price-whole')
+    rating_elem = soup.find('span', {'id': 'acrPopover'}) or \
+                  soup.find('span', class_='a-icon-alt')
+    review_elem = soup.find('span', {'id': 'acrCustomerReviewText'})
+    
+    # BSR is in the span after the "Best Sellers Rank" label
+    bsr_text = None
+    bsr_elem = soup.find('span', string=BSR_LABEL_PATTERN)
+    if bsr_elem:
+        bsr_value_elem = bsr_elem.find_next('span')
+        bsr_text = bsr_value_elem.get_text(strip=True) if bsr_value_elem else ''
+    
+    category = None
+    category_elem = soup.find('a', {'id': 'wayfinding-breadcrumbs_feature_div'})
+    if category_elem:
+        categories = category_elem.find_all('a', class_='a-link-normal')
+        if categories:
+            category = categories[-1].get_text(strip=True)
+    
+    return listing_from_fields(
+        asin,
+        title=text(title_elem),
+        brand=text(brand_elem),
+        price_text=text(price_elem),
+        rating_text=text(rating_elem),
+        review_text=text(review_elem),
+        bsr_text=bsr_text,
+        category=category,
+        prime_flag=bool(soup.find('span', {'id': 'primeBadge_feature_div'})),
+        coupon_flag=bool(soup.find('span', string=COUPON_PATTERN)),
+        image_count=len(soup.find_all('img', {'id': IMAGE_ID_PATTERN})),
+        video_flag=bool(soup.find('div', {'id': 'dv-action-box-video-container'})),
+    )
+
+
+# (tag, id) -> field, and span class -> field; the first element in document order wins
+_ID_FIELDS = {
+    ("span", "productTitle"): "title",
+    ("a", "brand"): "brand",
+    ("span", "priceblock_ourprice"): "price",
+    ("span", "priceblock_dealprice"): "price_deal",
+    ("span", "acrPopover"): "rating",
+    ("span", "acrCustomerReviewText"): "review",
+    ("a", "wayfinding-breadcrumbs_feature_div"): "breadcrumbs",
+    ("span", "primeBadge_feature_div"): "prime",
+    ("div", "dv-action-box-video-container"): "video",
+}
+_CLASS_FIELDS = {
+    "po-brand": "brand_fallback",
+    "a-price-whole": "price_whole",
+    "a-icon-alt": "rating_fallback",
+}
+
+
+def _lxml_xpaths() -> Dict[str, Any]:
+    """Compile the XPath expressions of the lxml backend (once per process)."""
+    from lxml import etree
+    
+    has_link_class = "contains(concat(' ', normalize-space(@class), ' '), ' a-link-normal ')"
+    return {
+        "next_span": etree.XPath("(descendant::span | following::span)[1]"),
+        "breadcrumb_links": etree.XPath(f".//a[{has_link_class}]"),
+    }
+
+
+_XPATHS: Optional[Dict[str, Any]] = None
+
+# Strings inside these elements are not part of get_text() in bs4
+_SKIPPED_TEXT_TAGS = ("script", "style", "template")
+
+
+def _strings(elem):
+    """Text nodes under an element in document order, skipping comments and script/style."""
+    if elem.tag in _SKIPPED_TEXT_TAGS:
+        return
+    if elem.text:
+        yield elem.text
+    for child in elem:
+        if isinstance(child.tag, str):
+            yield from _strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _text(elem) -> Optional[str]:
+    """Equivalent of bs4's get_text(strip=True): stripped strings joined without separator."""
+    if elem is None:
+        return None
+    return ''.join(s.strip() for s in _strings(elem) if s.strip())
+
+
+def _single_string(elem) -> Optional[str]:
+    """Equivalent of bs4's Tag.string: the only string child, descending through only children."""
+    while True:
+        children = []
+        if elem.text:
+            children.append(elem.text)
+        for child in elem:
+            children.append(child)
+            if child.tail:
+                children.append(child.tail)
+        if len(children) != 1:
+            return None
+        only = children[0]
+        if isinstance(only, str):
+            return only
+        if not isinstance(only.tag, str):
+            return only.text  # comment
+        elem = only
+
+
+def _first(xpath, root):
+    """First match of a compiled XPath, or None."""
+    matches = xpath(root)
+    return matches[0] if matches else None
+
+
+def _decode(html) -> str:
+    """Decode page bytes: UTF-8, else the same detection bs4 uses."""
+    if isinstance(html, str):
+        return html
+    try:
+        return html.decode('utf-8')
+    except UnicodeDecodeError:
+        from bs4.dammit import UnicodeDammit
+        return UnicodeDammit(html, is_html=True).unicode_markup
+
+
+def parse_listing_page_lxml(asin: str, html) -> Dict[str, Any]:
+    """
+    Extract listing fields with lxml in one pass over the element tree.
+    
+    Matches parse_listing_page_bs4 field for field, including bs4's
+    get_text(strip=True) and Tag.string semantics. Markup the two HTML
+    parsers repair differently (e.g. a link directly inside the breadcrumbs
+    link) can still differ.
+    
+    Args:
+        asin: Amazon ASIN
+        html: Page HTML (bytes or str)
+    
+    Returns:
+        Dictionary with listing data
+    """
+    import lxml.html
+    
+    global _XPATHS
+    if _XPATHS is None:
+        _XPATHS = _lxml_xpaths()
+    xp = _XPATHS
+    
+    text = _decode(html)
+    if not text.strip():
+        return listing_from_fields(asin, None, None, None, None, None, None, None, False, False, 0, False)
+    root = lxml.html.document_fromstring(text)
+    
+    # One pass over the candidate elements instead of a document scan per field
+    found: Dict[str, Any] = {}
+    bsr_label = None
+    coupon_flag = False
+    image_count = 0
+    for elem in root.iter('span', 'a', 'div', 'img'):
+        tag = elem.tag
+        elem_id = elem.get('id')
+        if elem_id is not None:
+            if tag == 'img':
+                image_count += bool(IMAGE_ID_PATTERN.search(elem_id))
+                continue
+            field = _ID_FIELDS.get((tag, elem_id))
+            if field is not None and field not in found:
+                found[field] = elem
+        if tag != 'span':
+            continue
+        
+        classes = elem.get('class')
+        if classes:
+            for cls in classes.split():
+                field = _CLASS_FIELDS.get(cls)
+                if field is not None and field not in found:
+                    found[field] = elem
+        
+        if bsr_label is None or not coupon_flag:
+            label = _single_string(elem)
+            if label is not None:
+                if bsr_label is None and BSR_LABEL_PATTERN.search(label):
+                    bsr_label = elem
+                if COUPON_PATTERN.search(label):
+                    coupon_flag = True
+    
+    def first(*fields):
+        for field in fields:
+            if field in found:
+                return found[field]
+        return None
+    
+    # BSR is in the span after the "Best Sellers Rank" label
+    bsr_text = None
+    if bsr_label is not None:
+        bsr_text = _text(_first(xp["next_span"], bsr_label)) or ''
+    
+    category = None
+    breadcrumbs = first("breadcrumbs")
+    if breadcrumbs is not None:
+        links = xp["breadcrumb_links"](breadcrumbs)
+        if links:
+            category = _text(links[-1])
+    
+    return listing_from_fields(
+        asin,
+        title=_text(first("title")),
+        brand=_text(first("brand", "brand_fallback")),
+        price_text=_text(first("price", "price_deal", "price_whole")),
+        rating_text=_text(first("rating", "rating_fallback")),
+        review_text=_text(first("review")),
+        bsr_text=bsr_text,
+        category=category,
+        prime_flag="prime" in found,
+        coupon_flag=coupon_flag,
+        image_count=image_count,
+        video_flag="video" in found,
+    )
+
+
+PARSER_BACKENDS: Dict[str, Callable[[str, Any], Dict[str, Any]]] = {
+    "lxml": parse_listing_page_lxml,
+    "bs4": parse_listing_page_bs4,
+}
+
+
+def get_listing_parser(name: Optional[str] = None) -> Callable[[str, Any], Dict[str, Any]]:
+    """
+    Listing parser backend by name.
+    
+    Args:
+        name: 'lxml' or 'bs4' (default: config ingestion.amazon.parser, else
+            lxml); lxml falls back to bs4 if it is not installed
+    
+    Returns:
+        Function (asin, html) -> listing dict
+    """
+    if name is None:
+        from src.utils.config import get_setting
+        name = get_setting("ingestion", "amazon", "parser", default=DEFAULT_PARSER)
+    
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown listing parser {name}; expected one of {sorted(PARSER_BACKENDS)}")
+    
+    if name == "lxml":
+        try:
+            import lxml.html  # noqa: F401
+        except ImportError:
+            logger.warning("lxml is not installed; parsing listings with BeautifulSoup")
+            name = "bs4"
+    return PARSER_BACKENDS[name]
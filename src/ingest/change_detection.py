@@ -0,0 +1,158 @@
+"""
+Change detection for ingestion jobs.
+Keeps the validators of the last successful fetch of every source key in
+fetch_validators: the HTTP ETag / Last-Modified (sent back as
+If-None-Match / If-Modified-Since), a hash of the response body and a hash
+of the parsed record. A fetch is unchanged when the server answers 304,
+when the body hash matches (parsing is skipped), or when the parsed record
+hash matches (writing is skipped); jobs then carry the previous daily row
+forward instead of parsing and upserting the page again.
+"""
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+VALIDATOR_COLUMNS = ["source", "fetch_key", "etag", "last_modified", "content_hash",
+                     "record_hash", "changed_dt", "checked_at"]
+LOAD_CHUNK_SIZE = 500  # keys per IN (...) lookup (SQLite parameter limit)
+
+
+@dataclass
+class FetchValidator:
+    """Validators of one source key's last successful fetch."""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    record_hash: Optional[str] = None
+    changed_dt: Optional[date] = None
+    
+    def conditional_headers(self) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for the next request."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def content_hash(body: bytes) -> str:
+    """SHA-256 of a response body (the page store key of the body)."""
+    return hashlib.sha256(body).hexdigest()
+
+
+def record_hash(record: Any) -> str:
+    """Stable hash of a parsed record (JSON-serializable; key order ignored)."""
+    return hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def response_validator(
+    headers: Optional[Mapping[str, str]],
+    body_hash: str,
+    parsed_hash: Optional[str],
+    changed_dt: Optional[date]
+) -> FetchValidator:
+    """
+    Validator of a 2xx response.
+    
+    Args:
+        headers: Response headers
+        body_hash: content_hash of the body
+        parsed_hash: record_hash of the parsed record
+        changed_dt: Fetch date the record last changed
+    
+    Returns:
+        FetchValidator
+    """
+    headers = headers or {}
+    return FetchValidator(
+        etag=headers.get("ETag"),
+        last_modified=headers.get("Last-Modified"),
+        content_hash=body_hash,
+        record_hash=parsed_hash,
+        changed_dt=changed_dt,
+    )
+
+
+def load_validators(source: str, keys: Iterable[str], as_of: Optional[date] = None) -> Dict[str, FetchValidator]:
+    """
+    Stored validators of a source's keys.
+    
+    Args:
+        source: Source name ('amazon', 'shopify')
+        keys: Source keys
+        as_of: Fetch date of the run; validators of records that changed after
+            it are skipped (their rows before as_of hold older content)
+    
+    Returns:
+        key -> FetchValidator (keys never fetched are missing)
+    """
+    from src.utils.db import execute_query
+    from src.utils.query_helper import convert_any_clause, get_param_placeholder, to_date
+    
+    keys = list(dict.fromkeys(keys))
+    validators = {}
+    for i in range(0, len(keys), LOAD_CHUNK_SIZE):
+        clause, params = convert_any_clause("fetch_key", keys[i:i + LOAD_CHUNK_SIZE])
+        rows = execute_query(f"""
+            SELECT fetch_key, etag, last_modified, content_hash, record_hash, changed_dt
+            FROM fetch_validators
+            WHERE source = {get_param_placeholder()} AND {clause}
+        """, (source,) + params)
+        for row in rows or []:
+            changed_dt = to_date(row["changed_dt"])
+            if as_of is not None and (changed_dt is None or changed_dt > as_of):
+                continue
+            validators[row["fetch_key"]] = FetchValidator(
+                etag=row["etag"],
+                last_modified=row["last_modified"],
+                content_hash=row["content_hash"],
+                record_hash=row["record_hash"],
+                changed_dt=changed_dt,
+            )
+    return validators
+
+
+def save_validators(source: str, validators: Mapping[str, FetchValidator]) -> None:
+    """
+    Upsert validators of freshly stored keys.
+    
+    Args:
+        source: Source name
+        validators: key -> FetchValidator
+    """
+    from src.utils.db import BulkUpsertWriter
+    
+    if not validators:
+        return
+    
+    checked_at = datetime.now()
+    with BulkUpsertWriter("fetch_validators", VALIDATOR_COLUMNS, ["source", "fetch_key"]) as writer:
+        for key, validator in validators.items():
+            writer.add((source, key, validator.etag, validator.last_modified, validator.content_hash,
+                        validator.record_hash, validator.changed_dt, checked_at))
+
+
+def clear_validators(source: str, keys: List[str]) -> None:
+    """Forget validators, so the keys are fetched and stored in full next time."""
+    from src.utils.db import get_db_cursor
+    from src.utils.query_helper import convert_any_clause, get_param_placeholder
+    
+    for i in range(0, len(keys), LOAD_CHUNK_SIZE):
+        clause, params = convert_any_clause("fetch_key", keys[i:i + LOAD_CHUNK_SIZE])
+        with get_db_cursor() as cur:
+            cur.execute(f"DELETE FROM fetch_validators WHERE source = {get_param_placeholder()} AND {clause}",
+                        (source,) + params)
+
+
+def conditional_fetch_enabled() -> bool:
+    """Config ingestion.conditional_fetch (default: true)."""
+    from src.utils.config import get_setting
+    
+    return bool(get_setting("ingestion", "conditional_fetch", default=True))
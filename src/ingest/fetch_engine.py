@@ -0,0 +1,243 @@
+"""
+Asynchronous HTTP fetch engine for ingestion jobs.
+Keeps up to `concurrency` requests in flight over one shared aiohttp session
+(connections are pooled and reused), paces requests with a token bucket per
+host, and retries transient failures (connection errors, timeouts, 429 and
+5xx) with jittered exponential backoff. A request waiting to retry gives up
+its slot, so backoff never holds up other requests. Requests may carry
+their own headers (e.g. If-None-Match); a 304 comes back as not_modified.
+
+Usage:
+    async with AsyncFetcher(concurrency=8, rate_limit_per_second=2) as fetcher:
+        async for result in fetcher.fetch_all((asin, url) for asin, url in pages):
+            ...
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Iterable, Mapping, Tuple, AsyncIterator
+from urllib.parse import urlsplit
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 15.0  # seconds per request
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter for coroutines.
+    
+    Holds up to `capacity` tokens, refilled at `rate` tokens per second;
+    acquire() takes one, waiting for a refill if the bucket is empty.
+    Waiters are served in arrival order.
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens per second (<= 0 disables limiting)
+            capacity: Burst size (default: max(1, rate))
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    async def acquire(self) -> None:
+        """Wait for and take one token."""
+        if self.rate <= 0:
+            return
+        
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+@dataclass
+class FetchResult:
+    """Outcome of one fetch: body is set for 2xx responses, status 304 for not modified, error otherwise."""
+    key: Any
+    url: str
+    status: Optional[int] = None
+    body: Optional[bytes] = None
+    headers: Optional[Mapping[str, str]] = None  # case-insensitive
+    error: Optional[str] = None
+    attempts: int = 0
+    
+    @property
+    def ok(self) -> bool:
+        return self.body is not None
+    
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+class AsyncFetcher:
+    """
+    Concurrent, rate-limited HTTP GETs over one pooled session.
+    
+    Use as an async context manager; the session is opened on enter and
+    closed on exit.
+    """
+    
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate_limit_per_second: float = 0,
+        burst: Optional[float] = None,
+        max_retries: int = 3,
+        retry_delay: float = 2.0,
+        timeout: float = DEFAULT_TIMEOUT,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        """
+        Args:
+            concurrency: Maximum requests in flight
+            rate_limit_per_second: Requests per second per host (<= 0: unlimited)
+            burst: Token bucket capacity per host (default: max(1, rate))
+            max_retries: Attempts per URL, including the first
+            retry_delay: Base backoff (seconds), doubled on every retry and jittered
+            timeout: Seconds per request
+            headers: Headers sent with every request
+        """
+        self.concurrency = max(1, concurrency)
+        self.rate_limit_per_second = rate_limit_per_second
+        self.burst = burst
+        self.max_retries = max(1, max_retries)
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.headers = headers or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._session = None
+    
+    async def __aenter__(self) -> "AsyncFetcher":
+        import aiohttp
+        
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._session = aiohttp.ClientSession(
+            headers=self.headers,
+            connector=aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self._session.close()
+    
+    def _bucket(self, url: str) -> TokenBucket:
+        """Rate limiter of the URL's host."""
+        host = urlsplit(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate_limit_per_second, self.burst)
+        return self._buckets[host]
+    
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before retry number attempt + 1 (Retry-After wins if larger)."""
+        delay = self.retry_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return delay
+    
+    async def fetch(self, key: Any, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """
+        GET one URL, retrying transient failures.
+        
+        Args:
+            key: Caller's identifier, returned in the result
+            url: URL
+            headers: Extra headers of this request (e.g. conditional request headers)
+        
+        Returns:
+            FetchResult (never raises for HTTP or connection errors)
+        """
+        import aiohttp
+        
+        result = FetchResult(key=key, url=url)
+        bucket = self._bucket(url)
+        
+        for attempt in range(self.max_retries):
+            result.attempts = attempt + 1
+            retry_after = None
+            
+            async with self._slots:
+                # Take the token only once a slot is free, right before sending: a
+                # token taken while queued for a slot would be spent in a burst when
+                # several in-flight requests complete together
+                await bucket.acquire()
+                try:
+                    async with self._session.get(url, headers=headers, allow_redirects=True) as response:
+                        result.status = response.status
+                        result.headers = response.headers.copy()
+                        if response.status == 304:
+                            result.error = None
+                            return result
+                        if response.status < 400:
+                            result.body = await response.read()
+                            result.error = None
+                            return result
+                        result.error = f"HTTP {response.status}"
+                        retry_after = response.headers.get("Retry-After")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    result.status = None
+                    result.error = str(e) or type(e).__name__
+            
+            if result.status is not None and result.status not in RETRY_STATUSES:
+                break
+            if attempt < self.max_retries - 1:
+                delay = self.backoff(attempt, retry_after)
+                logger.warning(f"Request failed for {key} (attempt {attempt + 1}/{self.max_retries}): "
+                               f"{result.error}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        
+        logger.error(f"Request failed for {key} after {result.attempts} attempts: {result.error}")
+        return result
+    
+    async def fetch_all(self, requests: Iterable[Tuple]) -> AsyncIterator[FetchResult]:
+        """
+        Fetch (key, url) or (key, url, headers) requests concurrently, yielding results as they complete.
+        
+        Only about twice `concurrency` requests are scheduled at a time, so
+        long request lists are not all turned into tasks up front.
+        
+        Args:
+            requests: (key, url) pairs, or (key, url, headers) with per-request headers
+        
+        Yields:
+            FetchResult per request, in completion order
+        """
+        pending = iter(requests)
+        tasks = set()
+        
+        def schedule() -> None:
+            for request in pending:
+                tasks.add(asyncio.ensure_future(self.fetch(*request)))
+                if len(tasks) >= 2 * self.concurrency:
+                    return
+        
+        schedule()
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                tasks.difference_update(done)
+                for task in done:
+                    yield task.result()
+                schedule()
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,265 @@
+"""
+Content-addressed store of fetched page and API bodies.
+Bodies are kept gzip-compressed under their SHA-256 (identical bodies are
+stored once), and each (source, fetch date) has a JSON-lines manifest of
+(key, hash, fetched_at) records, so pages can be re-parsed without
+re-fetching them (see src/ingest/reparse.py).
+
+Layout:
+    <root>/objects/ab/abcdef....gz            body, gzip-compressed
+    <root>/manifests/<source>/<YYYY-MM-DD>.jsonl
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, asdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = "data/page_store"
+COMPRESS_LEVEL = 6  # gzip level; HTML compresses ~8x at a fraction of level 9's cost
+
+
+@dataclass
+class StoredPage:
+    """Manifest record of one stored fetch."""
+    source: str
+    key: str
+    dt: str
+    content_hash: str
+    fetched_at: str
+    content_type: Optional[str] = None
+    size: int = 0
+
+
+class PageStore:
+    """
+    Compressed, content-addressed body store with per-day manifests.
+    
+    Safe to share between threads of one process; separate processes may
+    read concurrently (blobs are written atomically).
+    """
+    
+    def __init__(self, root: Union[str, Path]):
+        """
+        Args:
+            root: Store directory (created on first write)
+        """
+        self.root = Path(root)
+        self._lock = threading.Lock()
+    
+    def _object_path(self, content_hash: str) -> Path:
+        return self.root / "objects" / content_hash[:2] / f"{content_hash}.gz"
+    
+    def _manifest_path(self, source: str, dt: Union[date, str]) -> Path:
+        return self.root / "manifests" / source / f"{dt}.jsonl"
+    
+    def put(
+        self,
+        source: str,
+        key: str,
+        dt: date,
+        body: bytes,
+        content_type: Optional[str] = None
+    ) -> str:
+        """
+        Store a fetched body and record it in the (source, dt) manifest.
+        
+        Args:
+            source: Source name, e.g. 'amazon' or 'shopify'
+            key: Source key (ASIN, store domain, query)
+            dt: Fetch date the body belongs to
+            body: Raw response body
+            content_type: Response content type
+        
+        Returns:
+            SHA-256 hex digest of the body
+        """
+        content_hash = hashlib.sha256(body).hexdigest()
+        path = self._object_path(content_hash)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        
+        self._record(StoredPage(
+            source=source,
+            key=key,
+            dt=str(dt),
+            content_hash=content_hash,
+            fetched_at=datetime.now().isoformat(),
+            content_type=content_type,
+            size=len(body),
+        ))
+        return content_hash
+    
+    def link(self, source: str, key: str, dt: date, content_hash: str) -> bool:
+        """
+        Record an already stored body under another fetch date (an unchanged page).
+        
+        Args:
+            source: Source name
+            key: Source key
+            dt: Fetch date
+            content_hash: Hash of the stored body
+        
+        Returns:
+            True if recorded, False if the body is not in the store
+        """
+        path = self._object_path(content_hash)
+        if not path.exists():
+            return False
+        
+        self._record(StoredPage(
+            source=source,
+            key=key,
+            dt=str(dt),
+            content_hash=content_hash,
+            fetched_at=datetime.now().isoformat(),
+        ))
+        return True
+    
+    def _record(self, record: StoredPage) -> None:
+        """Append a record to its (source, dt) manifest."""
+        manifest = self._manifest_path(record.source, record.dt)
+        with self._lock:
+            manifest.parent.mkdir(parents=True, exist_ok=True)
+            with open(manifest, "a", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(record)) + "\n")
+    
+    def get(self, content_hash: str) -> bytes:
+        """
+        Body by hash.
+        
+        Raises:
+            FileNotFoundError: If the body is not in the store
+        """
+        with open(self._object_path(content_hash), "rb") as f:
+            return gzip.decompress(f.read())
+    
+    def pages(self, source: str, dt: Union[date, str], latest_only: bool = True) -> List[StoredPage]:
+        """
+        Manifest records of a source and fetch date.
+        
+        Args:
+            source: Source name
+            dt: Fetch date
+            latest_only: Keep only the last fetch of each key
+        
+        Returns:
+            Records in fetch order
+        """
+        manifest = self._manifest_path(source, dt)
+        if not manifest.exists():
+            return []
+        
+        records = []
+        with open(manifest, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(StoredPage(**json.loads(line)))
+                except (ValueError, TypeError) as e:
+                    # A torn last line from an interrupted write
+                    logger.warning(f"Skipping bad manifest line in {manifest}: {e}")
+        
+        if latest_only:
+            latest: Dict[str, StoredPage] = {}
+            for record in records:
+                latest.pop(record.key, None)
+                latest[record.key] = record
+            records = list(latest.values())
+        return records
+    
+    def dates(self, source: str) -> List[date]:
+        """Fetch dates with a manifest for the source, ascending."""
+        directory = self.root / "manifests" / source
+        if not directory.exists():
+            return []
+        return sorted(date.fromisoformat(path.stem) for path in directory.glob("*.jsonl"))
+
+
+def page_store_path() -> Path:
+    """Store directory from config ingestion.page_store.path (relative paths are under the repo root)."""
+    from src.utils.config import get_setting
+    
+    path = Path(get_setting("ingestion", "page_store", "path", default=DEFAULT_STORE_PATH))
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parents[2] / path
+    return path
+
+
+def get_page_store() -> Optional[PageStore]:
+    """
+    The configured page store.
+    
+    Returns:
+        PageStore, or None if ingestion.page_store.enabled is false
+    """
+    from src.utils.config import get_setting
+    
+    if not get_setting("ingestion", "page_store", "enabled", default=True):
+        return None
+    return PageStore(page_store_path())
+
+
+def archive_page(
+    store: Optional[PageStore],
+    source: str,
+    key: str,
+    dt: date,
+    body: bytes,
+    content_type: Optional[str] = None
+) -> Optional[str]:
+    """
+    store.put for ingestion jobs: a no-op without a store, and a failed
+    write is logged instead of failing the fetch.
+    
+    Returns:
+        Body hash, or None if not stored
+    """
+    if store is None:
+        return None
+    try:
+        return store.put(source, key, dt, body, content_type)
+    except Exception as e:
+        logger.error(f"Error archiving {source} page for {key}: {e}")
+        return None
+
+
+def archive_unchanged(
+    store: Optional[PageStore],
+    source: str,
+    key: str,
+    dt: date,
+    content_hash: Optional[str]
+) -> bool:
+    """
+    store.link for ingestion jobs (see archive_page).
+    
+    Returns:
+        True if recorded
+    """
+    if store is None or not content_hash:
+        return False
+    try:
+        return store.link(source, key, dt, content_hash)
+    except Exception as e:
+        logger.error(f"Error archiving unchanged {source} page for {key}: {e}")
+        return False
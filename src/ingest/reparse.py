@@ -0,0 +1,207 @@
+"""
+Rebuild staging tables from the page store, without fetching.
+Re-parses the bodies archived by the ingestion jobs (src/ingest/page_store.py)
+and upserts the results, so a parser change can be applied to past dates:
+  - amazon: amazon_listings_daily
+  - shopify: shopify_products_daily
+  - tiktok: tiktok_metrics_daily
+The last fetch of each key per day is used.
+
+Usage:
+    python -m src.ingest.reparse --start_date 2026-01-01 --end_date 2026-03-31 --workers 4
+"""
+import argparse
+import json
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+REPARSE_SOURCES = ("amazon", "shopify", "tiktok")
+REPARSE_PAGES_PER_TASK = 200
+
+
+def parse_stored_page(source: str, key: str, body: bytes, parser: Optional[str] = None) -> Any:
+    """
+    Parse one stored body the way its ingestion job does.
+    
+    Args:
+        source: Source name
+        key: ASIN, store domain or query
+        body: Stored body
+        parser: Amazon page parser backend (default: config)
+    
+    Returns:
+        Parsed record(s) for store_reparsed
+    """
+    if source == "amazon":
+        from src.ingest.amazon_job import parse_listing_page
+        return parse_listing_page(key, body, parser)
+    if source == "shopify":
+        from src.ingest.shopify_job import parse_shopify_products
+        return parse_shopify_products(json.loads(body))
+    if source == "tiktok":
+        return json.loads(body)
+    raise ValueError(f"Unknown source {source}; expected one of {list(REPARSE_SOURCES)}")
+
+
+def store_reparsed(source: str, dt: date, key: str, parsed: Any) -> None:
+    """
+    Upsert parse_stored_page output into the source's staging table.
+    
+    Args:
+        source: Source name
+        dt: Fetch date
+        key: ASIN, store domain or query
+        parsed: parse_stored_page output
+    """
+    if source == "amazon":
+        from src.ingest.amazon_job import parse_and_store_listing
+        parse_and_store_listing(dt, key, parsed)
+    elif source == "shopify":
+        from src.ingest.shopify_job import store_shopify_products
+        store_shopify_products(dt, key, parsed)
+    elif source == "tiktok":
+        from src.ingest.tiktok_job import store_tiktok_metrics
+        store_tiktok_metrics(dt, key, parsed)
+    else:
+        raise ValueError(f"Unknown source {source}; expected one of {list(REPARSE_SOURCES)}")
+
+
+def reparse_pages(store_root: str, pages: List, parser: Optional[str] = None) -> List[Tuple[Any, Any]]:
+    """
+    Read and parse a batch of stored pages (process pool task; no database access).
+    
+    Args:
+        store_root: Page store directory
+        pages: StoredPage records
+        parser: Amazon page parser backend (default: config)
+    
+    Returns:
+        (StoredPage, parsed or None) per page
+    """
+    from src.ingest.page_store import PageStore
+    
+    store = PageStore(store_root)
+    results = []
+    for page in pages:
+        try:
+            parsed = parse_stored_page(page.source, page.key, store.get(page.content_hash), parser)
+        except Exception as e:
+            logger.error(f"Error re-parsing {page.source} page for {page.key} on {page.dt}: {e}")
+            parsed = None
+        results.append((page, parsed))
+    return results
+
+
+def reparse(
+    start_date: date,
+    end_date: date,
+    sources: Optional[List[str]] = None,
+    workers: int = 1,
+    parser: Optional[str] = None,
+    store_root: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Re-parse stored pages fetched between two dates and upsert the results.
+    
+    Pages are parsed in batches of REPARSE_PAGES_PER_TASK on a process
+    pool; workers read the store directly and only this process writes to
+    the database. Results are stored in fetch date order whatever order the
+    batches finish in, because parse_and_store_listing carries first_seen_date
+    over from the ASIN's latest stored row.
+    
+    Args:
+        start_date: First fetch date
+        end_date: Last fetch date
+        sources: Sources to rebuild (default: all of REPARSE_SOURCES)
+        workers: Parser processes
+        parser: Amazon page parser backend (default: config)
+        store_root: Page store directory (default: config ingestion.page_store.path)
+    
+    Returns:
+        Source -> pages stored
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from src.ingest.amazon_job import map_stored_listings
+    from src.ingest.page_store import PageStore, page_store_path
+    
+    sources = list(sources or REPARSE_SOURCES)
+    for source in sources:
+        if source not in REPARSE_SOURCES:
+            raise ValueError(f"Unknown source {source}; expected one of {list(REPARSE_SOURCES)}")
+    
+    store_root = str(store_root or page_store_path())
+    store = PageStore(store_root)
+    
+    pages = []
+    for source in sources:
+        for dt in store.dates(source):
+            if start_date <= dt <= end_date:
+                pages.extend(store.pages(source, dt))
+    logger.info(f"Re-parsing {len(pages)} stored pages from {start_date} to {end_date} ({', '.join(sources)})")
+    
+    batches = [pages[i:i + REPARSE_PAGES_PER_TASK] for i in range(0, len(pages), REPARSE_PAGES_PER_TASK)]
+    
+    def parsed_batches():
+        if workers <= 1:
+            for batch in batches:
+                yield reparse_pages(store_root, batch, parser)
+            return
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(reparse_pages, store_root, batch, parser) for batch in batches]
+            # Submission order is date order (see above); later batches keep parsing meanwhile
+            for future in futures:
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error(f"Re-parse batch failed: {e}")
+    
+    stored = {source: 0 for source in sources}
+    for results in parsed_batches():
+        amazon_asins = defaultdict(list)
+        for page, parsed in results:
+            if parsed is None:
+                continue
+            dt = date.fromisoformat(page.dt)
+            try:
+                store_reparsed(page.source, dt, page.key, parsed)
+                stored[page.source] += 1
+                if page.source == "amazon":
+                    amazon_asins[dt].append(page.key)
+            except Exception as e:
+                logger.error(f"Error storing re-parsed {page.source} page for {page.key} on {page.dt}: {e}")
+        
+        # Alias matches of the batch's listings, one set-based match per date
+        for dt, asins in amazon_asins.items():
+            try:
+                map_stored_listings(dt, asins)
+            except Exception as e:
+                logger.error(f"Error matching {len(asins)} re-parsed listings on {dt} to entities: {e}")
+    
+    logger.info(f"Completed re-parse: {stored}")
+    return stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild staging tables from stored pages (no network)")
+    parser.add_argument("--start_date", type=str, required=True, help="First fetch date (YYYY-MM-DD)")
+    parser.add_argument("--end_date", type=str, help="Last fetch date (YYYY-MM-DD, default: start_date)")
+    parser.add_argument("--sources", type=str, nargs="+", choices=REPARSE_SOURCES,
+                        help="Sources to rebuild (default: all)")
+    parser.add_argument("--workers", type=int, default=1, help="Parser processes (default: 1)")
+    parser.add_argument("--parser", type=str, help="Amazon page parser backend, lxml or bs4 (default: config)")
+    parser.add_argument("--store", type=str, help="Page store directory (default: config ingestion.page_store.path)")
+    args = parser.parse_args()
+    
+    start_date = date.fromisoformat(args.start_date)
+    end_date = date.fromisoformat(args.end_date) if args.end_date else start_date
+    reparse(start_date, end_date, args.sources, args.workers, args.parser, args.store)
+
+
+if __name__ == "__main__":
+    main()
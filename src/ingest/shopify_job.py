@@ -5,26 +5,139 @@ Fetches store and product catalog data.
 import argparse
 import logging
 from datetime import date
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def fetch_shopify_stores(dt: date, store_domains: Optional[List[str]] = None) -> None:
+def parse_shopify_products(products_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Extract product rows from a store's products.json response.
+    
+    Args:
+        products_data: Parsed products.json body
+    
+    Returns:
+        List of product dicts (handle, title, price_usd, available, review_count, variant_count)
+    """
+    products = []
+    for product in products_data.get('products') or []:
+        # Get first variant price
+        price = None
+        if product.get('variants') and len(product['variants']) > 0:
+            price = float(product['variants'][0].get('price', 0)) / 100.0  # Shopify prices in cents
+        
+        products.append({
+            "handle": product.get('handle', ''),
+            "title": product.get('title', ''),
+            "price_usd": price,
+            "available": product.get('available', False),
+            "review_count": None,  # Review count not in JSON API
+            "variant_count": len(product.get('variants', [])),
+        })
+    return products
+
+
+def store_shopify_products(dt: date, domain: str, products: List[Dict[str, Any]]) -> None:
+    """
+    Upsert a store's products into shopify_products_daily.
+    
+    Args:
+        dt: Date
+        domain: Store URL
+        products: Rows from parse_shopify_products
+    """
+    from src.utils.db import get_db_cursor
+    
+    for product in products:
+        with get_db_cursor() as cur:
+            cur.execute("""
+                INSERT INTO shopify_products_daily (
+                    dt, store_domain, product_handle, product_title,
+                    price_usd, available, review_count, variant_count
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (dt, store_domain, product_handle) DO UPDATE SET
+                    product_title = excluded.product_title,
+                    price_usd = excluded.price_usd,
+                    available = excluded.available,
+                    review_count = excluded.review_count,
+                    variant_count = excluded.variant_count
+            """, (
+                dt, domain,
+                product["handle"],
+                product["title"],
+                product["price_usd"],
+                product["available"],
+                product["review_count"],
+                product["variant_count"],
+            ))
+
+
+def carry_forward_products(dt: date, domain: str) -> int:
+    """
+    Copy an unchanged store's latest shopify_products_daily rows to dt.
+    
+    Args:
+        dt: Date to store the products under
+        domain: Store URL
+    
+    Returns:
+        Number of product rows for dt
+    """
+    from src.utils.db import get_db_cursor, execute_query
+    from src.utils.query_helper import get_param_placeholder
+    
+    param = get_param_placeholder()
+    with get_db_cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO shopify_products_daily (
+                dt, store_domain, product_handle, product_title,
+                price_usd, available, review_count, variant_count
+            )
+            SELECT {param}, store_domain, product_handle, product_title,
+                   price_usd, available, review_count, variant_count
+            FROM shopify_products_daily
+            WHERE store_domain = {param}
+              AND dt = (SELECT MAX(dt) FROM shopify_products_daily WHERE store_domain = {param} AND dt <= {param})
+            ON CONFLICT (dt, store_domain, product_handle) DO NOTHING
+        """, (dt, domain, domain, dt))
+    
+    rows = execute_query(
+        f"SELECT COUNT(*) AS n FROM shopify_products_daily WHERE dt = {param} AND store_domain = {param}",
+        (dt, domain)
+    )
+    return rows[0]["n"] if rows else 0
+
+
+def fetch_shopify_stores(
+    dt: date,
+    store_domains: Optional[List[str]] = None,
+    conditional: Optional[bool] = None
+) -> None:
     """
     Fetch Shopify store and product data.
     
+    Response bodies are archived in the page store (ingestion.page_store)
+    for re-parsing. Requests are conditional (ingestion.conditional_fetch):
+    a catalog that is unchanged since its last fetch (304, same body or
+    same products) is carried forward instead of re-parsed and re-stored.
+    
     Args:
         dt: Date to fetch data for
         store_domains: Optional list of store domains. If None, uses seed list.
+        conditional: Skip unchanged catalogs (default: ingestion.conditional_fetch)
     """
     import time
     import requests
-    from src.utils.db import get_db_cursor, execute_query
+    from src.utils.db import get_db_cursor
+    from src.ingest.page_store import get_page_store, archive_page, archive_unchanged
+    from src.ingest.change_detection import (
+        conditional_fetch_enabled, load_validators, save_validators, clear_validators,
+        content_hash, record_hash, response_validator
+    )
     import json
     from datetime import datetime
-    from bs4 import BeautifulSoup
     
     logger.info(f"Fetching Shopify stores for {dt}")
     
@@ -32,12 +145,17 @@ def fetch_shopify_stores(dt: date, store_domains: Optional[List[str]] = None) ->
         logger.warning("No store domains provided. Use --stores flag or configure seed list.")
         return
     
+    # Normalize domains (add https:// if needed)
+    store_domains = [domain if domain.startswith('http') else f"https://{domain}" for domain in store_domains]
+    
+    page_store = get_page_store()
+    if conditional is None:
+        conditional = conditional_fetch_enabled()
+    validators = load_validators("shopify", store_domains, dt) if conditional else {}
+    unchanged_count = 0
+    
     for domain in store_domains:
         try:
-            # Normalize domain (add https:// if needed)
-            if not domain.startswith('http'):
-                domain = f"https://{domain}"
-            
             logger.debug(f"Fetching Shopify store: {domain}")
             time.sleep(1.0)  # Rate limiting for Shopify
             
@@ -46,6 +164,9 @@ def fetch_shopify_stores(dt: date, store_domains: Optional[List[str]] = None) ->
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
                 'Accept': 'text/html,application/xhtml+xml',
             }
+            previous = validators.get(domain)
+            if previous is not None:
+                headers.update(previous.conditional_headers())
             
             # Try to fetch products page
             products_url = f"{domain}/products.json"  # Shopify JSON API
@@ -54,7 +175,39 @@ def fetch_shopify_stores(dt: date, store_domains: Optional[List[str]] = None) ->
                 response = requests.get(products_url, headers=headers, timeout=10)
                 response.raise_for_status()
                 
-                products_data = response.json()
+                # Unchanged catalog: 304, same body, or same products
+                validator = None
+                unchanged = previous is not None and response.status_code == 304
+                if unchanged:
+                    archive_unchanged(page_store, "shopify", domain, dt, previous.content_hash)
+                else:
+                    archive_page(page_store, "shopify", domain, dt, response.content,
+                                 response.headers.get("Content-Type"))
+                    body_hash = content_hash(response.content)
+                    if previous is not None and body_hash == previous.content_hash:
+                        unchanged = True
+                        validator = response_validator(response.headers, body_hash, previous.record_hash,
+                                                       previous.changed_dt)
+                    else:
+                        products_data = response.json()
+                        products = parse_shopify_products(products_data)
+                        products_hash = record_hash(products)
+                        unchanged = previous is not None and products_hash == previous.record_hash
+                        validator = response_validator(response.headers, body_hash, products_hash,
+                                                       previous.changed_dt if unchanged else dt)
+                
+                if unchanged:
+                    carried = carry_forward_products(dt, domain)
+                    if carried == 0 and previous.record_hash != record_hash([]):
+                        # Nothing to carry forward; store in full next time
+                        logger.warning(f"No earlier products to carry forward for {domain}")
+                        clear_validators("shopify", [domain])
+                        continue
+                    if conditional:
+                        save_validators("shopify", {domain: validator or previous})
+                    unchanged_count += 1
+                    logger.info(f"Carried forward {carried} unchanged products from {domain}")
+                    continue
                 
                 # Store raw
                 with get_db_cursor() as cur:
@@ -65,44 +218,22 @@ def fetch_shopify_stores(dt: date, store_domains: Optional[List[str]] = None) ->
                 
                 # Parse and store products
                 if 'products' in products_data:
-                    for product in products_data['products']:
-                        # Get first variant price
-                        price = None
-                        if product.get('variants') and len(product['variants']) > 0:
-                            price = float(product['variants'][0].get('price', 0)) / 100.0  # Shopify prices in cents
-                        
-                        with get_db_cursor() as cur:
-                            cur.execute("""
-                                INSERT INTO shopify_products_daily (
-                                    dt, store_domain, product_handle, product_title,
-                                    price_usd, available, review_count, variant_count
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                                ON CONFLICT (dt, store_domain, product_handle) DO UPDATE SET
-                                    product_title = excluded.product_title,
-                                    price_usd = excluded.price_usd,
-                                    available = excluded.available,
-                                    review_count = excluded.review_count,
-                                    variant_count = excluded.variant_count
-                            """, (
-                                dt, domain,
-                                product.get('handle', ''),
-                                product.get('title', ''),
-                                price,
-                                product.get('available', False),
-                                None,  # Review count not in JSON API
-                                len(product.get('variants', [])),
-                            ))
-                    
-                    logger.info(f"Stored {len(products_data['products'])} products from {domain}")
+                    store_shopify_products(dt, domain, products)
+                    logger.info(f"Stored {len(products)} products from {domain}")
                 
+                if conditional:
+                    save_validators("shopify", {domain: validator})
+            
             except requests.exceptions.RequestException as e:
                 logger.warning(f"Failed to fetch {domain}: {e}")
                 continue
-                
+        
         except Exception as e:
             logger.error(f"Error processing Shopify store {domain}: {e}")
             continue
     
+    if conditional:
+        logger.info(f"{unchanged_count}/{len(store_domains)} Shopify catalogs unchanged since their last fetch")
     logger.info(f"Completed Shopify fetch for {dt}")
 
 
@@ -110,10 +241,12 @@ def main():
     parser = argparse.ArgumentParser(description="Shopify ingestion job")
     parser.add_argument("--dt", type=str, required=True, help="Date (YYYY-MM-DD)")
     parser.add_argument("--stores", type=str, nargs="+", help="Optional store domains to fetch")
+    parser.add_argument("--full", action="store_true",
+                        help="Fetch, parse and store every catalog, ignoring unchanged-page validators")
     args = parser.parse_args()
     
     dt = date.fromisoformat(args.dt)
-    fetch_shopify_stores(dt, args.stores)
+    fetch_shopify_stores(dt, args.stores, conditional=False if args.full else None)
 
 
 if __name__ == "__main__":
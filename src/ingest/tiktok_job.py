@@ -5,12 +5,53 @@ Fetches hashtag/keyword metrics and comments.
 import argparse
 import logging
 from datetime import date
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def store_tiktok_metrics(dt: date, query: str, metrics_data: Dict[str, Any]) -> bool:
+    """
+    Upsert one query's metrics into tiktok_metrics_daily.
+    
+    Args:
+        dt: Date
+        query: Hashtag/keyword
+        metrics_data: Metrics response (views, videos, likes, ...)
+    
+    Returns:
+        True if stored, False if the response has no metrics yet
+    """
+    from src.utils.db import get_db_cursor
+    
+    if metrics_data.get("views") is None:
+        return False
+    
+    with get_db_cursor() as cur:
+        cur.execute("""
+            INSERT INTO tiktok_metrics_daily (
+                dt, query, query_type, views, videos, likes, comments, shares, creator_count
+            ) VALUES (?, ?, 'hashtag', ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (dt, query, query_type) DO UPDATE SET
+                views = excluded.views,
+                videos = excluded.videos,
+                likes = excluded.likes,
+                comments = excluded.comments,
+                shares = excluded.shares,
+                creator_count = excluded.creator_count
+        """, (
+            dt, query,
+            metrics_data.get("views"),
+            metrics_data.get("videos"),
+            metrics_data.get("likes"),
+            metrics_data.get("comments"),
+            metrics_data.get("shares"),
+            metrics_data.get("creator_count"),
+        ))
+    return True
+
+
 def fetch_tiktok_metrics(dt: date, queries: Optional[List[str]] = None) -> None:
     """
     Fetch TikTok metrics for hashtags/keywords.
@@ -21,7 +62,8 @@ def fetch_tiktok_metrics(dt: date, queries: Optional[List[str]] = None) -> None:
     """
     import time
     import requests
-    from src.utils.db import get_db_cursor, execute_query
+    from src.utils.db import get_db_cursor
+    from src.ingest.page_store import get_page_store, archive_page
     import json
     from datetime import datetime
     
@@ -31,6 +73,8 @@ def fetch_tiktok_metrics(dt: date, queries: Optional[List[str]] = None) -> None:
         logger.warning("No queries provided. Use --queries flag or configure seed list.")
         return
     
+    page_store = get_page_store()
+    
     for query in queries:
         try:
             # TODO: Implement actual TikTok API or scraping
@@ -57,38 +101,19 @@ def fetch_tiktok_metrics(dt: date, queries: Optional[List[str]] = None) -> None:
             }
             
             # Store raw data
+            body = json.dumps(metrics_data)
+            archive_page(page_store, "tiktok", query, dt, body.encode("utf-8"), "application/json")
             with get_db_cursor() as cur:
                 cur.execute("""
                     INSERT INTO tiktok_metrics_raw (dt, query, raw_json, fetched_at)
                     VALUES (?, ?, ?, ?)
-                """, (dt, query, json.dumps(metrics_data), datetime.now()))
+                """, (dt, query, body, datetime.now()))
             
             # Parse and store staging (if we have data)
-            if metrics_data.get("views") is not None:
-                with get_db_cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO tiktok_metrics_daily (
-                            dt, query, query_type, views, videos, likes, comments, shares, creator_count
-                        ) VALUES (?, ?, 'hashtag', ?, ?, ?, ?, ?, ?)
-                        ON CONFLICT (dt, query, query_type) DO UPDATE SET
-                            views = excluded.views,
-                            videos = excluded.videos,
-                            likes = excluded.likes,
-                            comments = excluded.comments,
-                            shares = excluded.shares,
-                            creator_count = excluded.creator_count
-                    """, (
-                        dt, query,
-                        metrics_data.get("views"),
-                        metrics_data.get("videos"),
-                        metrics_data.get("likes"),
-                        metrics_data.get("comments"),
-                        metrics_data.get("shares"),
-                        metrics_data.get("creator_count"),
-                    ))
+            store_tiktok_metrics(dt, query, metrics_data)
             
             logger.debug(f"Stored metrics for {query}")
-            
+        
         except Exception as e:
             logger.error(f"Error fetching TikTok metrics for {query}: {e}")
             continue
@@ -10,13 +10,22 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 logger = logging.getLogger(__name__)
 
 
-def run_full_pipeline(week_start: date, model_version: str = "baseline"):
+def run_full_pipeline(
+    week_start: date,
+    model_version: str = "baseline",
+    workers: int = 1,
+    incremental: bool = False,
+    top_n: int = 50
+):
     """
     Run the full pipeline for a given week.
     
     Args:
         week_start: Week start date
         model_version: Model version to use
+        workers: Worker processes for feature building
+        incremental: Only rebuild features for entities whose inputs changed
+        top_n: Number of opportunities in the report
     """
     logger.info(f"Running full pipeline for week {week_start}")
     
@@ -24,7 +33,7 @@ def run_full_pipeline(week_start: date, model_version: str = "baseline"):
     logger.info("Step 1: Building features...")
     from src.features.build_features import build_features_for_week
     try:
-        build_features_for_week(week_start)
+        matrix = build_features_for_week(week_start, workers=workers, incremental=incremental)
         logger.info("✓ Features built")
     except Exception as e:
         logger.error(f"✗ Feature building failed: {e}")
@@ -34,18 +43,18 @@ def run_full_pipeline(week_start: date, model_version: str = "baseline"):
     logger.info("Step 2: Scoring entities...")
     from src.scoring.score_week import score_entities
     try:
-        scores = score_entities(week_start, model_version)
-        logger.info(f"✓ Scored {len(scores)} entities")
+        top_scores = score_entities(week_start, model_version, matrix=matrix, top_n=top_n)
+        logger.info(f"✓ Scored {len(matrix)} entities")
     except Exception as e:
         logger.error(f"✗ Scoring failed: {e}")
         raise
     
     # Step 3: Generate report
     logger.info("Step 3: Generating report...")
-    from src.serving.generate_report import generate_markdown_report, generate_json_report, load_top_opportunities
+    from src.serving.generate_report import generate_markdown_report, generate_json_report, opportunities_from_scores
     from pathlib import Path
     try:
-        opportunities = load_top_opportunities(week_start, top_n=50, model_version=model_version)
+        opportunities = opportunities_from_scores(top_scores)
         output_dir = Path("reports")
         md_path = output_dir / f"{week_start}.md"
         json_path = output_dir / f"{week_start}.json"
@@ -63,10 +72,12 @@ def main():
     parser = argparse.ArgumentParser(description="Run Winner Engine pipeline")
     parser.add_argument("--week_start", type=str, required=True, help="Week start (YYYY-MM-DD)")
     parser.add_argument("--model_version", type=str, default="baseline", help="Model version")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for feature building")
+    parser.add_argument("--incremental", action="store_true", help="Only rebuild features whose inputs changed")
     args = parser.parse_args()
     
     week_start = date.fromisoformat(args.week_start)
-    run_full_pipeline(week_start, args.model_version)
+    run_full_pipeline(week_start, args.model_version, workers=args.workers, incremental=args.incremental)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,180 @@
+"""
+Process-wide cache of trained scoring models.
+Models live in models/ as LightGBM model files (<version>.txt, written by
+Booster.save_model) or pickles (<version>.pkl, a Booster or a fitted
+LGBMClassifier/LGBMRanker). Each is loaded once per process and reloaded
+only when its file's mtime changes.
+"""
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODEL_FILE_SUFFIXES = (".txt", ".pkl")
+RANKING_OBJECTIVES = ("lambdarank", "rank_xendcg")
+
+# (model_version, path) -> (mtime_ns, model)
+_MODEL_CACHE: Dict[Tuple[str, str], Tuple[int, Any]] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+
+def find_model_path(model_version: str, model_dir: Path = Path("models")) -> Path:
+    """
+    Locate a model version's file.
+    
+    Args:
+        model_version: Model version (file name without suffix)
+        model_dir: Directory containing models
+    
+    Returns:
+        Path of the first of <version>.txt, <version>.pkl that exists
+    """
+    for suffix in MODEL_FILE_SUFFIXES:
+        path = Path(model_dir) / f"{model_version}{suffix}"
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No model file for version {model_version} in {model_dir}")
+
+
+def read_model_file(path: Path):
+    """Load a model file without caching."""
+    if path.suffix == ".txt":
+        import lightgbm as lgb
+        return lgb.Booster(model_file=str(path))
+    
+    from src.scoring.score_week import load_model
+    return load_model(path)
+
+
+def get_model(model_version: str, model_dir: Path = Path("models")):
+    """
+    Get a model version, loading it only if it is not cached or its file changed.
+    
+    Args:
+        model_version: Model version
+        model_dir: Directory containing models
+    
+    Returns:
+        LightGBM Booster, LGBMClassifier or LGBMRanker
+    """
+    path = find_model_path(model_version, model_dir)
+    key = (model_version, str(path.resolve()))
+    
+    with _MODEL_CACHE_LOCK:
+        mtime = path.stat().st_mtime_ns
+        cached = _MODEL_CACHE.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
+        model = read_model_file(path)
+        _MODEL_CACHE[key] = (mtime, model)
+    
+    logger.info(f"Loaded model {model_version} from {path}")
+    return model
+
+
+def clear_model_cache() -> None:
+    """Drop every cached model."""
+    with _MODEL_CACHE_LOCK:
+        _MODEL_CACHE.clear()
+
+
+def model_booster(model):
+    """The Booster behind a model (itself, or a fitted sklearn wrapper's booster_)."""
+    return getattr(model, "booster_", model)
+
+
+def model_feature_names(model) -> List[str]:
+    """Feature names the model was trained on, in its input order."""
+    return list(model_booster(model).feature_name())
+
+
+def is_ranker(model) -> bool:
+    """Whether the model was trained with a ranking objective."""
+    objective = str(model_booster(model).params.get("objective", ""))
+    return objective.split(" ")[0] in RANKING_OBJECTIVES
+
+
+def model_feature_indexes(model_features: List[str], matrix_features: Tuple[str, ...]) -> List[int]:
+    """
+    Map a model's input columns onto feature matrix columns.
+    
+    Args:
+        model_features: Feature names stored with the model, in its input order
+        matrix_features: WeekFeatureMatrix.feature_names
+    
+    Returns:
+        Matrix column index of every model input
+    
+    Raises:
+        ValueError: If the model has no stored feature names or needs
+            features the matrix does not have
+    """
+    columns = {name: j for j, name in enumerate(matrix_features)}
+    
+    if all(name == f"Column_{i}" for i, name in enumerate(model_features)):
+        raise ValueError("Model was trained without feature names; cannot validate feature order")
+    
+    missing = [name for name in model_features if name not in columns]
+    if missing:
+        raise ValueError(f"Model expects features missing from the feature matrix: {missing}")
+    
+    return [columns[name] for name in model_features]
+
+
+def predict_matrix(model, matrix) -> np.ndarray:
+    """
+    Score every entity of a WeekFeatureMatrix in one predict call.
+    
+    Columns are reordered to the model's stored feature list; missing values
+    are passed as NaN, which LightGBM treats as missing.
+    
+    Args:
+        model: Model from get_model
+        matrix: WeekFeatureMatrix
+    
+    Returns:
+        1-D array aligned with matrix.entity_ids: winner probability for
+        classifiers, relevance score for rankers
+    """
+    indexes = model_feature_indexes(model_feature_names(model), matrix.feature_names)
+    inputs = np.ascontiguousarray(matrix.values[:, indexes])
+    predictions = model_booster(model).predict(inputs)
+    
+    if predictions.ndim != 1:
+        raise ValueError(f"Expected one output per entity, got shape {predictions.shape}")
+    return predictions
+
+
+def feature_contributions(model, matrix, rows: np.ndarray, batch_size: int = 100000) -> Tuple[np.ndarray, List[str]]:
+    """
+    Tree-SHAP feature contributions (LightGBM pred_contrib) for some rows.
+    
+    Rows are scored in batches of batch_size to bound memory.
+    
+    Args:
+        model: Model from get_model
+        matrix: WeekFeatureMatrix
+        rows: Row indexes to explain
+        batch_size: Rows per pred_contrib call
+    
+    Returns:
+        (contributions, feature names): contributions[k, j] is the
+        contribution of feature j to row rows[k]'s raw score; the expected
+        value (bias) column is dropped
+    """
+    names = model_feature_names(model)
+    indexes = model_feature_indexes(names, matrix.feature_names)
+    booster = model_booster(model)
+    
+    contributions = np.empty((len(rows), len(names)))
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        inputs = np.ascontiguousarray(matrix.values[np.ix_(batch, indexes)])
+        contributions[start:start + len(batch)] = booster.predict(inputs, pred_contrib=True)[:, :-1]
+    return contributions, names
@@ -5,13 +5,26 @@ import argparse
 import json
 import logging
 import pickle
+import sys
 from datetime import date
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Features listed per entity in model explanations
+EXPLAIN_TOP_FEATURES = 5
+
+SCORE_COLUMNS = (
+    "week_start", "entity_id", "model_version",
+    "score_winner_prob", "score_rank",
+    "score_demand", "score_competition", "score_margin", "score_risk",
+    "explanations",
+)
+
 
 def load_model(model_path: Path, model_type: str = "classifier"):
     """
@@ -20,7 +33,7 @@ def load_model(model_path: Path, model_type: str = "classifier"):
     Args:
         model_path: Path to model file
         model_type: Type of model ('classifier' or 'ranker')
-        
+    
     Returns:
         Loaded model object
     """
@@ -36,7 +49,7 @@ def compute_baseline_score(features: Dict[str, Any]) -> Dict[str, Any]:
     
     Args:
         features: Feature dictionary
-        
+    
     Returns:
         Dictionary with component scores and overall score
     """
@@ -105,82 +118,464 @@ def compute_baseline_score(features: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def score_entities(week_start: date, model_version: str = "baseline", model_dir: Path = Path("models")) -> List[Dict[str, Any]]:
+# Features read by the baseline score and their defaults when missing
+BASELINE_FEATURE_DEFAULTS = {
+    "demand_tiktok_views_7d": 0,
+    "demand_amazon_bsr_improvement_4w": 0.0,
+    "demand_amazon_review_velocity_4w": 0,
+    "demand_cross_channel_alignment": 0.0,
+    "comp_amazon_concentration_hhi": 1.0,
+    "comp_amazon_new_entrant_rate_4w": 0.0,
+    "comp_amazon_top10_review_median": 0,
+    "econ_price_median": 0.0,
+    "econ_margin_proxy": 0.0,
+    "risk_return_proxy": 0.0,
+    "risk_regulatory_proxy": 0.0,
+    "risk_hazmat_proxy": 0.0,
+}
+
+
+def feature_columns(matrix, defaults: Dict[str, float]) -> Dict[str, np.ndarray]:
     """
-    Score all entities for a given week.
+    Selected features of every entity in a WeekFeatureMatrix, with missing
+    values replaced by their default (the vectorized form of features.get(name, default)).
     
     Args:
-        week_start: Week to score
-        model_version: Model version to use ('baseline' or model version)
+        matrix: WeekFeatureMatrix
+        defaults: feature name -> default
+    
+    Returns:
+        feature name -> float64 array aligned with matrix.entity_ids
+    """
+    columns = {}
+    for name, default in defaults.items():
+        if name in matrix.feature_names:
+            j = matrix.feature_names.index(name)
+            columns[name] = np.where(matrix.missing[:, j], float(default), matrix.values[:, j])
+        else:
+            columns[name] = np.full(len(matrix), float(default))
+    return columns
+
+
+def round_scores(values: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    Round like Python's round() does on each element.
+    
+    np.round scales by 10**decimals first, so values within float error of a
+    half step (e.g. 55.35) can round the other way; those few are redone
+    with round() so vectorized and scalar scores agree exactly.
+    """
+    scale = 10 ** decimals
+    scaled = values * scale
+    rounded = np.rint(scaled)
+    
+    # |scaled - rounded| is 0.5 at a half step; reuse scaled to avoid temporaries
+    np.subtract(scaled, rounded, out=scaled)
+    np.abs(scaled, out=scaled)
+    scaled -= 0.5
+    np.abs(scaled, out=scaled)
+    near_half = scaled < 1e-6
+    
+    rounded /= scale  # same steps as np.round(values, decimals)
+    for i in np.flatnonzero(near_half):
+        rounded[i] = round(float(values[i]), decimals)
+    return rounded
+
+
+def compute_baseline_scores(matrix) -> Dict[str, np.ndarray]:
+    """
+    Vectorized compute_baseline_score over a whole week.
+    
+    Matches the scalar version row by row (to float precision before rounding).
+    
+    Args:
+        matrix: WeekFeatureMatrix
+    
+    Returns:
+        Dictionary of score arrays (same keys as compute_baseline_score),
+        aligned with matrix.entity_ids
+    """
+    columns = feature_columns(matrix, BASELINE_FEATURE_DEFAULTS)
+    
+    # Demand score (0-100)
+    tiktok_views = columns["demand_tiktok_views_7d"]
+    bsr_improvement = columns["demand_amazon_bsr_improvement_4w"]
+    review_velocity = columns["demand_amazon_review_velocity_4w"]
+    cross_channel = columns["demand_cross_channel_alignment"]
+    
+    demand_score = np.minimum(100, (
+        np.minimum(50, tiktok_views / 1000000 * 50) +
+        np.maximum(0, bsr_improvement * 30) +
+        np.minimum(20, review_velocity / 100 * 20) +
+        cross_channel * 20
+    ))
+    
+    # Competition score (0-100)
+    comp_hhi = columns["comp_amazon_concentration_hhi"]
+    comp_new_entrants = columns["comp_amazon_new_entrant_rate_4w"]
+    comp_review_median = columns["comp_amazon_top10_review_median"]
+    
+    competition_score = np.minimum(100, (
+        (1.0 - np.minimum(1.0, comp_hhi)) * 40 +
+        np.maximum(0, (1.0 - comp_new_entrants) * 30) +
+        np.minimum(30, comp_review_median / 1000 * 30)
+    ))
+    
+    # Margin score (0-100); 0 when there is no price
+    price_median = columns["econ_price_median"]
+    margin_proxy = columns["econ_margin_proxy"]
+    
+    has_price = price_median > 0
+    margin_rate = np.divide(margin_proxy, price_median, out=np.zeros_like(price_median), where=has_price)
+    margin_score = np.minimum(100, np.where(
+        has_price,
+        np.minimum(50, price_median / 100 * 50) + np.maximum(0, margin_rate * 50),
+        0.0
+    ))
+    
+    # Risk score (0-100)
+    risk_return = columns["risk_return_proxy"]
+    risk_regulatory = columns["risk_regulatory_proxy"]
+    risk_hazmat = columns["risk_hazmat_proxy"]
+    
+    risk_score = np.minimum(100, (
+        (1.0 - np.minimum(1.0, risk_return)) * 40 +
+        (1.0 - np.minimum(1.0, risk_regulatory)) * 30 +
+        (1.0 - np.minimum(1.0, risk_hazmat)) * 30
+    ))
+    
+    winner_prob = (
+        demand_score * 0.35 +
+        competition_score * 0.25 +
+        margin_score * 0.25 +
+        risk_score * 0.15
+    ) / 100.0
+    
+    return {
+        "score_demand": round_scores(demand_score, 1),
+        "score_competition": round_scores(competition_score, 1),
+        "score_margin": round_scores(margin_score, 1),
+        "score_risk": round_scores(risk_score, 1),
+        "score_winner_prob": round_scores(winner_prob, 4),
+        "score_rank": round_scores(winner_prob * 100, 2),
+    }
+
+
+def compute_model_scores(
+    matrix,
+    model_version: str,
+    model_dir: Path = Path("models"),
+    model=None
+) -> Dict[str, np.ndarray]:
+    """
+    Score a whole week with a trained LightGBM model (see src/scoring/model_cache.py).
+    
+    The model is taken from the process-wide cache and run once over the
+    feature matrix. Component scores (demand, competition, margin, risk)
+    keep their baseline definitions so reports can still break a score down.
+    
+    Args:
+        matrix: WeekFeatureMatrix
+        model_version: Model file name in model_dir, without suffix
+        model_dir: Directory containing models
+        model: Optional already-loaded model (skips the cache lookup)
+    
+    Returns:
+        Dictionary of score arrays (same keys as compute_baseline_scores).
+        Classifiers set score_winner_prob to the predicted probability and
+        score_rank to 100x that; rankers set score_rank to the ranking score
+        and leave score_winner_prob NaN.
+    """
+    from src.scoring.model_cache import get_model, predict_matrix, is_ranker
+    
+    if model is None:
+        model = get_model(model_version, model_dir)
+    predictions = predict_matrix(model, matrix)
+    
+    scores = compute_baseline_scores(matrix)
+    if is_ranker(model):
+        scores["score_winner_prob"] = np.full(len(matrix), np.nan)
+        scores["score_rank"] = round_scores(predictions, 4)
+    else:
+        scores["score_winner_prob"] = round_scores(predictions, 4)
+        scores["score_rank"] = round_scores(predictions * 100, 2)
+    return scores
+
+
+def top_feature_contributions(contributions: np.ndarray, n: int = EXPLAIN_TOP_FEATURES) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pick each row's n largest contributions by absolute value.
+    
+    Args:
+        contributions: (rows, features) contribution matrix
+        n: Features per row
+    
+    Returns:
+        (column indexes, contributions), both (rows, n), largest |contribution| first
+    """
+    n = min(n, contributions.shape[1])
+    magnitude = -np.abs(contributions)
+    if n < contributions.shape[1]:
+        columns = np.argpartition(magnitude, n - 1, axis=1)[:, :n]
+    else:
+        columns = np.tile(np.arange(n), (len(contributions), 1))
+    order = np.argsort(np.take_along_axis(magnitude, columns, axis=1), axis=1, kind="stable")
+    columns = np.take_along_axis(columns, order, axis=1)
+    return columns, np.take_along_axis(contributions, columns, axis=1)
+
+
+def format_feature_value(value: Optional[float]) -> str:
+    """Format a feature value for an explanation string."""
+    if value is None:
+        return "missing"
+    if float(value).is_integer():
+        return f"{int(value):,}"
+    return f"{value:.3g}"
+
+
+def explain_model_scores(
+    matrix,
+    rows: List[int],
+    model_version: str,
+    model_dir: Path = Path("models"),
+    top_features: int = EXPLAIN_TOP_FEATURES
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Explain model scores with tree-SHAP contributions, for some rows only.
+    
+    Args:
+        matrix: WeekFeatureMatrix
+        rows: Row indexes to explain
+        model_version: Model version (see compute_model_scores)
         model_dir: Directory containing models
+        top_features: Contributing features listed per entity
+    
+    Returns:
+        row index -> explanations dict
+    """
+    from src.scoring.model_cache import get_model, feature_contributions
+    
+    if not rows:
+        return {}
+    
+    model = get_model(model_version, model_dir)
+    row_array = np.asarray(rows)
+    contributions, names = feature_contributions(model, matrix, row_array)
+    columns, values = top_feature_contributions(contributions, top_features)
+    
+    explained = {}
+    for k, i in enumerate(rows):
+        signals = []
+        for j, contribution in zip(columns[k].tolist(), values[k].tolist()):
+            name = names[j]
+            column = matrix.feature_names.index(name)
+            value = None if matrix.missing[i, column] else matrix.values[i, column].item()
+            signals.append({"feature": name, "value": value, "contribution": round(contribution, 4)})
         
+        explained[i] = {
+            "top_signals": [
+                f"{signal['feature']}: {format_feature_value(signal['value'])} ({signal['contribution']:+.3f})"
+                for signal in signals
+            ],
+            "feature_contributions": signals,
+        }
+    return explained
+
+
+def top_k_indices(values: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Indices of the k largest values, largest first.
+    
+    Uses argpartition, so only the selected k are sorted. Ties are broken by
+    position, exactly as a stable descending sort of all values would.
+    
+    Args:
+        values: 1-D array
+        k: Number of indices to return (None or >= len(values): all of them)
+    
     Returns:
-        List of scored entities with scores and explanations
+        Index array
     """
-    from src.utils.db import execute_query, get_db_cursor
-    import json
+    n = len(values)
+    if k is None or k >= n:
+        return np.argsort(-values, kind="stable")
+    if k <= 0:
+        return np.array([], dtype=np.int64)
     
-    logger.info(f"Scoring entities for week {week_start} with model {model_version}")
+    kth_value = values[np.argpartition(values, n - k)[n - k]]
+    above = np.flatnonzero(values > kth_value)
+    tied = np.flatnonzero(values == kth_value)[:k - len(above)]
+    selected = np.concatenate([above, tied])
+    return selected[np.lexsort((selected, -values[selected]))]
+
+
+def score_writer(batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+    """
+    Buffered upsert writer for entity_weekly_scores.
     
-    # Load features for week_start
-    query = """
-        SELECT entity_id, features
-        FROM entity_weekly_features
-        WHERE week_start = %s AND feature_version = 'v1.0'
+    Args:
+        batch_size: Rows per flush (default: DB_WRITE_BATCH_SIZE)
+        flush_interval: Seconds after a flush from which the next add() flushes (default: DB_WRITE_FLUSH_SECONDS)
+    
+    Returns:
+        BulkUpsertWriter taking rows in SCORE_COLUMNS order
+    """
+    from src.utils.db import BulkUpsertWriter
+    
+    return BulkUpsertWriter(
+        "entity_weekly_scores",
+        SCORE_COLUMNS,
+        conflict_columns=["week_start", "entity_id", "model_version"],
+        batch_size=batch_size,
+        flush_interval=flush_interval
+    )
+
+
+def score_model_version(
+    matrix,
+    model_version: str,
+    model_dir: Path = Path("models"),
+    top_n: Optional[int] = None,
+    explain_all: bool = False
+) -> Tuple[Dict[str, np.ndarray], List[int], Dict[int, Dict[str, Any]]]:
+    """
+    Score a week's matrix with one model version, without touching the database.
+    
+    Args:
+        matrix: WeekFeatureMatrix
+        model_version: 'baseline' or a model version in model_dir
+        model_dir: Directory containing models
+        top_n: Number of top-ranked rows to select (default: all)
+        explain_all: With a model, explain every row instead of only the top_n
+    
+    Returns:
+        (score arrays, top row indexes best first, row -> model explanations)
+    """
+    if model_version == "baseline":
+        score_arrays = compute_baseline_scores(matrix)
+    else:
+        score_arrays = compute_model_scores(matrix, model_version, model_dir)
+    
+    top = top_k_indices(score_arrays["score_rank"], top_n).tolist()
+    
+    # Model scores are explained with feature contributions, for the report
+    # cutoff only unless explain_all (other entities keep the raw signals)
+    model_explanations = {}
+    if model_version != "baseline":
+        explain_rows = list(range(len(matrix))) if explain_all else top
+        model_explanations = explain_model_scores(matrix, explain_rows, model_version, model_dir)
+    
+    return score_arrays, top, model_explanations
+
+
+def score_models(
+    week_start: date,
+    model_versions: List[str],
+    model_dir: Path = Path("models"),
+    write_batch_size: Optional[int] = None,
+    matrix=None,
+    matrix_dir: Optional[Path] = None,
+    top_n: Optional[int] = None,
+    explain_all: bool = False,
+    workers: Optional[int] = None,
+    skip_failed_shadows: bool = False
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Score all entities for a given week with several model versions in one pass.
+    
+    The feature matrix is loaded once and shared. Model versions are scored
+    concurrently on a thread pool (LightGBM predict and NumPy release the
+    GIL), then every version's rows go to entity_weekly_scores through one
+    bulk writer. The first version is the primary one: if it fails, the error
+    is raised and nothing is written. Other (shadow) versions fail the same
+    way unless skip_failed_shadows is set, in which case they are logged and
+    left out of the result.
+    
+    Args:
+        week_start: Week to score
+        model_versions: Model versions ('baseline' or versions in model_dir)
+        model_dir: Directory containing models
+        write_batch_size: Score rows per database write (default: DB_WRITE_BATCH_SIZE)
+        matrix: Optional WeekFeatureMatrix of the week (e.g. returned by
+            build_features_for_week). If None, it is loaded.
+        matrix_dir: Optional feature matrix cache directory to load from
+        top_n: Number of top-ranked entities to return per version (default: all)
+        explain_all: With a model, compute feature-contribution explanations
+            for every entity instead of only the top_n
+        workers: Scoring threads (default: one per model version)
+        skip_failed_shadows: Log and skip failing versions other than the first
+    
+    Returns:
+        model_version -> scored entities with scores and explanations, best
+        score_rank first (ready for src/serving/generate_report.opportunities_from_scores).
+        Skipped shadow versions are missing.
+    
+    Raises:
+        Exception: The scoring error of the primary version, or of a shadow
+            version without skip_failed_shadows
     """
-    feature_rows = execute_query(query, (week_start,))
+    from concurrent.futures import ThreadPoolExecutor
+    from src.features.feature_matrix import load_week_feature_matrix
     
-    if not feature_rows:
+    model_versions = list(dict.fromkeys(model_versions))
+    logger.info(f"Scoring entities for week {week_start} with models {', '.join(model_versions)}")
+    
+    # Load features for week_start
+    if matrix is None:
+        matrix = load_week_feature_matrix(week_start, cache_dir=matrix_dir)
+    
+    if not len(matrix):
         logger.warning(f"No features found for week {week_start}")
-        return []
+        return {model_version: [] for model_version in model_versions}
     
-    scores = []
+    with ThreadPoolExecutor(max_workers=workers or len(model_versions)) as pool:
+        futures = {
+            model_version: pool.submit(score_model_version, matrix, model_version, model_dir, top_n, explain_all)
+            for model_version in model_versions
+        }
     
-    for row in feature_rows:
-        entity_id = row['entity_id']
-        features = json.loads(row['features'])
-        
+    scored = {}
+    for model_version, future in futures.items():
         try:
-            if model_version == "baseline":
-                # Use baseline heuristic scoring
-                score_dict = compute_baseline_score(features)
-            else:
-                # TODO: Load and use ML model
-                logger.warning(f"ML model {model_version} not yet implemented, using baseline")
-                score_dict = compute_baseline_score(features)
-            
-            # Generate explanations
-            explanations = {
-                "top_signals": [
-                    f"TikTok views: {features.get('demand_tiktok_views_7d', 0):,}",
-                    f"BSR improvement: {features.get('demand_amazon_bsr_improvement_4w', 0):.1%}",
-                    f"Review velocity: {features.get('demand_amazon_review_velocity_4w', 0)}",
-                ],
-                "demand_breakdown": {
-                    "tiktok_views": features.get("demand_tiktok_views_7d", 0),
-                    "bsr_improvement": features.get("demand_amazon_bsr_improvement_4w", 0.0),
-                }
+            scored[model_version] = future.result()
+        except Exception as e:
+            logger.error(f"Error scoring with model {model_version}: {e}")
+            if model_version == model_versions[0] or not skip_failed_shadows:
+                raise
+    
+    columns = feature_columns(matrix, BASELINE_FEATURE_DEFAULTS)
+    tiktok_views = columns["demand_tiktok_views_7d"].astype(np.int64).tolist()
+    bsr_improvement = columns["demand_amazon_bsr_improvement_4w"].tolist()
+    review_velocity = columns["demand_amazon_review_velocity_4w"].astype(np.int64).tolist()
+    entity_ids = matrix.entity_ids.tolist()
+    
+    results = {}
+    with score_writer(write_batch_size) as writer:
+        for model_version, (score_arrays, top, model_explanations) in scored.items():
+            # NaN (e.g. a ranker's winner probability) is stored as NULL
+            score_columns = {
+                name: [None if value != value else value for value in values.tolist()]
+                for name, values in score_arrays.items()
             }
+            top_scores = dict.fromkeys(top)
             
-            # Store in database
-            with get_db_cursor() as cur:
-                cur.execute("""
-                    INSERT INTO entity_weekly_scores (
-                        week_start, entity_id, model_version,
-                        score_winner_prob, score_rank,
-                        score_demand, score_competition, score_margin, score_risk,
-                        explanations
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (week_start, entity_id, model_version)
-                    DO UPDATE SET
-                        score_winner_prob = EXCLUDED.score_winner_prob,
-                        score_rank = EXCLUDED.score_rank,
-                        score_demand = EXCLUDED.score_demand,
-                        score_competition = EXCLUDED.score_competition,
-                        score_margin = EXCLUDED.score_margin,
-                        score_risk = EXCLUDED.score_risk,
-                        explanations = EXCLUDED.explanations
-                """, (
+            for i, entity_id in enumerate(entity_ids):
+                score_dict = {name: values[i] for name, values in score_columns.items()}
+                
+                # Generate explanations
+                explanations = model_explanations.get(i) or {
+                    "top_signals": [
+                        f"TikTok views: {tiktok_views[i]:,}",
+                        f"BSR improvement: {bsr_improvement[i]:.1%}",
+                        f"Review velocity: {review_velocity[i]}",
+                    ],
+                    "demand_breakdown": {
+                        "tiktok_views": tiktok_views[i],
+                        "bsr_improvement": bsr_improvement[i],
+                    }
+                }
+                
+                writer.add((
                     week_start, entity_id, model_version,
                     score_dict["score_winner_prob"],
                     score_dict["score_rank"],
@@ -190,43 +585,106 @@ def score_entities(week_start: date, model_version: str = "baseline", model_dir:
                     score_dict["score_risk"],
                     json.dumps(explanations)
                 ))
+                
+                if i in top_scores:
+                    top_scores[i] = {
+                        "entity_id": entity_id,
+                        **score_dict,
+                        "explanations": explanations
+                    }
             
-            scores.append({
-                "entity_id": entity_id,
-                **score_dict,
-                "explanations": explanations
-            })
-            
-        except Exception as e:
-            logger.error(f"Error scoring entity {entity_id}: {e}")
-            continue
+            results[model_version] = list(top_scores.values())
+            logger.info(f"Scored {len(matrix)} entities with model {model_version}")
     
-    # Sort by rank
-    scores.sort(key=lambda x: x["score_rank"], reverse=True)
+    if writer.rows_failed:
+        logger.error(f"Failed to store {writer.rows_failed} score rows")
     
-    logger.info(f"Scored {len(scores)} entities")
-    return scores
+    return results
+
+
+def score_entities(
+    week_start: date,
+    model_version: str = "baseline",
+    model_dir: Path = Path("models"),
+    write_batch_size: Optional[int] = None,
+    matrix=None,
+    matrix_dir: Optional[Path] = None,
+    top_n: Optional[int] = None,
+    explain_all: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Score all entities for a given week.
+    
+    Every entity's scores are written to entity_weekly_scores in bulk; only
+    the top_n are kept in memory and returned, ready for
+    src/serving/generate_report.opportunities_from_scores.
+    
+    Args:
+        week_start: Week to score
+        model_version: Model version to use ('baseline' or model version)
+        model_dir: Directory containing models
+        write_batch_size: Score rows per database write (default: DB_WRITE_BATCH_SIZE)
+        matrix: Optional WeekFeatureMatrix of the week (e.g. returned by
+            build_features_for_week). If None, it is loaded.
+        matrix_dir: Optional feature matrix cache directory to load from
+        top_n: Number of top-ranked entities to return (default: all)
+        explain_all: With a model, compute feature-contribution explanations
+            for every entity instead of only the top_n
+    
+    Returns:
+        Scored entities with scores and explanations, best score_rank first
+    
+    Raises:
+        Exception: If scoring with model_version fails
+    """
+    return score_models(
+        week_start, [model_version], model_dir,
+        write_batch_size=write_batch_size,
+        matrix=matrix,
+        matrix_dir=matrix_dir,
+        top_n=top_n,
+        explain_all=explain_all
+    )[model_version]
 
 
 def main():
     parser = argparse.ArgumentParser(description="Score opportunities for a week")
     parser.add_argument("--week_start", type=str, required=True, help="Week start (YYYY-MM-DD)")
-    parser.add_argument("--model_version", type=str, default="baseline", help="Model version (default: baseline)")
+    parser.add_argument("--model_version", type=str, nargs="+", default=["baseline"],
+                        help="Model version(s) to score side by side (default: baseline)")
     parser.add_argument("--model_dir", type=str, default="models", help="Model directory")
+    parser.add_argument("--workers", type=int, help="Scoring threads (default: one per model version)")
+    parser.add_argument("--write_batch_size", type=int, help="Score rows per database write (default: DB_WRITE_BATCH_SIZE or 1000)")
+    parser.add_argument("--matrix_dir", type=str, help="Feature matrix cache directory (default: read features from the database)")
+    parser.add_argument("--explain-all", action="store_true", help="Explain every entity's model score, not only the top ones")
+    parser.add_argument("--skip_failed_shadows", action="store_true",
+                        help="Still store the other versions' scores when a shadow version fails (exit status stays 1)")
     args = parser.parse_args()
     
     week_start = date.fromisoformat(args.week_start)
     model_dir = Path(args.model_dir)
     
-    scores = score_entities(week_start, args.model_version, model_dir)
-    logger.info(f"Scored {len(scores)} entities")
+    results = score_models(
+        week_start, args.model_version, model_dir,
+        write_batch_size=args.write_batch_size,
+        matrix_dir=Path(args.matrix_dir) if args.matrix_dir else None,
+        top_n=5,
+        explain_all=args.explain_all,
+        workers=args.workers,
+        skip_failed_shadows=args.skip_failed_shadows
+    )
     
-    if scores:
-        logger.info(f"Top 5 opportunities:")
-        for i, score in enumerate(scores[:5], 1):
-            logger.info(f"  {i}. Entity {score['entity_id'][:8]}... - Score: {score['score_winner_prob']:.2%}")
+    for model_version, scores in results.items():
+        if scores:
+            logger.info(f"Top 5 opportunities ({model_version}):")
+            for i, score in enumerate(scores[:5], 1):
+                logger.info(f"  {i}. Entity {score['entity_id'][:8]}... - Score rank: {score['score_rank']}")
+    
+    failed = [model_version for model_version in dict.fromkeys(args.model_version) if model_version not in results]
+    if failed:
+        logger.error(f"Scoring failed for model versions: {', '.join(failed)}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
     main()
-
@@ -21,7 +21,7 @@ def load_top_opportunities(week_start: date, top_n: int = 50, model_version: str
         week_start: Week to load
         top_n: Number of top opportunities
         model_version: Model version to use
-        
+    
     Returns:
         List of opportunity dictionaries
     """
@@ -50,36 +50,89 @@ def load_top_opportunities(week_start: date, top_n: int = 50, model_version: str
     
     rows = execute_query(query, (week_start, model_version, top_n))
     
-    opportunities = []
-    for row in rows:
-        opp = {
-            "entity_id": row["entity_id"],
-            "canonical_name": row["canonical_name"],
-            "category_primary": row["category_primary"],
-            "score_winner_prob": float(row["score_winner_prob"]) if row["score_winner_prob"] else 0.0,
-            "score_rank": float(row["score_rank"]) if row["score_rank"] else 0.0,
-            "score_demand": float(row["score_demand"]) if row["score_demand"] else 0.0,
-            "score_competition": float(row["score_competition"]) if row["score_competition"] else 0.0,
-            "score_margin": float(row["score_margin"]) if row["score_margin"] else 0.0,
-            "score_risk": float(row["score_risk"]) if row["score_risk"] else 0.0,
-        }
-        
-        if row["explanations"]:
-            import json
-            opp["explanations"] = json.loads(row["explanations"]) if isinstance(row["explanations"], str) else row["explanations"]
-        else:
-            opp["explanations"] = {}
-        
-        # Add placeholder innovation angles and experiment plan
-        opp["innovation_angles"] = [
-            "Improve durability based on review feedback",
-            "Add missing feature requested by customers",
-        ]
-        opp["experiment_plan"] = f"Test {opp['canonical_name']} with fake-door landing page targeting TikTok audience"
-        
-        opportunities.append(opp)
+    return [opportunity_from_score(row, row) for row in rows]
+
+
+def load_entity_info(entity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Load name and category of a few entities by ID.
+    
+    Args:
+        entity_ids: Entity IDs
     
-    return opportunities
+    Returns:
+        entity_id -> entities row (canonical_name, category_primary)
+    """
+    from src.utils.db import execute_query
+    from src.utils.query_helper import convert_any_clause
+    
+    if not entity_ids:
+        return {}
+    
+    entity_clause, entity_params = convert_any_clause("entity_id", entity_ids)
+    rows = execute_query(f"""
+        SELECT entity_id, canonical_name, category_primary
+        FROM entities
+        WHERE {entity_clause}
+    """, entity_params)
+    return {row["entity_id"]: row for row in rows}
+
+
+def opportunity_from_score(score: Dict[str, Any], entity: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a report opportunity from an entity's scores.
+    
+    Args:
+        score: entity_weekly_scores row or score_entities result
+        entity: entities row with canonical_name and category_primary
+    
+    Returns:
+        Opportunity dictionary
+    """
+    opp = {
+        "entity_id": score["entity_id"],
+        "canonical_name": entity.get("canonical_name"),
+        "category_primary": entity.get("category_primary"),
+        "score_winner_prob": float(score["score_winner_prob"]) if score["score_winner_prob"] else 0.0,
+        "score_rank": float(score["score_rank"]) if score["score_rank"] else 0.0,
+        "score_demand": float(score["score_demand"]) if score["score_demand"] else 0.0,
+        "score_competition": float(score["score_competition"]) if score["score_competition"] else 0.0,
+        "score_margin": float(score["score_margin"]) if score["score_margin"] else 0.0,
+        "score_risk": float(score["score_risk"]) if score["score_risk"] else 0.0,
+    }
+    
+    if score["explanations"]:
+        opp["explanations"] = json.loads(score["explanations"]) if isinstance(score["explanations"], str) else score["explanations"]
+    else:
+        opp["explanations"] = {}
+    
+    # Add placeholder innovation angles and experiment plan
+    opp["innovation_angles"] = [
+        "Improve durability based on review feedback",
+        "Add missing feature requested by customers",
+    ]
+    opp["experiment_plan"] = f"Test {opp['canonical_name']} with fake-door landing page targeting TikTok audience"
+    
+    return opp
+
+
+def opportunities_from_scores(scores: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Build report opportunities from score_entities(..., top_n=N) output,
+    without reading entity_weekly_scores back.
+    
+    Args:
+        scores: Scored entities, best first
+    
+    Returns:
+        List of opportunity dictionaries, in the same order
+    """
+    entities = load_entity_info([score["entity_id"] for score in scores])
+    return [
+        opportunity_from_score(score, entities[score["entity_id"]])
+        for score in scores
+        if score["entity_id"] in entities
+    ]
 
 
 def generate_markdown_report(opportunities: List[Dict[str, Any]], week_start: date, output_path: Path) -> None:
@@ -0,0 +1,352 @@
+"""
+Resident scoring service for what-if scoring.
+Keeps one week's WeekFeatureMatrix and the scoring model in memory and
+scores feature overrides over HTTP, so analysts don't have to rerun the
+score_week CLI to ask "what if price drops 20%".
+
+    POST /score
+    {"entity_id": "...", "overrides": {"econ_price_median": 15.0}, "scale": {"econ_price_median": 0.8}}
+    
+    POST /score
+    {"requests": [{"entity_id": "...", ...}, {"features": {...}}]}
+
+A background thread reloads the matrix when a newer week lands (or the
+week's stored features are rebuilt) and the model when its file changes.
+
+Usage:
+    python -m src.serving.scoring_service --model_version baseline --port 8765
+"""
+import argparse
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+DEFAULT_RELOAD_INTERVAL = 30.0
+
+
+@dataclass
+class ServiceSnapshot:
+    """Everything a request reads, swapped as one reference on reload."""
+    matrix: Any
+    model: Any
+    matrix_stamp: tuple
+
+
+def latest_feature_week(feature_version: Optional[str] = None) -> Optional[date]:
+    """
+    Most recent week with stored features.
+    
+    Args:
+        feature_version: Feature version (default: build_features.FEATURE_VERSION)
+    
+    Returns:
+        Week start, or None if no features are stored
+    """
+    from src.features.build_features import FEATURE_VERSION
+    from src.utils.db import execute_query
+    from src.utils.query_helper import get_param_placeholder, to_date
+    
+    rows = execute_query(
+        f"SELECT MAX(week_start) AS week_start FROM entity_weekly_features WHERE feature_version = {get_param_placeholder()}",
+        (feature_version or FEATURE_VERSION,)
+    )
+    if not rows or rows[0]['week_start'] is None:
+        return None
+    return to_date(rows[0]['week_start'])
+
+
+def _feature_value(name: str, value: Any, allow_missing: bool = True) -> float:
+    """A request's value for one feature as a float (NaN for None if allow_missing)."""
+    if value is None and allow_missing:
+        return np.nan
+    if not isinstance(value, (int, float)):
+        raise ValueError(f"Value of {name} must be a number, got {type(value).__name__}")
+    return float(value)
+
+
+def _request_mapping(request: Dict[str, Any], key: str) -> Dict[str, Any]:
+    """An optional object-valued request field ({} if absent or null)."""
+    value = request.get(key)
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f"{key} must be an object, got {type(value).__name__}")
+    return value
+
+
+class ScoringService:
+    """
+    Scores feature overrides against an in-memory week of features.
+    
+    Requests only read self.snapshot, which reload() replaces in one
+    assignment, so scoring never waits on a reload.
+    """
+    
+    def __init__(
+        self,
+        model_version: str = "baseline",
+        model_dir: Path = Path("models"),
+        week_start: Optional[date] = None,
+        matrix_dir: Optional[Path] = None,
+        reload_interval: float = DEFAULT_RELOAD_INTERVAL
+    ):
+        """
+        Args:
+            model_version: 'baseline' or a model version in model_dir
+            model_dir: Directory containing models
+            week_start: Week to serve. If None, serves the latest week with
+                features and moves to newer weeks as they land.
+            matrix_dir: Optional feature matrix cache directory
+            reload_interval: Seconds between checks for new features or a new model
+        """
+        self.model_version = model_version
+        self.model_dir = Path(model_dir)
+        self.week_start = week_start
+        self.matrix_dir = Path(matrix_dir) if matrix_dir else None
+        self.reload_interval = reload_interval
+        self.snapshot: Optional[ServiceSnapshot] = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+    
+    def _matrix_stamp(self) -> tuple:
+        """Identifies the matrix that should be served: (week, stored_features_stamp)."""
+        from src.features.feature_matrix import stored_features_stamp
+        
+        week_start = self.week_start or latest_feature_week()
+        if week_start is None:
+            raise ValueError("No features stored yet; build features first")
+        
+        return (week_start, stored_features_stamp(week_start))
+    
+    def _load_model(self):
+        """Current model (None for the baseline), via the process-wide model cache."""
+        from src.scoring.model_cache import get_model
+        
+        if self.model_version == "baseline":
+            return None
+        return get_model(self.model_version, self.model_dir)
+    
+    def reload(self, force: bool = False) -> bool:
+        """
+        Reload the matrix and model if either changed.
+        
+        Args:
+            force: Reload the matrix even if its stamp is unchanged
+        
+        Returns:
+            True if anything was reloaded
+        """
+        from src.features.feature_matrix import load_week_feature_matrix
+        
+        with self._reload_lock:
+            current = self.snapshot
+            stamp = self._matrix_stamp()
+            model = self._load_model()
+            
+            if current is not None and not force and stamp == current.matrix_stamp and model is current.model:
+                return False
+            
+            if current is None or force or stamp != current.matrix_stamp:
+                matrix = load_week_feature_matrix(stamp[0], cache_dir=self.matrix_dir, stamp=stamp[1])
+                logger.info(f"Serving week {stamp[0]} ({len(matrix)} entities)")
+            else:
+                matrix = current.matrix
+            
+            self.snapshot = ServiceSnapshot(matrix=matrix, model=model, matrix_stamp=stamp)
+            return True
+    
+    def _watch(self) -> None:
+        """Background loop: check for a new week or model every reload_interval seconds."""
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Error reloading scoring service: {e}")
+    
+    def start_watcher(self) -> threading.Thread:
+        """Start the hot-reload thread."""
+        thread = threading.Thread(target=self._watch, name="scoring-service-reload", daemon=True)
+        thread.start()
+        return thread
+    
+    def stop(self) -> None:
+        """Stop the hot-reload thread."""
+        self._stop.set()
+    
+    def _request_row(self, matrix, request: Dict[str, Any]):
+        """Feature values and missing mask for one request, before overrides."""
+        if "entity_id" in request:
+            try:
+                i = matrix.row_index(request["entity_id"])
+            except KeyError:
+                raise ValueError(f"Unknown entity {request['entity_id']} for week {matrix.week_start}")
+            return matrix.values[i].copy(), matrix.missing[i].copy()
+        
+        if "features" in request:
+            features = _request_mapping(request, "features")
+            values = np.array([_feature_value(name, features.get(name)) for name in matrix.feature_names])
+            return values, np.isnan(values)
+        
+        raise ValueError("Each request needs an entity_id or a features object")
+    
+    def score_batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Score a batch of what-if requests in one vectorized pass.
+        
+        Each request names an entity of the served week (entity_id) or gives
+        a full feature dict (features), plus optional overrides (feature ->
+        new value, None for missing) and scale (feature -> multiplier).
+        Entity requests also get base_scores, the scores without changes.
+        
+        Args:
+            requests: Request dicts
+        
+        Returns:
+            One result dict per request
+        
+        Raises:
+            ValueError: If a request is malformed (not an object, unknown
+                entity or feature, non-numeric value)
+        """
+        from src.features.feature_matrix import WeekFeatureMatrix
+        from src.scoring.score_week import compute_baseline_scores, compute_model_scores
+        
+        snapshot = self.snapshot
+        matrix = snapshot.matrix
+        columns = {name: j for j, name in enumerate(matrix.feature_names)}
+        
+        if not isinstance(requests, list):
+            raise ValueError(f"requests must be a list, got {type(requests).__name__}")
+        
+        rows = []
+        for request in requests:
+            if not isinstance(request, dict):
+                raise ValueError(f"Each request must be an object, got {type(request).__name__}")
+            overrides = _request_mapping(request, "overrides")
+            scale = _request_mapping(request, "scale")
+            
+            values, missing = self._request_row(matrix, request)
+            if "entity_id" in request:
+                rows.append((values.copy(), missing.copy()))
+            
+            for name, value in overrides.items():
+                if name not in columns:
+                    raise ValueError(f"Unknown feature {name}")
+                values[columns[name]] = _feature_value(name, value)
+                missing[columns[name]] = value is None
+            for name, factor in scale.items():
+                if name not in columns:
+                    raise ValueError(f"Unknown feature {name}")
+                values[columns[name]] *= _feature_value(name, factor, allow_missing=False)
+            rows.append((values, missing))
+        
+        if not rows:
+            return []
+        
+        batch = WeekFeatureMatrix(
+            week_start=matrix.week_start,
+            feature_version=matrix.feature_version,
+            entity_ids=np.arange(len(rows)).astype(str),
+            feature_names=matrix.feature_names,
+            values=np.vstack([values for values, _ in rows]),
+            missing=np.vstack([missing for _, missing in rows]),
+        )
+        if snapshot.model is None:
+            score_arrays = compute_baseline_scores(batch)
+        else:
+            score_arrays = compute_model_scores(batch, self.model_version, model=snapshot.model)
+        
+        score_rows = [{} for _ in rows]
+        for name, values in score_arrays.items():
+            for k, value in enumerate(values.tolist()):
+                score_rows[k][name] = None if value != value else value
+        
+        results = []
+        k = 0
+        for request in requests:
+            result = {"week_start": matrix.week_start.isoformat(), "model_version": self.model_version}
+            if "entity_id" in request:
+                result["entity_id"] = request["entity_id"]
+                result["base_scores"] = score_rows[k]
+                k += 1
+            result["scores"] = score_rows[k]
+            k += 1
+            results.append(result)
+        return results
+
+
+def create_app(service: ScoringService):
+    """
+    Flask app exposing a ScoringService.
+    
+    Args:
+        service: Loaded ScoringService
+    
+    Returns:
+        Flask app
+    """
+    from flask import Flask, jsonify, request
+    
+    app = Flask(__name__)
+    
+    @app.route("/health")
+    def health():
+        snapshot = service.snapshot
+        return jsonify({
+            "week_start": snapshot.matrix.week_start.isoformat(),
+            "model_version": service.model_version,
+            "entities": len(snapshot.matrix),
+        })
+    
+    @app.route("/score", methods=["POST"])
+    def score():
+        body = request.get_json(force=True, silent=True)
+        if not isinstance(body, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
+        
+        try:
+            if "requests" in body:
+                return jsonify({"results": service.score_batch(body["requests"])})
+            return jsonify(service.score_batch([body])[0])
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": str(e)}), 400
+    
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the what-if scoring service")
+    parser.add_argument("--model_version", type=str, default="baseline", help="Model version (default: baseline)")
+    parser.add_argument("--model_dir", type=str, default="models", help="Model directory")
+    parser.add_argument("--week_start", type=str, help="Week to serve (default: latest week, following new weeks)")
+    parser.add_argument("--matrix_dir", type=str, help="Feature matrix cache directory")
+    parser.add_argument("--reload_interval", type=float, default=DEFAULT_RELOAD_INTERVAL,
+                        help="Seconds between checks for a new week or model")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port")
+    args = parser.parse_args()
+    
+    service = ScoringService(
+        model_version=args.model_version,
+        model_dir=Path(args.model_dir),
+        week_start=date.fromisoformat(args.week_start) if args.week_start else None,
+        matrix_dir=Path(args.matrix_dir) if args.matrix_dir else None,
+        reload_interval=args.reload_interval,
+    )
+    service.reload()
+    service.start_watcher()
+    
+    create_app(service).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,356 +4,822 @@ Implements label spec from docs/06_label_spec.md
 """
 import argparse
 import logging
-from datetime import date, timedelta
-from typing import Dict, List
-from src.utils.db import execute_query, get_db_cursor
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import groupby
+from typing import Dict, Any, Optional, List, Tuple
+from src.utils.db import execute_query, get_db_cursor, stream_query
 import statistics
 
+import numpy as np
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def compute_amazon_winner_labels(week_start: date, horizon_weeks: int = 8) -> None:
+# Winner label horizons (weeks); each is a column label_winner_<n>w
+LABEL_HORIZONS = (4, 8, 12)
+# Horizon over which durable and trend spike are judged
+DURABLE_HORIZON_WEEKS = 8
+
+# Days of TikTok metrics a week's trend is fit on: [week_start - 2 weeks, week_start + 1 week)
+TIKTOK_TREND_WINDOW_DAYS = 21
+
+# Consecutive weeks labeled by one backfill task, sharing one read of their data
+LABEL_BACKFILL_WEEKS_PER_TASK = 8
+
+LABEL_COLUMNS = [
+    "week_start", "entity_id",
+    "label_winner_4w", "label_winner_8w", "label_winner_12w",
+    "label_trend_spike", "label_durable",
+]
+
+
+def label_writer(batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
     """
-    Compute Amazon winner labels for a given week.
+    Buffered upsert writer for entity_weekly_labels.
+    
+    Args:
+        batch_size: Rows per flush (default: DB_WRITE_BATCH_SIZE)
+        flush_interval: Seconds after a flush from which the next add() flushes (default: DB_WRITE_FLUSH_SECONDS)
+    
+    Returns:
+        BulkUpsertWriter taking rows in LABEL_COLUMNS order
+    """
+    from src.utils.db import BulkUpsertWriter
+    
+    return BulkUpsertWriter(
+        "entity_weekly_labels",
+        LABEL_COLUMNS,
+        conflict_columns=["week_start", "entity_id"],
+        batch_size=batch_size,
+        flush_interval=flush_interval
+    )
+
+
+def load_label_start_listings(week_start: date) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Load every concept entity's top 10 ranked listings on week_start in one query.
     
     Args:
         week_start: Week to compute labels for
-        horizon_weeks: Look-ahead horizon (4, 8, or 12 weeks)
+    
+    Returns:
+        entity_id -> listing rows, ordered by BSR
     """
-    logger.info(f"Computing Amazon winner labels for {week_start} (horizon: {horizon_weeks}w)")
+    from src.features.listing_context import ENTITY_LISTINGS_JOIN, TOP_N_LISTINGS
+    from src.utils.query_helper import get_param_placeholder
+    
+    param = get_param_placeholder()
+    query = f"""
+        SELECT entity_id, asin, bsr, review_count, price_usd
+        FROM (
+            SELECT em.entity_id, a.asin, a.bsr, a.review_count, a.price_usd,
+                ROW_NUMBER() OVER (PARTITION BY em.entity_id ORDER BY a.bsr, a.asin) AS rn
+            {ENTITY_LISTINGS_JOIN}
+            JOIN entities e ON e.entity_id = em.entity_id
+            WHERE e.entity_type = 'concept' AND a.dt = {param}
+                AND a.bsr IS NOT NULL
+        ) ranked
+        WHERE rn <= {TOP_N_LISTINGS}
+        ORDER BY entity_id, rn
+    """
+    by_entity = defaultdict(list)
+    for row in execute_query(query, (week_start,)):
+        by_entity[row['entity_id']].append(row)
+    return by_entity
+
+
+def stream_label_listings(first_day: date, last_day: date):
+    """
+    Stream (entity_id, ranked listings on [first_day, last_day]) for every concept entity.
     
-    # Get all entities
-    entities = execute_query("SELECT entity_id FROM entities WHERE entity_type = 'concept'")
+    One scan ordered by entity and date, so a horizon (or several
+    overlapping ones) is read once.
     
-    if not entities:
-        logger.warning("No entities found")
-        return
+    Args:
+        first_day: First listing date
+        last_day: Last listing date (inclusive)
+    
+    Yields:
+        (entity_id, listing rows ordered by dt, dt as a date)
+    """
+    from src.features.listing_context import ENTITY_LISTINGS_JOIN
+    from src.utils.query_helper import get_param_placeholder, to_date
+    
+    param = get_param_placeholder()
+    query = f"""
+        SELECT em.entity_id, a.asin, a.bsr, a.review_count, a.price_usd, a.dt
+        {ENTITY_LISTINGS_JOIN}
+        JOIN entities e ON e.entity_id = em.entity_id
+        WHERE e.entity_type = 'concept'
+            AND a.dt >= {param} AND a.dt <= {param}
+            AND a.bsr IS NOT NULL
+        ORDER BY em.entity_id, a.dt
+    """
+    rows = stream_query(query, (first_day, last_day))
+    for entity_id, entity_rows in groupby(rows, key=lambda row: row['entity_id']):
+        yield entity_id, [dict(row, dt=to_date(row['dt'])) for row in entity_rows]
+
+
+@lru_cache(maxsize=4096)
+def week_key(day: date) -> str:
+    """Calendar week of a date ('%Y-%W'), cached since horizons share few distinct days."""
+    return day.strftime('%Y-%W')
+
+
+def weekly_bsr_series(end_listings: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """
+    Group horizon BSRs by calendar week.
+    
+    Args:
+        end_listings: Listing rows over the horizon, dt as a date
+    
+    Returns:
+        '%Y-%W' week key -> BSRs of that week
+    """
+    weekly_bsrs = defaultdict(list)
+    for row in end_listings:
+        week_bsrs = weekly_bsrs[week_key(row['dt'])]
+        if row['bsr']:
+            week_bsrs.append(row['bsr'])
+    return weekly_bsrs
+
+
+def horizon_outcome(
+    start_listings: List[Dict[str, Any]],
+    end_listings: List[Dict[str, Any]]
+) -> Tuple[bool, bool, bool]:
+    """
+    Evaluate the winner criteria over one horizon.
+    
+    Args:
+        start_listings: Top 10 ranked listings on week_start
+        end_listings: Ranked listings over the horizon, dt as a date
+    
+    Returns:
+        (winner, durable, trend spike)
+    """
+    # Calculate metrics
+    start_bsrs = [row['bsr'] for row in start_listings if row['bsr']]
+    start_median_bsr = statistics.median(start_bsrs) if start_bsrs else None
+    
+    # Median BSR over the last 4 weeks of the horizon
+    weekly_bsrs = weekly_bsr_series(end_listings)
+    final_bsrs = []
+    for week_key in sorted(weekly_bsrs.keys())[-4:]:
+        final_bsrs.extend(weekly_bsrs[week_key])
+    end_median_bsr = statistics.median(final_bsrs) if final_bsrs else None
+    
+    # BSR improvement (lower is better, so improvement = (start - end) / start)
+    bsr_improvement = None
+    if start_median_bsr and end_median_bsr and start_median_bsr > 0:
+        bsr_improvement = (start_median_bsr - end_median_bsr) / start_median_bsr
+    
+    # Review velocity (reviews added in horizon period)
+    start_reviews = sum(row['review_count'] or 0 for row in start_listings)
+    end_reviews = sum(row['review_count'] or 0 for row in end_listings) if end_listings else start_reviews
+    review_velocity = end_reviews - start_reviews
+    
+    # Price stability
+    start_prices = [float(row['price_usd']) for row in start_listings if row['price_usd']]
+    end_prices = [float(row['price_usd']) for row in end_listings if row['price_usd']] if end_listings else start_prices
+    
+    start_median_price = statistics.median(start_prices) if start_prices else None
+    end_median_price = statistics.median(end_prices) if end_prices else None
+    
+    price_collapse = None
+    if start_median_price and end_median_price and start_median_price > 0:
+        price_collapse = (start_median_price - end_median_price) / start_median_price
+    
+    # Winner criteria: BSR improves >= 30%, good review velocity, price stable
+    winner = bool(
+        bsr_improvement and bsr_improvement >= 0.30 and
+        review_velocity > 0 and
+        (price_collapse is None or price_collapse <= 0.10)
+    )
+    
+    sorted_weeks = sorted(weekly_bsrs.keys())
+    
+    # Check durability (improvement holds for >= 6 of the horizon's weeks)
+    durable = False
+    if winner and weekly_bsrs:
+        improving_weeks = 0
+        prev_bsr = start_median_bsr
+        for week_key in sorted_weeks:
+            week_bsrs = weekly_bsrs[week_key]
+            if week_bsrs:
+                week_median = statistics.median(week_bsrs)
+                if prev_bsr and week_median and week_median < prev_bsr:
+                    improving_weeks += 1
+                prev_bsr = week_median
+        
+        durable = improving_weeks >= 6
+    
+    # Trend spike: huge improvement then revert
+    trend_spike = False
+    if bsr_improvement and bsr_improvement > 0.50 and len(sorted_weeks) >= 3:
+        early_bsrs = []
+        late_bsrs = []
+        for week_key in sorted_weeks[:len(sorted_weeks)//2]:
+            early_bsrs.extend(weekly_bsrs[week_key])
+        for week_key in sorted_weeks[len(sorted_weeks)//2:]:
+            late_bsrs.extend(weekly_bsrs[week_key])
+        
+        if early_bsrs and late_bsrs:
+            early_median = statistics.median(early_bsrs)
+            late_median = statistics.median(late_bsrs)
+            if early_median and late_median and late_median > early_median * 1.2:
+                trend_spike = True
+    
+    return winner, durable, trend_spike
+
+
+def amazon_labels_from_rows(
+    week_start: date,
+    start_listings: List[Dict[str, Any]],
+    end_listings: List[Dict[str, Any]],
+    horizon_weeks: int = max(LABEL_HORIZONS)
+) -> Dict[str, Optional[bool]]:
+    """
+    Derive one entity's Amazon winner labels for every horizon from one scan.
+    
+    Each horizon in LABEL_HORIZONS up to horizon_weeks is evaluated on the
+    prefix of end_listings that falls inside it; durable and trend spike are
+    judged over DURABLE_HORIZON_WEEKS. Labels of horizons that were not
+    evaluated are None.
+    
+    Args:
+        week_start: Week the labels are for
+        start_listings: Top 10 ranked listings on week_start
+        end_listings: Ranked listings over the longest horizon, dt as a date
+        horizon_weeks: Longest horizon covered by end_listings
     
-    horizon_date = week_start + timedelta(weeks=horizon_weeks)
+    Returns:
+        Label column -> value
+    """
+    labels = {column: None for column in LABEL_COLUMNS[2:]}
     
-    for entity_row in entities:
-        entity_id = entity_row['entity_id']
+    for horizon in LABEL_HORIZONS:
+        if horizon > horizon_weeks:
+            continue
         
+        horizon_date = week_start + timedelta(weeks=horizon)
+        winner, durable, trend_spike = horizon_outcome(
+            start_listings,
+            [row for row in end_listings if row['dt'] <= horizon_date]
+        )
+        labels[f"label_winner_{horizon}w"] = winner
+        if horizon == DURABLE_HORIZON_WEEKS:
+            labels["label_durable"] = durable
+            labels["label_trend_spike"] = trend_spike
+    
+    return labels
+
+
+def amazon_label_rows(week_horizons: Dict[date, int]) -> List[tuple]:
+    """
+    Compute Amazon winner label rows for one or more weeks from one scan.
+    
+    The listings of every week's horizon are read in a single ordered scan,
+    so weeks whose horizons overlap share the daily data instead of each
+    re-reading it.
+    
+    Args:
+        week_horizons: week_start -> longest horizon to label (weeks)
+    
+    Returns:
+        Label rows in LABEL_COLUMNS order
+    """
+    # Entities without ranked listings on week_start are not labeled
+    start_listings = {week_start: load_label_start_listings(week_start) for week_start in week_horizons}
+    pending = {
+        (week_start, entity_id)
+        for week_start, by_entity in start_listings.items()
+        for entity_id in by_entity
+    }
+    if not pending:
+        return []
+    
+    label_rows = []
+    
+    def add_labels(week_start: date, entity_id: str, end_listings: List[Dict[str, Any]]) -> None:
         try:
-            # Get entity aliases
-            aliases = execute_query(
-                "SELECT alias_text FROM entity_aliases WHERE entity_id = %s AND source = 'amazon'",
-                (entity_id,)
-            )
-            
-            if not aliases:
-                continue
-            
-            amazon_aliases = [a['alias_text'] for a in aliases]
-            
-            # Get top listings at week_start
-            query = """
-                SELECT asin, bsr, review_count, price_usd
-                FROM amazon_listings_daily
-                WHERE dt = %s
-                    AND (title ILIKE ANY(%s) OR brand = ANY(%s))
-                    AND bsr IS NOT NULL
-                ORDER BY bsr
-                LIMIT 10
-            """
-            start_listings = execute_query(query, (
+            labels = amazon_labels_from_rows(
                 week_start,
-                [f'%{alias}%' for alias in amazon_aliases],
-                amazon_aliases
-            ))
-            
-            if not start_listings:
-                continue
-            
-            # Get listings at horizon date
-            end_query = """
-                SELECT asin, bsr, review_count, price_usd, dt
-                FROM amazon_listings_daily
-                WHERE dt >= %s AND dt <= %s
-                    AND (title ILIKE ANY(%s) OR brand = ANY(%s))
-                    AND bsr IS NOT NULL
-                ORDER BY dt DESC, bsr
-            """
-            end_listings = execute_query(end_query, (
-                week_start + timedelta(weeks=1),
-                horizon_date,
-                [f'%{alias}%' for alias in amazon_aliases],
-                amazon_aliases
-            ))
-            
-            # Calculate metrics
-            start_bsrs = [row['bsr'] for row in start_listings if row['bsr']]
-            start_median_bsr = statistics.median(start_bsrs) if start_bsrs else None
-            
-            # Get median BSR at end (use latest available)
-            if end_listings:
-                # Group by week and get median BSR for each week
-                weekly_bsrs = {}
-                for row in end_listings:
-                    week_key = row['dt'].strftime('%Y-%W')
-                    if week_key not in weekly_bsrs:
-                        weekly_bsrs[week_key] = []
-                    if row['bsr']:
-                        weekly_bsrs[week_key].append(row['bsr'])
-                
-                # Get median BSR for final weeks
-                final_bsrs = []
-                for week_key in sorted(weekly_bsrs.keys())[-4:]:  # Last 4 weeks
-                    final_bsrs.extend(weekly_bsrs[week_key])
-                
-                end_median_bsr = statistics.median(final_bsrs) if final_bsrs else None
-            else:
-                end_median_bsr = None
-            
-            # BSR improvement (lower is better, so improvement = (start - end) / start)
-            bsr_improvement = None
-            if start_median_bsr and end_median_bsr and start_median_bsr > 0:
-                bsr_improvement = (start_median_bsr - end_median_bsr) / start_median_bsr
-            
-            # Review velocity (reviews added in horizon period)
-            start_reviews = sum(row['review_count'] or 0 for row in start_listings)
-            end_reviews = sum(row['review_count'] or 0 for row in end_listings) if end_listings else start_reviews
-            review_velocity = end_reviews - start_reviews
-            
-            # Get category review velocity baseline (for top 20% check)
-            category = start_listings[0].get('category') or 'Unknown'
-            category_velocity_query = """
-                SELECT SUM(review_count) as total_reviews
-                FROM amazon_listings_daily
-                WHERE dt = %s AND category = %s
-                GROUP BY category
-            """
-            category_data = execute_query(category_velocity_query, (week_start, category))
-            category_total = category_data[0]['total_reviews'] if category_data else 0
-            
-            # Price stability
-            start_prices = [float(row['price_usd']) for row in start_listings if row['price_usd']]
-            end_prices = [float(row['price_usd']) for row in end_listings if row['price_usd']] if end_listings else start_prices
-            
-            start_median_price = statistics.median(start_prices) if start_prices else None
-            end_median_price = statistics.median(end_prices) if end_prices else None
-            
-            price_collapse = None
-            if start_median_price and end_median_price and start_median_price > 0:
-                price_collapse = (start_median_price - end_median_price) / start_median_price
-            
-            # Determine labels
-            label_winner_4w = False
-            label_winner_8w = False
-            label_winner_12w = False
-            label_durable = False
-            label_trend_spike = False
-            
-            if horizon_weeks == 8:
-                # Winner criteria: BSR improves >= 30%, good review velocity, price stable
-                if (bsr_improvement and bsr_improvement >= 0.30 and
-                    review_velocity > 0 and
-                    (price_collapse is None or price_collapse <= 0.10)):
-                    label_winner_8w = True
-                
-                # Check durability (improvement holds for >= 6 out of 8 weeks)
-                if label_winner_8w and weekly_bsrs:
-                    improving_weeks = 0
-                    prev_bsr = start_median_bsr
-                    for week_key in sorted(weekly_bsrs.keys()):
-                        week_bsrs = weekly_bsrs[week_key]
-                        if week_bsrs:
-                            week_median = statistics.median(week_bsrs)
-                            if prev_bsr and week_median and week_median < prev_bsr:
-                                improving_weeks += 1
-                            prev_bsr = week_median
-                    
-                    label_durable = improving_weeks >= 6
-                
-                # Trend spike: huge improvement then revert
-                if bsr_improvement and bsr_improvement > 0.50:
-                    # Check if it reverted in later weeks
-                    if len(weekly_bsrs) >= 3:
-                        early_bsrs = []
-                        late_bsrs = []
-                        sorted_weeks = sorted(weekly_bsrs.keys())
-                        for week_key in sorted_weeks[:len(sorted_weeks)//2]:
-                            early_bsrs.extend(weekly_bsrs[week_key])
-                        for week_key in sorted_weeks[len(sorted_weeks)//2:]:
-                            late_bsrs.extend(weekly_bsrs[week_key])
-                        
-                        if early_bsrs and late_bsrs:
-                            early_median = statistics.median(early_bsrs)
-                            late_median = statistics.median(late_bsrs)
-                            if early_median and late_median and late_median > early_median * 1.2:
-                                label_trend_spike = True
-            
-            # Store labels
-            with get_db_cursor() as cur:
-                cur.execute("""
-                    INSERT INTO entity_weekly_labels (
-                        week_start, entity_id,
-                        label_winner_4w, label_winner_8w, label_winner_12w,
-                        label_trend_spike, label_durable
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (week_start, entity_id) DO UPDATE SET
-                        label_winner_4w = EXCLUDED.label_winner_4w,
-                        label_winner_8w = EXCLUDED.label_winner_8w,
-                        label_winner_12w = EXCLUDED.label_winner_12w,
-                        label_trend_spike = EXCLUDED.label_trend_spike,
-                        label_durable = EXCLUDED.label_durable
-                """, (
-                    week_start, entity_id,
-                    label_winner_4w, label_winner_8w, label_winner_12w,
-                    label_trend_spike, label_durable
-                ))
+                start_listings[week_start][entity_id],
+                end_listings,
+                week_horizons[week_start]
+            )
+            label_rows.append((week_start, entity_id) + tuple(labels[column] for column in LABEL_COLUMNS[2:]))
             
-            if label_winner_8w:
+            if labels["label_winner_8w"]:
                 logger.debug(f"Entity {entity_id[:8]}... labeled as winner for {week_start}")
-                
+        
         except Exception as e:
-            logger.error(f"Error computing labels for entity {entity_id}: {e}")
-            continue
+            logger.error(f"Error computing labels for entity {entity_id} ({week_start}): {e}")
+    
+    first_day = min(week_horizons) + timedelta(weeks=1)
+    last_day = max(week_start + timedelta(weeks=horizon) for week_start, horizon in week_horizons.items())
+    
+    # Label rows are small; they are written by the caller once the scan is closed
+    for entity_id, rows in stream_label_listings(first_day, last_day):
+        days = [row['dt'] for row in rows]
+        for week_start, horizon_weeks in week_horizons.items():
+            if (week_start, entity_id) not in pending:
+                continue
+            pending.discard((week_start, entity_id))
+            
+            window = rows[
+                bisect_left(days, week_start + timedelta(weeks=1)):
+                bisect_right(days, week_start + timedelta(weeks=horizon_weeks))
+            ]
+            add_labels(week_start, entity_id, window)
+    
+    # Entities with no ranked listings over the horizon are labeled from their start alone
+    for week_start, entity_id in sorted(pending):
+        add_labels(week_start, entity_id, [])
     
-    logger.info(f"Completed label computation for {week_start}")
+    return label_rows
 
 
-def compute_tiktok_trend_labels(week_start: date) -> None:
+def compute_amazon_winner_labels(
+    week_start: date,
+    horizon_weeks: int = max(LABEL_HORIZONS),
+    write_batch_size: Optional[int] = None
+) -> None:
     """
-    Compute TikTok trend labels for a given week.
+    Compute Amazon winner labels for a given week.
+    
+    Every entity is labeled from two set-based reads (start listings and one
+    ordered scan of the longest horizon) and one bulk write, so the number of
+    queries does not grow with the number of entities or horizons.
     
     Args:
         week_start: Week to compute labels for
+        horizon_weeks: Longest look-ahead horizon to label; winner labels of
+            longer horizons in LABEL_HORIZONS are stored as NULL
+        write_batch_size: Label rows per database write (default: DB_WRITE_BATCH_SIZE)
     """
-    logger.info(f"Computing TikTok trend labels for {week_start}")
+    logger.info(f"Computing Amazon winner labels for {week_start} (horizon: {horizon_weeks}w)")
     
-    # Get entities with TikTok aliases
-    entities = execute_query("""
-        SELECT DISTINCT e.entity_id
+    label_rows = amazon_label_rows({week_start: horizon_weeks})
+    
+    if not label_rows:
+        logger.warning(f"No ranked listings found for {week_start}")
+        return
+    
+    with label_writer(write_batch_size) as writer:
+        for row in label_rows:
+            writer.add(row)
+    
+    if writer.rows_failed:
+        logger.error(f"Failed to store {writer.rows_failed} label rows")
+    winners = ", ".join(
+        f"{sum(1 for row in label_rows if row[LABEL_COLUMNS.index(f'label_winner_{horizon}w')])} {horizon}w"
+        for horizon in LABEL_HORIZONS if horizon <= horizon_weeks
+    )
+    logger.info(f"Completed label computation for {week_start} ({writer.rows_written} entities; winners: {winners})")
+
+
+def load_tiktok_label_aliases() -> Dict[str, List[str]]:
+    """
+    Load the TikTok aliases of every concept entity in one query.
+    
+    Returns:
+        entity_id -> TikTok alias texts
+    """
+    rows = execute_query("""
+        SELECT ea.entity_id, ea.alias_text
         FROM entities e
         JOIN entity_aliases ea ON e.entity_id = ea.entity_id
         WHERE e.entity_type = 'concept' AND ea.source = 'tiktok'
     """)
     
-    if not entities:
+    aliases = defaultdict(list)
+    for row in rows:
+        aliases[row['entity_id']].append(row['alias_text'])
+    return aliases
+
+
+@dataclass
+class TikTokDailySeries:
+    """
+    Daily hashtag metrics as dense (query x day) arrays.
+    
+    views[q, d] and creators[q, d] are the metrics of queries[q] on
+    first_day + d days (None counted as 0); present[q, d] is False where
+    there is no row for that day.
+    """
+    first_day: date
+    queries: List[str]
+    views: np.ndarray
+    creators: np.ndarray
+    present: np.ndarray
+    
+    @classmethod
+    def load(cls, first_day: date, last_day: date) -> "TikTokDailySeries":
+        """
+        Load hashtag metrics on [first_day, last_day) in one query.
+        
+        Args:
+            first_day: First metrics date
+            last_day: End of the range (exclusive)
+        
+        Returns:
+            TikTokDailySeries
+        """
+        from src.utils.query_helper import get_param_placeholder, to_date
+        
+        param = get_param_placeholder()
+        rows = execute_query(f"""
+            SELECT query, dt, views, creator_count
+            FROM tiktok_metrics_daily
+            WHERE dt >= {param} AND dt < {param}
+                AND query_type = 'hashtag'
+        """, (first_day, last_day))
+        
+        queries = sorted({row['query'] for row in rows})
+        index = {query: q for q, query in enumerate(queries)}
+        shape = (len(queries), (last_day - first_day).days)
+        
+        # Few distinct days: convert each once
+        offsets = {value: (to_date(value) - first_day).days for value in {row['dt'] for row in rows}}
+        q = np.array([index[row['query']] for row in rows], dtype=np.intp)
+        d = np.array([offsets[row['dt']] for row in rows], dtype=np.intp)
+        views = np.zeros(shape, dtype=np.int64)
+        creators = np.zeros(shape, dtype=np.int64)
+        present = np.zeros(shape, dtype=bool)
+        views[q, d] = [row['views'] or 0 for row in rows]
+        creators[q, d] = [row['creator_count'] or 0 for row in rows]
+        present[q, d] = True
+        
+        return cls(first_day=first_day, queries=queries, views=views, creators=creators, present=present)
+
+
+def tiktok_query_trends(series: TikTokDailySeries, week_starts: List[date]) -> np.ndarray:
+    """
+    Trend flags of every query in every week, in one vectorized pass.
+    
+    Each week looks at [week_start - 2 weeks, week_start + 1 week). A query
+    trends if the least-squares slope of its views over the days with data
+    is positive and in the week's top decile (queries with data on fewer
+    than 2 days are not ranked), and its creator count on the last day with
+    data is above the first.
+    
+    Args:
+        series: Metrics covering every week's window
+        week_starts: Weeks to evaluate
+    
+    Returns:
+        (queries x weeks) bool array
+    """
+    num_queries, num_days = series.views.shape
+    starts = np.array(
+        [(week_start - timedelta(weeks=2) - series.first_day).days for week_start in week_starts],
+        dtype=np.intp
+    )
+    ends = starts + TIKTOK_TREND_WINDOW_DAYS
+    if len(starts) and (starts.min() < 0 or ends.max() > num_days):
+        raise ValueError("TikTok series does not cover every week's trend window")
+    
+    day = np.arange(num_days, dtype=np.int64)
+    present = series.present.astype(np.int64)
+    views = series.views * present
+    
+    def window_sums(values: np.ndarray) -> np.ndarray:
+        # Rolling sums over each week's window from one cumulative sum
+        totals = np.zeros((num_queries, num_days + 1), dtype=np.int64)
+        np.cumsum(values, axis=1, out=totals[:, 1:])
+        return totals[:, ends] - totals[:, starts]
+    
+    # Least-squares sums with x = days since the window start, kept in exact
+    # integers so slopes match a plain Python fit
+    n = window_sums(present)
+    sum_d = window_sums(present * day)
+    sum_y = window_sums(views)
+    offset = starts[np.newaxis, :]
+    sum_x = sum_d - offset * n
+    sum_xx = window_sums(present * day * day) - 2 * offset * sum_d + offset * offset * n
+    sum_xy = window_sums(views * day) - offset * sum_y
+    
+    numerator = n * sum_xy - sum_x * sum_y
+    denominator = n * sum_xx - sum_x * sum_x
+    ranked = n >= 2
+    slopes = np.full(n.shape, np.nan)
+    slopes[ranked] = 0.0
+    fitted = ranked & (denominator != 0)
+    slopes[fitted] = numerator[fitted] / denominator[fitted]
+    
+    # Top-decile threshold per week: the (int(0.1 * m) + 1)-th largest of m slopes
+    thresholds = np.zeros(len(week_starts))
+    weeks_ranked = ranked.any(axis=0)
+    if weeks_ranked.any():
+        thresholds[weeks_ranked] = np.nanquantile(
+            slopes[:, weeks_ranked], 0.9, axis=0, method="inverted_cdf"
+        )
+    
+    # Creator counts on the first and last day with data in each window
+    last_present = np.maximum.accumulate(np.where(series.present, day, -1), axis=1)
+    first_present = np.minimum.accumulate(np.where(series.present, day, num_days)[:, ::-1], axis=1)[:, ::-1]
+    first_creators = np.take_along_axis(series.creators, np.minimum(first_present[:, starts], num_days - 1), axis=1)
+    last_creators = np.take_along_axis(series.creators, np.maximum(last_present[:, ends - 1], 0), axis=1)
+    
+    with np.errstate(invalid="ignore"):
+        return (
+            ranked &
+            (slopes >= thresholds[np.newaxis, :]) & (slopes > 0) &
+            (last_creators > first_creators)
+        )
+
+
+def tiktok_trending_entities(
+    week_starts: List[date],
+    series: TikTokDailySeries,
+    aliases: Dict[str, List[str]]
+) -> Dict[date, List[str]]:
+    """
+    Find entities with a trending TikTok hashtag in each week.
+    
+    Args:
+        week_starts: Weeks to compute labels for
+        series: Hashtag metrics covering [min(week_starts) - 2 weeks,
+            max(week_starts) + 1 week)
+        aliases: entity_id -> TikTok alias texts
+    
+    Returns:
+        week_start -> trending entity IDs
+    """
+    trends = tiktok_query_trends(series, week_starts)
+    index = {query: q for q, query in enumerate(series.queries)}
+    
+    entity_ids = list(aliases)
+    pairs = [
+        (e, index[query])
+        for e, entity_id in enumerate(entity_ids)
+        for query in aliases[entity_id] if query in index
+    ]
+    
+    # An entity trends in a week if any of its queries does
+    entity_trends = np.zeros((len(entity_ids), len(week_starts)), dtype=bool)
+    if pairs:
+        entity_rows, query_rows = (np.array(column, dtype=np.intp) for column in zip(*pairs))
+        np.logical_or.at(entity_trends, entity_rows, trends[query_rows])
+    
+    return {
+        week_start: [entity_ids[e] for e in np.flatnonzero(entity_trends[:, w])]
+        for w, week_start in enumerate(week_starts)
+    }
+
+
+def store_tiktok_trend_labels(week_start: date, entity_ids: List[str]) -> None:
+    """
+    Mark TikTok-trending entities for a week in one batch.
+    
+    We use label_winner_8w as a proxy for TikTok trend; in production you
+    might want a separate TikTok trend label. Entities without an Amazon
+    label row for the week are not touched.
+    
+    Args:
+        week_start: Week the labels are for
+        entity_ids: Trending entity IDs
+    """
+    from src.utils.query_helper import get_param_placeholder
+    
+    if not entity_ids:
+        return
+    
+    param = get_param_placeholder()
+    with get_db_cursor() as cur:
+        cur.executemany(f"""
+            UPDATE entity_weekly_labels
+            SET label_winner_8w = COALESCE(label_winner_8w, FALSE) OR TRUE
+            WHERE week_start = {param} AND entity_id = {param}
+        """, [(week_start, entity_id) for entity_id in entity_ids])
+
+
+def compute_tiktok_trend_labels(week_start: date) -> None:
+    """
+    Compute TikTok trend labels for a given week.
+    
+    Args:
+        week_start: Week to compute labels for
+    """
+    logger.info(f"Computing TikTok trend labels for {week_start}")
+    
+    # Get entities with TikTok aliases
+    aliases = load_tiktok_label_aliases()
+    
+    if not aliases:
         logger.warning("No entities with TikTok aliases found")
         return
     
     # Get all TikTok metrics for trend analysis
-    two_weeks_ago = week_start - timedelta(weeks=2)
-    query = """
-        SELECT query, dt, views, creator_count
-        FROM tiktok_metrics_daily
-        WHERE dt >= %s AND dt < %s
-            AND query_type = 'hashtag'
-        ORDER BY query, dt
-    """
-    tiktok_data = execute_query(query, (two_weeks_ago, week_start + timedelta(weeks=1)))
-    
-    # Group by query
-    query_metrics = {}
-    for row in tiktok_data:
-        query = row['query']
-        if query not in query_metrics:
-            query_metrics[query] = []
-        query_metrics[query].append(row)
-    
-    # Calculate slopes for each query
-    query_slopes = {}
-    for query, metrics in query_metrics.items():
-        if len(metrics) >= 2:
-            # Calculate views slope
-            views = [m['views'] or 0 for m in metrics]
-            dates = [(m['dt'] - two_weeks_ago).days for m in metrics]
-            
-            if len(views) >= 2:
-                # Simple linear regression slope
-                n = len(views)
-                x = dates
-                y = views
-                slope = (n * sum(x[i] * y[i] for i in range(n)) - sum(x) * sum(y)) / \
-                       (n * sum(xi**2 for xi in x) - sum(x)**2) if n > 1 and sum(xi**2 for xi in x) - sum(x)**2/n != 0 else 0
-                query_slopes[query] = slope
-    
-    # Get top decile threshold
-    if query_slopes:
-        slopes = list(query_slopes.values())
-        slopes_sorted = sorted(slopes, reverse=True)
-        top_decile_idx = int(len(slopes_sorted) * 0.1)
-        top_decile_threshold = slopes_sorted[top_decile_idx] if top_decile_idx < len(slopes_sorted) else slopes_sorted[-1]
-    else:
-        top_decile_threshold = 0
+    series = TikTokDailySeries.load(week_start - timedelta(weeks=2), week_start + timedelta(weeks=1))
+    trending = tiktok_trending_entities([week_start], series, aliases)[week_start]
+    store_tiktok_trend_labels(week_start, trending)
     
-    # Label entities
-    for entity_row in entities:
-        entity_id = entity_row['entity_id']
-        
-        try:
-            # Get TikTok aliases for this entity
-            aliases = execute_query(
-                "SELECT alias_text FROM entity_aliases WHERE entity_id = %s AND source = 'tiktok'",
-                (entity_id,)
-            )
-            
-            if not aliases:
-                continue
-            
-            tiktok_queries = [a['alias_text'] for a in aliases]
-            
-            # Check if any query is trending
-            is_trending = False
-            for query in tiktok_queries:
-                if query in query_slopes:
-                    slope = query_slopes[query]
-                    if slope >= top_decile_threshold and slope > 0:
-                        # Check creator count slope
-                        query_metrics_list = query_metrics.get(query, [])
-                        if len(query_metrics_list) >= 2:
-                            creator_counts = [m['creator_count'] or 0 for m in query_metrics_list]
-                            if len(creator_counts) >= 2:
-                                creator_slope = (creator_counts[-1] - creator_counts[0]) / len(creator_counts)
-                                if creator_slope > 0:  # Positive creator growth
-                                    is_trending = True
-                                    break
-            
-            # Store label (we'll use label_winner_8w as a proxy for TikTok trend)
-            # In production, you might want a separate TikTok trend label
-            if is_trending:
-                with get_db_cursor() as cur:
-                    cur.execute("""
-                        UPDATE entity_weekly_labels
-                        SET label_winner_8w = COALESCE(label_winner_8w, FALSE) OR TRUE
-                        WHERE week_start = %s AND entity_id = %s
-                    """, (week_start, entity_id))
-                
-                logger.debug(f"Entity {entity_id[:8]}... labeled as TikTok trend for {week_start}")
-                
-        except Exception as e:
-            logger.error(f"Error computing TikTok labels for entity {entity_id}: {e}")
-            continue
+    for entity_id in trending:
+        logger.debug(f"Entity {entity_id[:8]}... labeled as TikTok trend for {week_start}")
     
-    logger.info(f"Completed TikTok trend label computation for {week_start}")
+    logger.info(f"Completed TikTok trend label computation for {week_start} ({len(trending)} trending)")
 
 
-def backfill_labels(start_date: date, end_date: date, horizon_weeks: int = 8):
+def label_backfill_weeks(
+    start_date: date,
+    end_date: date,
+    horizon_weeks: int = max(LABEL_HORIZONS),
+    today: Optional[date] = None
+) -> Dict[date, int]:
     """
-    Backfill labels for a date range.
+    Weeks of a backfill range and the horizon each can be labeled for.
     
     Args:
-        start_date: Start date for backfill
-        end_date: End date for backfill
-        horizon_weeks: Horizon for label computation
+        start_date: First week start
+        end_date: Last week start (inclusive)
+        horizon_weeks: Longest horizon for label computation
+        today: Reference date for available future data (default: today)
+    
+    Returns:
+        week_start -> horizon (weeks), leaving out weeks without enough
+        future data for the shortest horizon
     """
-    logger.info(f"Backfilling labels from {start_date} to {end_date}")
+    today = today or date.today()
+    week_horizons = {}
     
     current = start_date
     while current <= end_date:
-        # Only compute labels if we have enough future data
-        horizon_date = current + timedelta(weeks=horizon_weeks)
-        if horizon_date <= date.today():
-            logger.info(f"Computing labels for {current}")
-            compute_amazon_winner_labels(current, horizon_weeks)
-            compute_tiktok_trend_labels(current)
+        # Only compute labels for horizons we have enough future data for
+        available_weeks = min(horizon_weeks, (today - current).days // 7)
+        if available_weeks >= min(LABEL_HORIZONS):
+            week_horizons[current] = available_weeks
         else:
             logger.warning(f"Skipping {current} - not enough future data")
-        
         current += timedelta(weeks=1)
+    
+    return week_horizons
+
+
+def load_label_checkpoints(start_date: date, end_date: date) -> Dict[date, int]:
+    """
+    Load the finished weeks of earlier backfills.
+    
+    Args:
+        start_date: First week start
+        end_date: Last week start (inclusive)
+    
+    Returns:
+        week_start -> horizon (weeks) it was labeled for
+    """
+    from src.utils.query_helper import get_param_placeholder, to_date
+    
+    param = get_param_placeholder()
+    rows = execute_query(f"""
+        SELECT week_start, horizon_weeks
+        FROM label_backfill_checkpoints
+        WHERE week_start >= {param} AND week_start <= {param}
+    """, (start_date, end_date))
+    return {to_date(row['week_start']): row['horizon_weeks'] for row in rows}
+
+
+def record_label_checkpoints(week_horizons: Dict[date, int]) -> None:
+    """
+    Record weeks whose labels are fully written.
+    
+    Args:
+        week_horizons: week_start -> horizon (weeks) it was labeled for
+    """
+    from src.utils.db import BulkUpsertWriter
+    
+    completed_at = datetime.now()
+    with BulkUpsertWriter(
+        "label_backfill_checkpoints",
+        ["week_start", "horizon_weeks", "completed_at"],
+        conflict_columns=["week_start"]
+    ) as writer:
+        for week_start, horizon_weeks in week_horizons.items():
+            writer.add((week_start, horizon_weeks, completed_at))
+
+
+def _init_label_worker() -> None:
+    """Process pool initializer: give each worker its own DB connection pool."""
+    from src.utils.db import reset_connection_pool
+    
+    reset_connection_pool()
+
+
+def tiktok_backfill_trends(week_starts: List[date]) -> Dict[date, List[str]]:
+    """
+    TikTok-trending entities of every backfill week, from one load of the range.
+    
+    Args:
+        week_starts: Weeks to compute labels for
+    
+    Returns:
+        week_start -> trending entity IDs
+    """
+    aliases = load_tiktok_label_aliases()
+    if not aliases or not week_starts:
+        return {}
+    
+    series = TikTokDailySeries.load(
+        min(week_starts) - timedelta(weeks=2),
+        max(week_starts) + timedelta(weeks=1)
+    )
+    return tiktok_trending_entities(week_starts, series, aliases)
+
+
+def backfill_labels(
+    start_date: date,
+    end_date: date,
+    horizon_weeks: int = max(LABEL_HORIZONS),
+    workers: int = 1,
+    resume: bool = True,
+    write_batch_size: Optional[int] = None
+):
+    """
+    Backfill labels for a date range.
+    
+    TikTok trends of every week are computed up front from one load of the
+    whole range. Amazon labels are computed in runs of
+    LABEL_BACKFILL_WEEKS_PER_TASK consecutive weeks that share one scan of
+    their overlapping horizons, on a process pool. Workers only read; this
+    process writes each run's labels and then records its weeks in
+    label_backfill_checkpoints, so an interrupted backfill resumes from the
+    weeks that were not finished. Recent weeks are labeled for the horizons
+    that already have future data.
+    
+    Args:
+        start_date: Start date for backfill
+        end_date: End date for backfill
+        horizon_weeks: Longest horizon for label computation
+        workers: Number of worker processes
+        resume: Skip weeks already finished for their horizon by earlier backfills
+        write_batch_size: Label rows per database write (default: DB_WRITE_BATCH_SIZE)
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    
+    logger.info(f"Backfilling labels from {start_date} to {end_date}")
+    
+    week_horizons = label_backfill_weeks(start_date, end_date, horizon_weeks)
+    
+    if resume:
+        finished = load_label_checkpoints(start_date, end_date)
+        week_horizons = {
+            week_start: horizon for week_start, horizon in week_horizons.items()
+            if finished.get(week_start, 0) < horizon
+        }
+        if finished:
+            logger.info(f"Resuming: {len(week_horizons)} weeks left to label")
+    
+    weeks = sorted(week_horizons)
+    trending = tiktok_backfill_trends(weeks)
+    runs = [
+        {week_start: week_horizons[week_start] for week_start in weeks[i:i + LABEL_BACKFILL_WEEKS_PER_TASK]}
+        for i in range(0, len(weeks), LABEL_BACKFILL_WEEKS_PER_TASK)
+    ]
+    
+    def computed_runs():
+        if workers <= 1:
+            for run in runs:
+                try:
+                    yield run, amazon_label_rows(run)
+                except Exception as e:
+                    logger.error(f"Label backfill failed for weeks {min(run)} to {max(run)}: {e}")
+            return
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_label_worker) as pool:
+            futures = {pool.submit(amazon_label_rows, run): run for run in runs}
+            for future in as_completed(futures):
+                run = futures[future]
+                try:
+                    yield run, future.result()
+                except Exception as e:
+                    logger.error(f"Label backfill failed for weeks {min(run)} to {max(run)}: {e}")
+    
+    finished_weeks = 0
+    with label_writer(write_batch_size) as writer:
+        for run, label_rows in computed_runs():
+            rows_failed = writer.rows_failed
+            for row in label_rows:
+                writer.add(row)
+            writer.flush()
+            
+            if writer.rows_failed > rows_failed:
+                logger.error(f"Failed to store labels for weeks {min(run)} to {max(run)}; not checkpointed")
+                continue
+            
+            for week_start in run:
+                store_tiktok_trend_labels(week_start, trending.get(week_start, []))
+            record_label_checkpoints(run)
+            
+            finished_weeks += len(run)
+            logger.info(f"Labeled weeks {min(run)} to {max(run)} ({len(label_rows)} rows, {finished_weeks}/{len(weeks)} weeks)")
+    
+    logger.info(f"Completed label backfill from {start_date} to {end_date} ({finished_weeks} weeks)")
 
 
 def main():
@@ -362,7 +828,12 @@ def main():
     parser.add_argument("--backfill", action="store_true", help="Backfill historical weeks")
     parser.add_argument("--start_date", type=str, help="Start date for backfill (YYYY-MM-DD)")
     parser.add_argument("--end_date", type=str, help="End date for backfill (YYYY-MM-DD)")
-    parser.add_argument("--horizon", type=int, default=8, help="Horizon weeks (default: 8)")
+    parser.add_argument("--horizon", type=int, default=max(LABEL_HORIZONS),
+                        help="Longest horizon in weeks; shorter horizons come from the same scan (default: 12)")
+    parser.add_argument("--workers", type=int, default=1, help="Backfill worker processes (default: 1)")
+    parser.add_argument("--restart", action="store_true",
+                        help="Relabel every week of the backfill, ignoring weeks finished by earlier runs")
+    parser.add_argument("--write_batch_size", type=int, help="Label rows per database write (default: DB_WRITE_BATCH_SIZE or 1000)")
     args = parser.parse_args()
     
     if args.backfill:
@@ -371,10 +842,15 @@ def main():
             return
         start_date = date.fromisoformat(args.start_date)
         end_date = date.fromisoformat(args.end_date)
-        backfill_labels(start_date, end_date, args.horizon)
+        backfill_labels(
+            start_date, end_date, args.horizon,
+            workers=args.workers,
+            resume=not args.restart,
+            write_batch_size=args.write_batch_size
+        )
     elif args.week_start:
         week_start = date.fromisoformat(args.week_start)
-        compute_amazon_winner_labels(week_start, args.horizon)
+        compute_amazon_winner_labels(week_start, args.horizon, args.write_batch_size)
         compute_tiktok_trend_labels(week_start)
     else:
         logger.error("Either --week_start or --backfill required")
@@ -0,0 +1,65 @@
+"""
+Settings from configs/config.yaml.
+Values may reference environment variables as ${VAR} or ${VAR:-default};
+the file is read once per process.
+"""
+import logging
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = Path(os.getenv(
+    "WINNER_ENGINE_CONFIG",
+    Path(__file__).resolve().parents[2] / "configs" / "config.yaml"
+))
+
+_ENV_REFERENCE = re.compile(r"\$\{(\w+)(?::-([^}]*))?\}")
+
+
+def expand_env(text: str) -> str:
+    """Replace ${VAR} and ${VAR:-default} with environment values."""
+    return _ENV_REFERENCE.sub(lambda m: os.getenv(m.group(1), m.group(2) or ""), text)
+
+
+@lru_cache(maxsize=None)
+def load_config(path: Path = CONFIG_PATH) -> Dict[str, Any]:
+    """
+    Load the YAML config.
+    
+    Args:
+        path: Config file (default: WINNER_ENGINE_CONFIG or configs/config.yaml)
+    
+    Returns:
+        Parsed config, or {} if the file does not exist
+    """
+    import yaml
+    
+    path = Path(path)
+    if not path.exists():
+        logger.warning(f"Config file {path} not found; using defaults")
+        return {}
+    return yaml.safe_load(expand_env(path.read_text())) or {}
+
+
+def get_setting(*keys: str, default: Any = None) -> Any:
+    """
+    Look up a nested config value, e.g. get_setting("ingestion", "amazon", "max_retries").
+    
+    Args:
+        keys: Path of keys into the config
+        default: Value if any key is missing
+    
+    Returns:
+        Config value or default
+    """
+    value = load_config()
+    for key in keys:
+        if not isinstance(value, dict) or value.get(key) is None:
+            return default
+        value = value[key]
+    return value
@@ -3,19 +3,25 @@ Database connection and helper utilities.
 Supports both PostgreSQL and SQLite (for development).
 """
 import os
+import time
 import logging
 from contextlib import contextmanager
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Buffered writes (BulkUpsertWriter): rows per flush and seconds after which
+# the next add() flushes, unless configured (database.write_batch_size / write_flush_seconds)
+DEFAULT_WRITE_BATCH_SIZE = 1000
+DEFAULT_WRITE_FLUSH_SECONDS = 5.0
+
 # Check if we should use SQLite
 USE_SQLITE = os.getenv("USE_SQLITE", "false").lower() == "true"
 
 if USE_SQLITE:
     # Use SQLite adapter
-    from src.utils.db_sqlite import get_db_connection, get_db_cursor, execute_query as _execute_query
+    from src.utils.db_sqlite import get_db_connection, get_db_cursor, execute_query as _execute_query, stream_query
     logger.info("Using SQLite database (development mode)")
 else:
     # Use PostgreSQL
@@ -28,7 +34,7 @@ else:
     except ImportError:
         logger.warning("psycopg2 not available, falling back to SQLite")
         USE_SQLITE = True
-        from src.utils.db_sqlite import get_db_connection, get_db_cursor, execute_query as _execute_query
+        from src.utils.db_sqlite import get_db_connection, get_db_cursor, execute_query as _execute_query, stream_query
 
 
 if not USE_SQLITE:
@@ -123,6 +129,57 @@ else:
     execute_query = _execute_query
 
 
+if not USE_SQLITE:
+    def stream_query(query: str, params: Optional[tuple] = None, batch_size: int = 10000):
+        """
+        Execute a query through a server-side cursor and yield rows one at a time.
+        
+        Use for long, ordered scans (e.g. multi-week backfills) whose result
+        should not be materialized in memory.
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            batch_size: Rows fetched from the server per round trip
+        
+        Yields:
+            Row dictionaries
+        """
+        import uuid
+        
+        conn = get_db_connection()
+        try:
+            with conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cur:
+                cur.itersize = batch_size
+                cur.execute(query, params)
+                for row in cur:
+                    yield row
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Database error: {e}")
+            raise
+        finally:
+            if hasattr(conn, 'pool') and conn.pool:
+                _connection_pool.putconn(conn)
+            else:
+                conn.close()
+
+
+def reset_connection_pool():
+    """
+    Forget any connection pool inherited from a parent process.
+    
+    Call at the start of a worker process (e.g. as a ProcessPoolExecutor
+    initializer) so the worker opens its own pool instead of sharing the
+    parent's sockets. SQLite opens a connection per query, so this is a no-op there.
+    """
+    global _connection_pool
+    
+    if not USE_SQLITE:
+        _connection_pool = None
+
+
 def execute_many(query: str, params_list: List[tuple], fetch: bool = False):
     """
     Execute a query with many parameter sets.
@@ -163,3 +220,126 @@ def insert_jsonb(table: str, data: Dict[str, Any], conflict_cols: Optional[List[
     
     execute_query(query, tuple(values), fetch=False)
 
+
+class BulkUpsertWriter:
+    """
+    Buffer rows for one table and upsert them in batches.
+    
+    Rows are flushed when the buffer reaches batch_size, on close, and by an
+    add() that comes flush_interval seconds or more after the last flush. The
+    interval is only checked on add; there is no background timer, so rows of
+    an idle writer wait for the next add() or close(). PostgreSQL uses one
+    execute_values INSERT ... ON CONFLICT per batch; SQLite uses executemany
+    inside one transaction. Rows with the same conflict key are
+    collapsed (last one wins) so a batch never updates a row twice. If a
+    batch fails, its rows are retried one by one so a single bad row only
+    loses itself.
+    
+    Usage:
+        with BulkUpsertWriter("entity_weekly_features", columns, ["week_start", "entity_id"]) as writer:
+            writer.add(row)
+    """
+    
+    def __init__(
+        self,
+        table: str,
+        columns: Sequence[str],
+        conflict_columns: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None
+    ):
+        """
+        Args:
+            table: Table name
+            columns: Column order of the rows passed to add()
+            conflict_columns: Columns of the ON CONFLICT target
+            update_columns: Columns to update on conflict (default: all non-conflict columns)
+            batch_size: Rows per flush (default: config database.write_batch_size,
+                i.e. DB_WRITE_BATCH_SIZE env or 1000)
+            flush_interval: Seconds after a flush from which the next add()
+                flushes (default: config database.write_flush_seconds, i.e.
+                DB_WRITE_FLUSH_SECONDS env or 5)
+        """
+        from src.utils.config import get_setting
+        
+        self.table = table
+        self.columns = list(columns)
+        self.conflict_columns = list(conflict_columns)
+        if update_columns is None:
+            update_columns = [col for col in self.columns if col not in self.conflict_columns]
+        self.update_columns = list(update_columns)
+        self.batch_size = batch_size or int(
+            get_setting("database", "write_batch_size", default=DEFAULT_WRITE_BATCH_SIZE))
+        if flush_interval is None:
+            flush_interval = float(get_setting("database", "write_flush_seconds", default=DEFAULT_WRITE_FLUSH_SECONDS))
+        self.flush_interval = flush_interval
+        
+        self._key_indexes = [self.columns.index(col) for col in self.conflict_columns]
+        self._buffer = {}
+        self._last_flush = time.monotonic()
+        self.rows_written = 0
+        self.rows_failed = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    def add(self, row: Sequence[Any]) -> None:
+        """Buffer one row (values in `columns` order), flushing if due."""
+        key = tuple(row[i] for i in self._key_indexes)
+        self._buffer.pop(key, None)
+        self._buffer[key] = tuple(row)
+        
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+    
+    def flush(self) -> None:
+        """Write all buffered rows."""
+        rows = list(self._buffer.values())
+        self._buffer.clear()
+        self._last_flush = time.monotonic()
+        
+        if not rows:
+            return
+        
+        try:
+            self._write(rows)
+            self.rows_written += len(rows)
+        except Exception as e:
+            logger.error(f"Batch upsert of {len(rows)} rows into {self.table} failed, retrying row by row: {e}")
+            for row in rows:
+                try:
+                    self._write([row])
+                    self.rows_written += 1
+                except Exception as row_error:
+                    self.rows_failed += 1
+                    key = tuple(row[i] for i in self._key_indexes)
+                    logger.error(f"Error upserting {self.table} row {key}: {row_error}")
+    
+    def close(self) -> None:
+        """Flush remaining rows."""
+        self.flush()
+    
+    def _write(self, rows: List[tuple]) -> None:
+        """Upsert rows in one statement and transaction."""
+        updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in self.update_columns)
+        conflict = f"ON CONFLICT ({', '.join(self.conflict_columns)}) DO UPDATE SET {updates}"
+        
+        with get_db_cursor() as cur:
+            if USE_SQLITE:
+                placeholders = ", ".join(["?"] * len(self.columns))
+                cur.executemany(
+                    f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES ({placeholders}) {conflict}",
+                    rows
+                )
+            else:
+                execute_values(
+                    cur,
+                    f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES %s {conflict}",
+                    rows,
+                    page_size=len(rows)
+                )
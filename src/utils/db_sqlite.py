@@ -3,6 +3,7 @@ SQLite database adapter for Winner Engine (development/demo mode).
 This provides a drop-in replacement for the PostgreSQL connection.
 """
 import os
+import hashlib
 import sqlite3
 import logging
 from contextlib import contextmanager
@@ -15,6 +16,12 @@ logger = logging.getLogger(__name__)
 DB_PATH = os.getenv("SQLITE_DB_PATH", "winner_engine.db")
 
 
+def row_checksum(*values) -> int:
+    """SQL function row_checksum(...): 32-bit hash of a row's values (see query_helper.row_checksum_sql)."""
+    text = "\x1f".join("\x01" if value is None else str(value) for value in values)
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
 def get_db_connection():
     """
     Get SQLite database connection.
@@ -24,6 +31,7 @@ def get_db_connection():
     """
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row  # Enable dict-like access
+    conn.create_function("row_checksum", -1, row_checksum, deterministic=True)
     return conn
 
 
@@ -138,8 +146,10 @@ def execute_query(query: str, params: Optional[tuple] = None, fetch: bool = True
     
     # Replace PostgreSQL functions
     query = query.replace("GREATEST", "MAX")
+    query = query.replace("LEAST", "MIN")
     query = query.replace("JSONB", "TEXT")
-    query = query.replace("NULLS LAST", "")  # SQLite doesn't support this, but it's optional
+    if sqlite3.sqlite_version_info < (3, 30, 0):
+        query = query.replace("NULLS LAST", "")  # Only supported from SQLite 3.30
     
     # Convert remaining %s to ? for SQLite
     remaining_params = []
@@ -171,3 +181,32 @@ def execute_query(query: str, params: Optional[tuple] = None, fetch: bool = True
             return [dict(row) for row in rows]
         return None
 
+
+def stream_query(query: str, params: Optional[tuple] = None, batch_size: int = 10000):
+    """
+    Execute a query and yield rows one at a time without materializing the result.
+    
+    The query must already use SQLite syntax (`?` placeholders, see
+    src/utils/query_helper.py); no PostgreSQL conversion is applied.
+    
+    Args:
+        query: SQL query string
+        params: Query parameters
+        batch_size: Rows fetched from SQLite per step
+    
+    Yields:
+        Row dictionaries
+    """
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.arraysize = batch_size
+        cur.execute(query, params or ())
+        while True:
+            rows = cur.fetchmany()
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+    finally:
+        conn.close()
@@ -9,6 +9,18 @@ from src.utils.db import execute_query, get_db_cursor
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# entity_asin_map rows record the first and last listing dt that matched;
+# later matches widen the range (COALESCE: rows from before the range columns)
+MATCH_RANGE_UPSERT = """
+        ON CONFLICT (entity_id, asin) DO UPDATE SET
+            first_matched_dt = LEAST(
+                COALESCE(entity_asin_map.first_matched_dt, EXCLUDED.first_matched_dt),
+                EXCLUDED.first_matched_dt),
+            last_matched_dt = GREATEST(
+                COALESCE(entity_asin_map.last_matched_dt, EXCLUDED.last_matched_dt),
+                EXCLUDED.last_matched_dt)
+"""
+
 
 def create_entity(
     canonical_name: str,
@@ -22,7 +34,7 @@ def create_entity(
         canonical_name: Canonical name for the entity
         entity_type: Type ('concept', 'keyword_cluster', 'brand', 'store')
         category_primary: Primary category
-        
+    
     Returns:
         Entity ID (UUID string)
     """
@@ -56,7 +68,7 @@ def find_entity_by_alias(alias_text: str, source: str) -> Optional[str]:
     Args:
         alias_text: Alias text to search for
         source: Source ('amazon', 'tiktok', 'shopify', 'manual')
-        
+    
     Returns:
         Entity ID if found, else None
     """
@@ -98,6 +110,89 @@ def create_entity_alias(
     
     execute_query(query, (entity_id, source, alias_text, confidence), fetch=False)
     logger.debug(f"Created alias: {alias_text} -> {entity_id} ({source})")
+    
+    if source == 'amazon':
+        map_asins_for_alias(alias_text)
+
+
+def map_asins_for_alias(alias_text: str) -> None:
+    """
+    Add entity_asin_map rows for every listing matching an Amazon alias.
+    
+    A listing row matches when its title contains the alias (case-insensitive)
+    or its brand equals the alias; each mapping spans the first to the last
+    dt with a matching row. Called whenever an Amazon alias is created.
+    
+    Args:
+        alias_text: Amazon alias text (already stored in entity_aliases)
+    """
+    from src.utils.query_helper import convert_like_any, convert_any_clause, get_param_placeholder
+    
+    # Constant patterns (rather than a join on alias_text) let the title match
+    # use the trigram index: pg_trgm on Postgres, the FTS5 table on SQLite
+    param = get_param_placeholder()
+    title_clause, title_params = convert_like_any("a.title", [f"%{alias_text}%"])
+    brand_clause, brand_params = convert_any_clause("a.brand", [alias_text])
+    
+    query = f"""
+        INSERT INTO entity_asin_map (entity_id, asin, first_matched_dt, last_matched_dt)
+        SELECT ea.entity_id, a.asin, MIN(a.dt), MAX(a.dt)
+        FROM entity_aliases ea, amazon_listings_daily a
+        WHERE ea.source = 'amazon' AND ea.alias_text = {param}
+            AND ({title_clause} OR {brand_clause})
+        GROUP BY ea.entity_id, a.asin
+        {MATCH_RANGE_UPSERT}
+    """
+    
+    execute_query(query, (alias_text,) + title_params + brand_params, fetch=False)
+    logger.debug(f"Mapped listings for alias: {alias_text}")
+
+
+def rebuild_entity_asin_map(dt=None, asins: Optional[List[str]] = None) -> None:
+    """
+    Recompute entity_asin_map from entity_aliases and amazon_listings_daily.
+    
+    Args:
+        dt: Optional date. If given, only listings from that date partition are
+            scanned (e.g. after a bulk load); otherwise every alias is matched
+            against all listings through the title index.
+        asins: Optional ASIN filter for a dt partition (e.g. a chunk of
+            listings just ingested or carried forward to dt). A listing that
+            stops matching keeps its mapping, but only up to the last dt
+            that matched.
+    """
+    if dt is None:
+        aliases = execute_query(
+            "SELECT DISTINCT alias_text FROM entity_aliases WHERE source = 'amazon'"
+        )
+        for row in aliases:
+            map_asins_for_alias(row['alias_text'])
+        logger.info(f"Rebuilt entity_asin_map for {len(aliases)} aliases")
+        return
+    
+    from src.utils.query_helper import convert_any_clause
+    
+    asin_clause, asin_params = "", ()
+    if asins is not None:
+        if not asins:
+            return
+        asin_clause, asin_params = convert_any_clause("a.asin", list(asins))
+        asin_clause = f"AND {asin_clause}"
+    
+    query = f"""
+        INSERT INTO entity_asin_map (entity_id, asin, first_matched_dt, last_matched_dt)
+        SELECT DISTINCT ea.entity_id, a.asin, a.dt, a.dt
+        FROM entity_aliases ea
+        JOIN amazon_listings_daily a
+            ON a.title ILIKE ('%%' || ea.alias_text || '%%') OR a.brand = ea.alias_text
+        WHERE ea.source = 'amazon' AND a.dt = %s
+            {asin_clause}
+        {MATCH_RANGE_UPSERT}
+    """
+    
+    execute_query(query, (dt,) + asin_params, fetch=False)
+    if asins is None:
+        logger.info(f"Rebuilt entity_asin_map for {dt}")
 
 
 def get_or_create_entity_for_alias(
@@ -116,7 +211,7 @@ def get_or_create_entity_for_alias(
         entity_type: Entity type if creating new
         category_primary: Category if creating new
         confidence: Confidence for alias mapping
-        
+    
     Returns:
         Entity ID
     """
@@ -139,7 +234,7 @@ def get_entity_by_id(entity_id: str) -> Optional[Dict]:
     
     Args:
         entity_id: Entity UUID
-        
+    
     Returns:
         Entity dictionary or None
     """
@@ -157,7 +252,7 @@ def list_entities(entity_type: Optional[str] = None, limit: int = 100) -> List[D
     Args:
         entity_type: Optional entity type filter
         limit: Maximum number of results
-        
+    
     Returns:
         List of entity dictionaries
     """
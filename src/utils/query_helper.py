@@ -22,19 +22,65 @@ def convert_any_clause(field: str, values: list) -> tuple:
     else:
         return f"{field} = ANY(%s)", (values,)
 
+# FTS5 trigram shadow tables created by setup_sqlite.py, keyed by indexed column
+SQLITE_FTS_TABLES = {
+    "title": "amazon_listings_fts",
+}
+
+# The trigram tokenizer can only look up substrings of 3+ characters
+MIN_FTS_SUBSTRING_LENGTH = 3
+
+def _fts_substring(pattern: str):
+    """
+    Convert a '%text%' LIKE pattern to a quoted FTS5 phrase.
+    
+    Returns None for patterns the trigram index cannot answer exactly
+    (anchored, inner wildcards, or shorter than 3 characters).
+    """
+    if len(pattern) < 2 or not (pattern.startswith("%") and pattern.endswith("%")):
+        return None
+    text = pattern[1:-1]
+    if "%" in text or "_" in text or len(text) < MIN_FTS_SUBSTRING_LENGTH:
+        return None
+    return '"' + text.replace('"', '""') + '"'
+
 def convert_like_any(field: str, patterns: list) -> tuple:
     """
-    Convert PostgreSQL ILIKE ANY(%s) to SQLite LIKE OR LIKE.
+    Convert PostgreSQL ILIKE ANY(%s) to an index-backed SQLite predicate.
+    
+    On PostgreSQL, ILIKE ANY(%s) is served by the pg_trgm GIN index
+    (sql/004_title_trgm_index.sql). On SQLite, '%text%' patterns on a column
+    with an FTS5 trigram table become one MATCH lookup on that table; other
+    patterns fall back to LIKE OR LIKE.
     
     Returns:
         (sql_clause, params_tuple)
     """
     if USE_SQLITE:
+        table_alias, _, column = field.rpartition(".")
+        fts_table = SQLITE_FTS_TABLES.get(column)
+        phrases = [_fts_substring(p) for p in patterns]
+        if fts_table and phrases and all(phrases):
+            rowid = f"{table_alias}.rowid" if table_alias else "rowid"
+            clause = f"{rowid} IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)"
+            return clause, (" OR ".join(phrases),)
         conditions = " OR ".join([f"{field} LIKE ?" for _ in patterns])
         return f"({conditions})", tuple(patterns)
     else:
         return f"{field} ILIKE ANY(%s)", (patterns,)
 
+def row_checksum_sql(columns: list) -> str:
+    """
+    SQL expression hashing a row's columns to a non-negative 32-bit integer.
+    
+    SUM() of it over a group changes when any column of any row changes. On
+    SQLite it calls row_checksum(), registered by src/utils/db_sqlite.py.
+    """
+    if USE_SQLITE:
+        return f"row_checksum({', '.join(columns)})"
+    values = ", ".join(f"COALESCE({column}::text, chr(1))" for column in columns)
+    return f"('x' || lpad(substr(md5(concat_ws(chr(31), {values})), 1, 8), 16, '0'))::bit(64)::bigint"
+
 def convert_date_interval(date_param, interval_str: str) -> tuple:
     """
     Convert PostgreSQL date - INTERVAL to SQLite date arithmetic.
@@ -62,3 +108,17 @@ def convert_date_interval(date_param, interval_str: str) -> tuple:
     else:
         return f"{get_param_placeholder()} - INTERVAL '{interval_str}'", date_param
 
+
+def to_date(value):
+    """
+    Normalize a DATE column value to datetime.date.
+    
+    PostgreSQL returns date objects, SQLite returns ISO strings.
+    """
+    from datetime import date, datetime
+    
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
@@ -3,7 +3,7 @@ Seed initial data for testing and development.
 """
 import logging
 from datetime import date, timedelta
-from src.utils.entity_resolution import create_entity, create_entity_alias
+from src.utils.entity_resolution import create_entity, create_entity_alias, rebuild_entity_asin_map
 from src.utils.db import get_db_cursor, execute_query
 
 logging.basicConfig(level=logging.INFO)
@@ -228,6 +228,9 @@ def seed_sample_amazon_data(dt: date):
                 listing["rating"], listing["review_count"], dt, dt
             ))
     
+    # Listings were inserted directly, so match them to existing aliases
+    rebuild_entity_asin_map(dt)
+    
     logger.info(f"Seeded {len(sample_listings)} sample listings")
 
 
@@ -8,7 +8,20 @@ from src.features.build_features import (
     compute_competition_features,
     compute_economics_features,
     compute_risk_features,
+    demand_features_from_rows,
+    compute_entity_features,
+    shard_entity_ids,
+    feature_row,
+    feature_writer,
 )
+from src.features.listing_context import ListingContext
+from src.features.feature_matrix import WeekFeatureMatrix
+from src.features.watermarks import (
+    alias_set_hash,
+    changed_entity_ids,
+    load_input_watermarks,
+)
+from src.features.backfill import RollingSum, backfill_week_starts
 
 
 def test_demand_features_no_leakage():
@@ -29,6 +42,288 @@ def test_features_as_of_date():
     pass
 
 
+def test_demand_features_from_rows():
+    """Test demand aggregation from preloaded rows (shared by per-entity and batch paths)."""
+    week_start = date(2026, 1, 12)
+    tiktok_rows = [
+        {"dt": week_start - timedelta(days=1), "views": 100},
+        {"dt": week_start - timedelta(days=10), "views": 50},
+        {"dt": week_start - timedelta(days=20), "views": 25},
+    ]
+    amazon_rows = [{"bsr": 100, "review_count": 30}, {"bsr": 300, "review_count": 20}]
+    old_rows = [{"bsr": 200, "review_count": 40}, {"bsr": None, "review_count": None}]
+    
+    features = demand_features_from_rows(week_start, tiktok_rows, amazon_rows, old_rows)
+    
+    assert features["demand_tiktok_views_7d"] == 100
+    assert features["demand_tiktok_views_14d"] == 150
+    assert features["demand_tiktok_views_28d"] == 175
+    assert features["demand_amazon_bsr_median_top10"] == 300
+    assert features["demand_amazon_bsr_improvement_4w"] == 0.5
+    assert features["demand_amazon_review_velocity_4w"] == 10
+    assert features["demand_cross_channel_alignment"] == 1.0
+
+
+def test_entity_features_from_context():
+    """Test that all feature groups compute from a listing context without a database."""
+    week_start = date(2026, 1, 12)
+    listing = {
+        "asin": "A1", "title": "Kids lithium battery toy", "brand": "B", "category": "Toys",
+        "bsr": 50, "review_count": 10, "rating": 4.0, "price_usd": 20.0,
+        "image_count": 5, "video_flag": 1, "first_seen_date": week_start - timedelta(days=3),
+    }
+    unranked = dict(listing, asin="A2", bsr=None, price_usd=None, first_seen_date=None)
+    context = ListingContext(
+        entity_id="test-entity",
+        week_start=week_start,
+        current_listings=[unranked, listing],
+        old_listings=[dict(listing, price_usd=25.0)],
+        reviews_by_asin={"A1": [
+            {"asin": "A1", "dt": week_start, "review_id": "r1", "review_text": "It broke", "rating": 1},
+        ]},
+    )
+    
+    features = compute_entity_features(context)
+    
+    assert features["comp_amazon_top10_review_median"] == 10
+    assert features["comp_amazon_new_entrant_rate_4w"] == 1.0
+    assert features["comp_price_compression_4w"] == 0.2
+    assert features["econ_price_median"] == 20.0
+    assert features["econ_price_trend_4w"] == -0.2
+    assert features["risk_return_proxy"] == 1.0
+    assert features["risk_regulatory_proxy"] == 0.6
+    assert features["demand_amazon_bsr_median_top10"] is None
+
+
+def test_shard_entity_ids():
+    """Test that sharding covers every entity once, in order, without empty shards."""
+    ids = [f"e{i}" for i in range(10)]
+    
+    shards = shard_entity_ids(ids, 4)
+    
+    assert len(shards) == 4
+    assert [e for shard in shards for e in shard] == ids
+    assert shard_entity_ids(ids[:2], 8) == [["e0"], ["e1"]]
+    assert shard_entity_ids([], 4) == []
+
+
+def test_changed_entity_ids():
+    """Test that only entities with new, changed or missing watermarks are recomputed."""
+    aliases = [{"source": "amazon", "alias_text": "yoga mat"}, {"source": "tiktok", "alias_text": "yogamat"}]
+    assert alias_set_hash(aliases) == alias_set_hash(list(reversed(aliases)))
+    
+    current = {
+        "same": {"aliases": "h", "amazon_listings": ["2026-01-12", 10, 5.0]},
+        "new_rows": {"aliases": "h", "amazon_listings": ["2026-01-12", 11, 6.0]},
+        "never_built": {"aliases": "h", "amazon_listings": None},
+        "no_watermark": {"aliases": "h", "amazon_listings": None},
+    }
+    stored = {
+        "same": {"aliases": "h", "amazon_listings": ["2026-01-12", 10, 5.0]},
+        "new_rows": {"aliases": "h", "amazon_listings": ["2026-01-12", 10, 5.0]},
+        "no_watermark": None,
+    }
+    
+    assert changed_entity_ids(current, stored) == ["new_rows", "never_built", "no_watermark"]
+
+
+def test_title_change_invalidates_watermark(monkeypatch, tmp_path):
+    """Test that editing a non-numeric listing column (here the title) triggers a recompute."""
+    import setup_sqlite
+    import src.utils.db as db
+    import src.utils.db_sqlite as db_sqlite
+    import src.utils.query_helper as query_helper
+    
+    if not db.USE_SQLITE:
+        pytest.skip("needs the SQLite backend")
+    db_path = str(tmp_path / "winner_engine.db")
+    monkeypatch.setenv("USE_SQLITE", "true")
+    monkeypatch.setattr(setup_sqlite, "DB_PATH", db_path)
+    monkeypatch.setattr(db_sqlite, "DB_PATH", db_path)
+    monkeypatch.setattr(query_helper, "USE_SQLITE", True)
+    setup_sqlite.create_sqlite_schema()
+    
+    week_start = date(2026, 1, 12)
+    with db.get_db_cursor() as cur:
+        cur.execute("INSERT INTO entities (entity_id, entity_type, canonical_name) VALUES ('e1', 'concept', 'yoga mat')")
+        cur.execute("""
+            INSERT INTO entity_asin_map (entity_id, asin, first_matched_dt, last_matched_dt)
+            VALUES ('e1', 'B000000001', ?, ?)
+        """, (week_start - timedelta(weeks=1), week_start))
+        for dt, bsr in ((week_start, 1200), (week_start - timedelta(weeks=1), 1500)):
+            cur.execute("""
+                INSERT INTO amazon_listings_daily (dt, asin, title, brand, category, bsr, review_count, price_usd)
+                VALUES (?, 'B000000001', 'Cork Yoga Mat', 'Acme', 'Yoga Mats', ?, 40, 29.99)
+            """, (dt, bsr))
+    
+    def update_listing(column, value, dt):
+        with db.get_db_cursor() as cur:
+            cur.execute(f"UPDATE amazon_listings_daily SET {column} = ? WHERE dt = ?", (value, dt))
+    
+    stored = load_input_watermarks(week_start)
+    assert stored["e1"]["amazon_listings"][:2] == [week_start.isoformat(), 2]
+    assert changed_entity_ids(load_input_watermarks(week_start), stored) == []
+    
+    update_listing("title", "Cork Yoga Mat, Extra Thick", week_start)
+    assert changed_entity_ids(load_input_watermarks(week_start), stored) == ["e1"]
+    
+    # Offsetting numeric edits on two rows do not cancel out
+    update_listing("title", "Cork Yoga Mat", week_start)
+    assert changed_entity_ids(load_input_watermarks(week_start), stored) == []
+    update_listing("bsr", 1300, week_start)
+    update_listing("bsr", 1400, week_start - timedelta(weeks=1))
+    assert changed_entity_ids(load_input_watermarks(week_start), stored) == ["e1"]
+
+
+def test_rolling_sum_evicts_old_values():
+    """Test that backfill rolling sums keep only values inside the horizon."""
+    week_start = date(2026, 1, 12)
+    rolling = RollingSum(7)
+    for days_before in range(14, 0, -1):
+        rolling.add(week_start - timedelta(days=days_before), 10)
+    
+    rolling.advance(week_start)
+    assert rolling.total == 70
+    
+    rolling.advance(week_start + timedelta(days=3))
+    assert rolling.total == 40
+    
+    assert backfill_week_starts(week_start, week_start + timedelta(days=20)) == [
+        week_start, week_start + timedelta(weeks=1), week_start + timedelta(weeks=2)
+    ]
+
+
+def test_feature_writer_batches_and_dedupes(monkeypatch):
+    """Test that the bulk writer flushes full batches and keeps the last row per key."""
+    week_start = date(2026, 1, 12)
+    writer = feature_writer(batch_size=2, flush_interval=3600)
+    batches = []
+    monkeypatch.setattr(writer, "_write", batches.append)
+    
+    with writer:
+        writer.add(feature_row(week_start, "a", {"x": 1}))
+        writer.add(feature_row(week_start, "a", {"x": 2}))
+        writer.add(feature_row(week_start, "b", {"x": 3}))
+        writer.add(feature_row(week_start, "c", {"x": 4}))
+    
+    assert [[row[1] for row in batch] for batch in batches] == [["a", "b"], ["c"]]
+    assert batches[0][0][2] == '{"x": 2}'
+    assert writer.rows_written == 3
+
+
+def test_week_feature_matrix_round_trip(tmp_path):
+    """Test that the feature matrix masks missing values and survives a save/load."""
+    week_start = date(2026, 1, 12)
+    matrix = WeekFeatureMatrix.from_feature_dicts(week_start, [
+        ("a", {"demand_tiktok_views_7d": 1200, "demand_amazon_bsr_median_top10": None, "econ_price_median": 19.5}),
+        ("b", {"demand_tiktok_views_7d": 0, "demand_amazon_bsr_median_top10": 3400}),
+    ])
+    
+    assert matrix.values.shape == (2, len(matrix.feature_names))
+    assert matrix.column("demand_tiktok_views_7d").tolist() == [1200.0, 0.0]
+    assert matrix.missing[0, matrix.feature_names.index("demand_amazon_bsr_median_top10")]
+    
+    path = tmp_path / "week.npz"
+    matrix.save(path)
+    loaded = WeekFeatureMatrix.load(path)
+    
+    assert loaded.week_start == week_start
+    assert loaded.entity_ids.tolist() == ["a", "b"]
+    assert loaded.row_index("b") == 1
+    assert loaded.features(0) == {"demand_tiktok_views_7d": 1200, "econ_price_median": 19.5}
+    assert loaded.features(1)["demand_amazon_bsr_median_top10"] == 3400
+
+
+def test_stale_feature_matrix_cache_is_reloaded(monkeypatch, tmp_path):
+    """Test that a cached matrix is only reused while the stored features keep the stamp it was saved with."""
+    import src.features.feature_matrix as feature_matrix
+    
+    week_start = date(2026, 1, 12)
+    stored = {"stamp": "1:aaa", "features": {"econ_price_median": 19.5}}
+    loads = []
+    
+    def from_db(week, feature_version=None, entity_ids=None):
+        loads.append(week)
+        return WeekFeatureMatrix.from_feature_dicts(week, [("a", stored["features"])])
+    
+    monkeypatch.setattr(feature_matrix, "stored_features_stamp", lambda week, feature_version=None: stored["stamp"])
+    monkeypatch.setattr(WeekFeatureMatrix, "from_db", staticmethod(from_db))
+    
+    first = feature_matrix.load_week_feature_matrix(week_start, cache_dir=tmp_path)
+    cached = feature_matrix.load_week_feature_matrix(week_start, cache_dir=tmp_path)
+    assert len(loads) == 1
+    assert cached.stamp == first.stamp == "1:aaa"
+    
+    # Features rebuilt without refreshing the cache
+    stored.update(stamp="1:bbb", features={"econ_price_median": 24.0})
+    rebuilt = feature_matrix.load_week_feature_matrix(week_start, cache_dir=tmp_path)
+    assert len(loads) == 2
+    assert rebuilt.features(0) == {"econ_price_median": 24.0}
+    assert feature_matrix.load_week_feature_matrix(week_start, cache_dir=tmp_path).stamp == "1:bbb"
+    assert len(loads) == 2
+
+
+def test_asin_map_join_matches_title_match_per_date(monkeypatch, tmp_path):
+    """Test that a retitled listing only joins an entity on the dates its title matched, like ILIKE per row."""
+    import setup_sqlite
+    import src.utils.db as db
+    import src.utils.db_sqlite as db_sqlite
+    import src.utils.query_helper as query_helper
+    from src.features.listing_context import ENTITY_LISTINGS_JOIN
+    from src.ingest.amazon_job import carry_forward_listings, map_stored_listings, parse_and_store_listing
+    from src.utils.entity_resolution import map_asins_for_alias
+    
+    if not db.USE_SQLITE:
+        pytest.skip("needs the SQLite backend")
+    db_path = str(tmp_path / "winner_engine.db")
+    monkeypatch.setenv("USE_SQLITE", "true")
+    monkeypatch.setattr(setup_sqlite, "DB_PATH", db_path)
+    monkeypatch.setattr(db_sqlite, "DB_PATH", db_path)
+    monkeypatch.setattr(query_helper, "USE_SQLITE", True)
+    setup_sqlite.create_sqlite_schema()
+    
+    def add_alias(entity_id, alias_text):
+        with db.get_db_cursor() as cur:
+            cur.execute("INSERT INTO entities (entity_id, entity_type, canonical_name) VALUES (?, 'concept', ?)",
+                        (entity_id, alias_text))
+            cur.execute("INSERT INTO entity_aliases (alias_id, entity_id, source, alias_text) VALUES (?, ?, 'amazon', ?)",
+                        (entity_id, entity_id, alias_text))
+    
+    dates = [date(2026, 1, 5) + timedelta(weeks=i) for i in range(4)]
+    titles = {
+        # Retitled into the entity in week 3, and away from it in week 4
+        "B000000001": ["Travel Blanket", "Travel Blanket", "Travel Yoga Mat", "Travel Throw"],
+        "B000000002": ["Cork Yoga Mat"] * 4,
+    }
+    # One alias exists before ingestion (mapped per ingested chunk), one is added after
+    add_alias("e1", "yoga mat")
+    for dt in dates[:3]:
+        for asin, asin_titles in titles.items():
+            parse_and_store_listing(dt, asin, {"title": asin_titles[dates.index(dt)], "bsr": 100})
+        map_stored_listings(dt, list(titles))
+    # Week 4: the first listing is re-parsed, the second is unchanged and carried forward
+    parse_and_store_listing(dates[3], "B000000001", {"title": titles["B000000001"][3], "bsr": 100})
+    map_stored_listings(dates[3], ["B000000001"])
+    assert carry_forward_listings(dates[3], ["B000000002"]) == {"B000000002"}
+    add_alias("e2", "travel")
+    map_asins_for_alias("travel")
+    
+    joined = db.execute_query(f"SELECT em.entity_id, a.asin, a.dt {ENTITY_LISTINGS_JOIN}")
+    title_matches = db.execute_query("""
+        SELECT ea.entity_id, a.asin, a.dt
+        FROM entity_aliases ea
+        JOIN amazon_listings_daily a
+            ON a.title LIKE ('%' || ea.alias_text || '%') OR a.brand = ea.alias_text
+        WHERE ea.source = 'amazon'
+    """)
+    
+    def as_set(rows):
+        return {(row["entity_id"], row["asin"], str(row["dt"])) for row in rows}
+    
+    assert as_set(joined) == as_set(title_matches)
+    assert ("e1", "B000000001", str(dates[1])) not in as_set(joined)
+    assert ("e1", "B000000002", str(dates[3])) in as_set(joined)
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
-
@@ -0,0 +1,307 @@
+"""
+Tests for ingestion jobs.
+"""
+import asyncio
+import json
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / "fixtures" / "amazon"
+
+PRODUCT_PAGE = """<html><body>
+<a id="brand">Acme</a>
+<span id="productTitle">Acme Widget {asin}</span>
+<span class="a-price-whole">19.99</span>
+<span id="acrCustomerReviewText">1,234 ratings</span>
+</body></html>"""
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Local server serving PRODUCT_PAGE per ASIN, failing each path's first request with 503.
+    
+    Pages carry an ETag; a matching If-None-Match is answered with 304.
+    """
+    seen = []
+    lock = threading.Lock()
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            with lock:
+                first = self.path not in seen
+                seen.append(self.path)
+            body = b"busy" if first else PRODUCT_PAGE.format(asin=self.path.rsplit("/", 1)[-1]).encode()
+            etag = f'"{hash(body) & 0xffffffff:x}"'
+            if not first and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(503 if first else 200)
+            if not first:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.requests = seen
+    server.url_template = f"http://127.0.0.1:{server.server_address[1]}/dp/{{asin}}"
+    yield server
+    server.shutdown()
+
+
+def test_fetch_listing_pages_retries_and_parses(stub_server, monkeypatch):
+    """Test that concurrent fetches retry a 503 and every page is parsed by the process pool."""
+    pytest.importorskip("aiohttp")
+    from src.ingest import amazon_job
+    
+    monkeypatch.setattr(amazon_job, "RETRY_DELAY", 0.01)
+    asins = [f"B{i:09d}" for i in range(12)]
+    
+    async def fetch_all():
+        return [item async for item in amazon_job.fetch_listing_pages(
+            asins, 4, 0, url_template=stub_server.url_template, parse_workers=2)]
+    
+    results = dict(asyncio.run(fetch_all()))
+    
+    assert sorted(results) == asins
+    assert results[asins[3]]["title"] == f"Acme Widget {asins[3]}"
+    assert results[asins[3]]["price"] == 19.99
+    assert results[asins[3]]["review_count"] == 1234
+
+
+def test_fetch_listing_pages_applies_backpressure(stub_server, monkeypatch):
+    """Test that a caller that stops reading stops the fetch stage after the queues fill."""
+    pytest.importorskip("aiohttp")
+    from src.ingest import amazon_job
+    
+    monkeypatch.setattr(amazon_job, "RETRY_DELAY", 0.01)
+    asins = [f"B{i:09d}" for i in range(100)]
+    
+    async def read_one():
+        pages = amazon_job.fetch_listing_pages(asins, 2, 0, url_template=stub_server.url_template,
+                                               parse_workers=0, parse_queue_size=2)
+        first = await pages.__anext__()
+        await asyncio.sleep(0.5)
+        requested = len(set(stub_server.requests))
+        await pages.aclose()
+        return first, requested
+    
+    first, requested = asyncio.run(read_one())
+    
+    assert first[1] is not None
+    # Two bounded queues, one parser and about 2x concurrency scheduled fetches
+    assert requested < 20
+
+
+def test_token_bucket_paces_after_burst(monkeypatch):
+    """Test that the token bucket allows its burst at once, then `rate` per second."""
+    from types import SimpleNamespace
+    from src.ingest import fetch_engine
+    
+    # Fake clock: sleeping advances it by exactly the requested delay (rate 16 keeps
+    # the arithmetic exact, so the bucket never sees a token fraction short of 1)
+    clock = SimpleNamespace(now=0.0, monotonic=lambda: clock.now)
+    sleeps = []
+    real_sleep = asyncio.sleep
+    
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        clock.now += delay
+        await real_sleep(0)
+    
+    monkeypatch.setattr(fetch_engine, "time", clock)
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    
+    async def take(n):
+        bucket = fetch_engine.TokenBucket(rate=16, capacity=2)
+        for _ in range(n):
+            await bucket.acquire()
+        return bucket
+    
+    asyncio.run(take(2))
+    assert sleeps == []
+    
+    start = clock.now
+    bucket = asyncio.run(take(8))
+    assert sleeps == [1 / 16] * 6
+    assert clock.now - start == 6 / 16
+    assert bucket.tokens == 0
+
+
+def test_fetcher_paces_requests_when_slow_requests_complete_together():
+    """Test that requests freed by slow responses finishing together still go out at `rate` per second."""
+    pytest.importorskip("aiohttp")
+    from src.ingest.fetch_engine import AsyncFetcher
+    
+    arrivals = []
+    lock = threading.Lock()
+    
+    class SlowHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            with lock:
+                arrivals.append(time.monotonic())
+                first_wave = len(arrivals) <= 4
+            if first_wave:
+                # The first wave completes together, 2s after the first request
+                time.sleep(max(0.0, arrivals[0] + 2.0 - time.monotonic()))
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    
+    async def fetch_all():
+        async with AsyncFetcher(concurrency=4, rate_limit_per_second=4, burst=1) as fetcher:
+            return [result async for result in fetcher.fetch_all((i, url) for i in range(8))]
+    
+    try:
+        results = asyncio.run(fetch_all())
+    finally:
+        server.shutdown()
+    
+    assert all(result.ok for result in results)
+    gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+    assert len(arrivals) == 8
+    assert min(gaps) >= 0.25 * 0.8
+
+
+@pytest.mark.parametrize("backend", ["bs4", "lxml"])
+@pytest.mark.parametrize("page", sorted(p.stem for p in FIXTURES.glob("*.html")))
+def test_listing_parsers_match_golden_output(page, backend):
+    """Test that both parser backends reproduce the golden listing of each fixture page."""
+    pytest.importorskip(backend)
+    from src.ingest.amazon_parser import get_listing_parser
+    
+    expected = json.loads((FIXTURES / f"{page}.json").read_text())
+    html = (FIXTURES / f"{page}.html").read_bytes()
+    assert get_listing_parser(backend)(expected["asin"], html) == expected
+
+
+def test_archived_pages_reparse_without_network(stub_server, monkeypatch, tmp_path):
+    """Test that fetched pages are archived once per body and re-parse to the same listings offline."""
+    pytest.importorskip("aiohttp")
+    from datetime import date
+    from src.ingest import amazon_job, reparse
+    from src.ingest.page_store import PageStore
+    
+    monkeypatch.setattr(amazon_job, "RETRY_DELAY", 0.01)
+    dt = date(2026, 3, 2)
+    store = PageStore(tmp_path)
+    asins = [f"B{i:09d}" for i in range(5)]
+    
+    async def fetch_all():
+        return [item async for item in amazon_job.fetch_listing_pages(
+            asins, 4, 0, url_template=stub_server.url_template, parse_workers=0, dt=dt, page_store=store)]
+    
+    fetched = dict(asyncio.run(fetch_all()))
+    # A refetch of an unchanged page adds a manifest record, not a second body
+    first = next(page for page in store.pages("amazon", dt) if page.key == asins[0])
+    store.put("amazon", asins[0], dt, store.get(first.content_hash))
+    
+    assert len(store.pages("amazon", dt, latest_only=False)) == 6
+    assert len(store.pages("amazon", dt)) == 5
+    assert len(list((tmp_path / "objects").rglob("*.gz"))) == 5
+    
+    stored = {}
+    monkeypatch.setattr(reparse, "store_reparsed",
+                        lambda source, day, key, parsed: stored.__setitem__((source, day, key), parsed))
+    monkeypatch.setattr(amazon_job, "map_stored_listings", lambda dt, asins: None)
+    requests_before = len(stub_server.requests)
+    
+    counts = reparse.reparse(dt, dt, ["amazon"], store_root=str(tmp_path))
+    
+    assert counts == {"amazon": 5}
+    assert len(stub_server.requests) == requests_before
+    assert {key: parsed for (_, _, key), parsed in stored.items()} == fetched
+
+
+def test_parallel_reparse_stores_each_listing_in_date_order(monkeypatch, tmp_path):
+    """Test that a multi-worker re-parse stores every ASIN's dates in ascending order.
+    
+    parse_and_store_listing carries first_seen_date over from the ASIN's latest
+    stored row, so storing a later date first would push it past earlier rows' dt.
+    """
+    from datetime import date, timedelta
+    from src.ingest import amazon_job, reparse
+    from src.ingest.page_store import PageStore
+    
+    store = PageStore(tmp_path)
+    dates = [date(2026, 3, 2) + timedelta(days=i) for i in range(3)]
+    asins = ["B000000001", "B000000002"]
+    padding = "<div>" + "<span>filler</span>" * 100000 + "</div>"
+    for i, dt in enumerate(dates):
+        for asin in asins:
+            page = PRODUCT_PAGE.format(asin=asin)
+            if i == 0:
+                # The earliest pages parse slowest, so later batches finish first
+                page = page.replace("</body>", padding + "</body>")
+            store.put("amazon", asin, dt, page.encode())
+    
+    stored = []
+    monkeypatch.setattr(reparse, "REPARSE_PAGES_PER_TASK", 1)
+    monkeypatch.setattr(reparse, "store_reparsed", lambda source, day, key, parsed: stored.append((key, day)))
+    monkeypatch.setattr(amazon_job, "map_stored_listings", lambda dt, asins: None)
+    
+    counts = reparse.reparse(dates[0], dates[-1], ["amazon"], workers=2, parser="lxml", store_root=str(tmp_path))
+    
+    assert counts == {"amazon": 6}
+    for asin in asins:
+        assert [day for key, day in stored if key == asin] == dates
+
+
+def test_conditional_fetches_report_unchanged_listings(stub_server, monkeypatch):
+    """Test that validators turn refetches into 304s, and a matching body or parsed listing into UNCHANGED."""
+    pytest.importorskip("aiohttp")
+    from dataclasses import replace
+    from src.ingest import amazon_job
+    
+    monkeypatch.setattr(amazon_job, "RETRY_DELAY", 0.01)
+    asins = [f"B{i:09d}" for i in range(6)]
+    
+    async def fetch_all(validators):
+        return dict([item async for item in amazon_job.fetch_listing_pages(
+            asins, 4, 0, url_template=stub_server.url_template, parse_workers=0, validators=validators)])
+    
+    validators = {}
+    first = asyncio.run(fetch_all(validators))
+    assert all(listing and listing is not amazon_job.UNCHANGED for listing in first.values())
+    assert sorted(validators) == asins and all(v.etag for v in validators.values())
+    
+    # ETag match: 304, nothing downloaded or parsed
+    assert all(listing is amazon_job.UNCHANGED for listing in asyncio.run(fetch_all(validators)).values())
+    
+    # No ETag: the body hash matches; a stale body hash falls back to the parsed fields
+    validators = {asin: replace(v, etag=None) for asin, v in validators.items()}
+    validators[asins[0]] = replace(validators[asins[0]], content_hash="stale")
+    validators[asins[1]] = replace(validators[asins[1]], content_hash="stale", record_hash="stale")
+    results = asyncio.run(fetch_all(validators))
+    
+    assert [asin for asin in asins if results[asin] is not amazon_job.UNCHANGED] == [asins[1]]
+    assert results[asins[1]] == first[asins[1]]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -2,8 +2,15 @@
 Tests for label computation.
 """
 import pytest
-from datetime import date
-from src.transform.build_labels import compute_amazon_winner_labels
+import numpy as np
+from datetime import date, timedelta
+from src.transform.build_labels import (
+    compute_amazon_winner_labels,
+    amazon_labels_from_rows,
+    label_backfill_weeks,
+    TikTokDailySeries,
+    tiktok_trending_entities,
+)
 
 
 def test_label_horizon():
@@ -23,6 +30,76 @@ def test_labels_no_feature_leakage():
     pass
 
 
+def test_amazon_labels_from_rows():
+    """Test winner labels for every horizon, durable and spike from one weekly BSR series."""
+    week_start = date(2026, 1, 12)
+    start_listings = [
+        {"bsr": 1000, "review_count": 50, "price_usd": 20.0},
+        {"bsr": 3000, "review_count": 10, "price_usd": 22.0},
+    ]
+    
+    def horizon(bsrs):
+        return [
+            {"dt": week_start + timedelta(weeks=week), "bsr": bsr, "review_count": 40, "price_usd": 21.0}
+            for week, bsr in enumerate(bsrs, 1)
+        ]
+    
+    # Steady improvement that only passes 30% after week 4, then reverts by week 12
+    end_listings = horizon([1800, 1600, 1400, 1200, 1100, 1000, 900, 800, 3000, 3000, 3000, 3000])
+    labels = amazon_labels_from_rows(week_start, start_listings, end_listings)
+    assert labels["label_winner_8w"] and labels["label_durable"]
+    assert not labels["label_winner_4w"] and not labels["label_winner_12w"]
+    assert not labels["label_trend_spike"]
+    
+    # Horizons beyond the scanned window are not labeled
+    labels = amazon_labels_from_rows(week_start, start_listings, end_listings[:4], horizon_weeks=4)
+    assert labels["label_winner_4w"] is False
+    assert labels["label_winner_8w"] is None and labels["label_durable"] is None
+    
+    # Huge jump that reverts in the late weeks
+    labels = amazon_labels_from_rows(week_start, start_listings, horizon([100, 100, 100, 100, 200, 150, 400, 500]))
+    assert labels["label_trend_spike"]
+    assert not labels["label_durable"]
+    
+    # Price collapse blocks the winner label
+    collapsed = [dict(row, price_usd=10.0) for row in horizon([800] * 8)]
+    assert not amazon_labels_from_rows(week_start, start_listings, collapsed)["label_winner_8w"]
+
+
+def test_label_backfill_weeks_follow_available_future_data():
+    """Test that backfill weeks are labeled only for horizons with future data."""
+    today = date(2026, 4, 13)
+    
+    weeks = label_backfill_weeks(date(2026, 1, 5), date(2026, 3, 30), today=today)
+    
+    assert weeks[date(2026, 1, 5)] == 12
+    assert weeks[date(2026, 1, 26)] == 11
+    assert weeks[date(2026, 3, 16)] == 4
+    assert date(2026, 3, 23) not in weeks
+    assert len(weeks) == 11
+
+
+def test_tiktok_trends_from_daily_series():
+    """Test vectorized TikTok slopes: top-decile views slope with growing creators trends."""
+    week_start = date(2026, 1, 19)
+    days = np.arange(28)
+    present = np.ones((3, 28), dtype=bool)
+    present[2] = days == 3  # a single day of data is not ranked
+    series = TikTokDailySeries(
+        first_day=week_start - timedelta(weeks=2),
+        queries=["fast", "flat_creators", "sparse"],
+        views=np.vstack([1000 * days, 10 * days, 10 ** 6 * days]),
+        creators=np.vstack([days, np.full(28, 5), days]),
+        present=present,
+    )
+    aliases = {"e1": ["unknown", "fast"], "e2": ["flat_creators"], "e3": ["sparse"]}
+    
+    trending = tiktok_trending_entities([week_start, week_start + timedelta(weeks=1)], series, aliases)
+    
+    assert trending[week_start] == ["e1"]
+    assert trending[week_start + timedelta(weeks=1)] == ["e1"]
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
 
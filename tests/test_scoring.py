@@ -0,0 +1,219 @@
+"""
+Tests for opportunity scoring.
+"""
+import os
+import random
+import pytest
+import numpy as np
+from datetime import date
+from src.features.feature_matrix import FEATURE_NAMES, WeekFeatureMatrix
+from src.scoring.score_week import (
+    compute_baseline_score,
+    compute_baseline_scores,
+    score_models,
+    top_k_indices,
+    top_feature_contributions,
+)
+
+
+def _random_features(rng: random.Random) -> dict:
+    """Feature dict with realistic ranges, some features left out."""
+    features = {
+        "demand_tiktok_views_7d": rng.choice([0, rng.randint(0, 3000000)]),
+        "demand_amazon_bsr_improvement_4w": rng.uniform(-1, 1),
+        "demand_amazon_review_velocity_4w": rng.randint(-50, 500),
+        "demand_cross_channel_alignment": rng.choice([0.0, 1.0]),
+        "comp_amazon_concentration_hhi": rng.uniform(0, 1.2),
+        "comp_amazon_new_entrant_rate_4w": rng.uniform(0, 1),
+        "comp_amazon_top10_review_median": rng.randint(0, 5000),
+        "econ_price_median": rng.choice([0.0, rng.uniform(1, 300)]),
+        "econ_margin_proxy": rng.uniform(0, 100),
+        "risk_return_proxy": rng.uniform(0, 1),
+        "risk_regulatory_proxy": rng.uniform(0, 1),
+        "risk_hazmat_proxy": rng.uniform(0, 1),
+    }
+    for name in rng.sample(sorted(features), 3):
+        del features[name]
+    return features
+
+
+def test_vectorized_baseline_matches_scalar():
+    """Test that compute_baseline_scores matches compute_baseline_score row by row."""
+    rng = random.Random(7)
+    items = [(f"e{i}", _random_features(rng)) for i in range(2000)]
+    matrix = WeekFeatureMatrix.from_feature_dicts(date(2026, 1, 12), items)
+    
+    vectorized = compute_baseline_scores(matrix)
+    for i, (_, features) in enumerate(items):
+        scalar = compute_baseline_score(features)
+        for name, value in scalar.items():
+            assert vectorized[name][i] == pytest.approx(value, abs=1e-9), (i, name)
+
+
+def test_vectorized_baseline_scores_dense_matrix():
+    """Test that baseline scoring returns one finite score per entity for a masked dense matrix.
+    
+    Timing at 1M entities: scripts/benchmark_baseline_scoring.py.
+    """
+    rng = np.random.default_rng(0)
+    num_entities = 1000
+    shape = (num_entities, len(FEATURE_NAMES))
+    matrix = WeekFeatureMatrix(
+        week_start=date(2026, 1, 12),
+        feature_version="v1.0",
+        entity_ids=np.arange(num_entities).astype(str),
+        feature_names=FEATURE_NAMES,
+        values=rng.uniform(0, 2, size=shape),
+        missing=rng.random(size=shape) < 0.05,
+    )
+    
+    scores = compute_baseline_scores(matrix)
+    
+    for name, values in scores.items():
+        assert values.shape == (num_entities,), name
+        assert np.isfinite(values).all(), name
+    assert ((scores["score_rank"] >= 0) & (scores["score_rank"] <= 100)).all()
+
+
+def test_top_k_indices_matches_stable_sort():
+    """Test that top-K selection returns the head of a stable descending sort, ties included."""
+    rng = np.random.default_rng(3)
+    values = rng.integers(0, 20, size=500).astype(float)
+    full_order = sorted(range(len(values)), key=lambda i: values[i], reverse=True)
+    
+    for k in (0, 1, 7, 50, 499, 500, 1000):
+        assert top_k_indices(values, k).tolist() == full_order[:k]
+    assert top_k_indices(values).tolist() == full_order
+
+
+def _small_matrix(num_entities: int = 300) -> WeekFeatureMatrix:
+    """Random WeekFeatureMatrix with a few missing values."""
+    rng = random.Random(11)
+    items = [(f"e{i}", _random_features(rng)) for i in range(num_entities)]
+    return WeekFeatureMatrix.from_feature_dicts(date(2026, 1, 12), items)
+
+
+def test_model_cache_reloads_only_when_file_changes(tmp_path):
+    """Test that models are cached per version and reloaded when their file's mtime changes."""
+    lgb = pytest.importorskip("lightgbm")
+    from src.scoring.model_cache import get_model, clear_model_cache
+    
+    matrix = _small_matrix()
+    names = ["econ_price_median", "demand_tiktok_views_7d"]
+    labels = (matrix.column("demand_tiktok_views_7d") > 1000000).astype(int)
+    inputs = np.column_stack([matrix.column(name) for name in names])
+    booster = lgb.train({"objective": "binary", "verbose": -1},
+                        lgb.Dataset(inputs, labels, feature_name=names), num_boost_round=5)
+    path = tmp_path / "clf_v1.txt"
+    booster.save_model(str(path))
+    
+    clear_model_cache()
+    first = get_model("clf_v1", tmp_path)
+    assert get_model("clf_v1", tmp_path) is first
+    
+    booster.save_model(str(path))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert get_model("clf_v1", tmp_path) is not first
+
+
+def test_predict_matrix_reorders_and_validates_features(tmp_path):
+    """Test that batched predict follows the model's feature order and rejects unknown features."""
+    lgb = pytest.importorskip("lightgbm")
+    from src.scoring.model_cache import predict_matrix
+    
+    matrix = _small_matrix()
+    names = ["risk_hazmat_proxy", "econ_price_median", "demand_tiktok_views_7d"]
+    labels = (matrix.column("demand_tiktok_views_7d") > 1000000).astype(int)
+    inputs = np.column_stack([matrix.column(name) for name in names])
+    booster = lgb.train({"objective": "binary", "verbose": -1},
+                        lgb.Dataset(inputs, labels, feature_name=names), num_boost_round=5)
+    
+    assert np.allclose(predict_matrix(booster, matrix), booster.predict(inputs))
+    
+    unknown = lgb.train({"objective": "binary", "verbose": -1},
+                        lgb.Dataset(inputs, labels, feature_name=names[:2] + ["not_a_feature"]), num_boost_round=2)
+    with pytest.raises(ValueError):
+        predict_matrix(unknown, matrix)
+
+
+def test_top_feature_contributions_orders_by_magnitude():
+    """Test that each row keeps its largest absolute contributions, largest first."""
+    contributions = np.array([
+        [0.1, -0.5, 0.3, 0.0],
+        [-0.2, 0.05, -0.01, 0.4],
+    ])
+    columns, values = top_feature_contributions(contributions, n=2)
+    
+    assert columns.tolist() == [[1, 2], [3, 0]]
+    assert values.tolist() == [[-0.5, 0.3], [0.4, -0.2]]
+    
+    columns, _ = top_feature_contributions(contributions, n=10)
+    assert columns.tolist() == [[1, 2, 0, 3], [3, 0, 1, 2]]
+
+
+def test_scoring_service_scores_overrides():
+    """Test that what-if requests score the overridden features and return base scores."""
+    from src.serving.scoring_service import ScoringService, ServiceSnapshot
+    
+    features = {"econ_price_median": 40.0, "econ_margin_proxy": 12.0, "demand_tiktok_views_7d": 250000}
+    matrix = WeekFeatureMatrix.from_feature_dicts(date(2026, 1, 12), [("e1", features)])
+    service = ScoringService()
+    service.snapshot = ServiceSnapshot(matrix=matrix, model=None, matrix_stamp=(matrix.week_start, None))
+    
+    result, = service.score_batch([{"entity_id": "e1", "scale": {"econ_price_median": 0.8}}])
+    assert result["base_scores"] == compute_baseline_score(features)
+    assert result["scores"] == compute_baseline_score({**features, "econ_price_median": 32.0})
+    
+    result, = service.score_batch([{"features": features, "overrides": {"econ_margin_proxy": None}}])
+    expected = {name: value for name, value in features.items() if name != "econ_margin_proxy"}
+    assert result["scores"] == compute_baseline_score(expected)
+    
+    # Malformed requests are client errors (ValueError), not TypeError/AttributeError
+    for bad in (
+        [{"entity_id": "e1", "overrides": {"not_a_feature": 1}}],
+        ["e1"],
+        [{"features": ["econ_price_median"]}],
+        [{"entity_id": "e1", "scale": {"econ_price_median": None}}],
+        [{"entity_id": "e1", "overrides": {"econ_price_median": "cheap"}}],
+        {"entity_id": "e1"},
+    ):
+        with pytest.raises(ValueError):
+            service.score_batch(bad)
+
+
+def test_score_models_writes_every_version_in_one_pass(monkeypatch):
+    """Test that several model versions share one matrix and one writer, and that failures raise unless skipped."""
+    import src.scoring.score_week as score_week
+    
+    matrix = _small_matrix(20)
+    score_writer = score_week.score_writer
+    writers, rows = [], []
+    
+    def recording_writer(batch_size=None, flush_interval=None):
+        writer = score_writer(batch_size, flush_interval)
+        monkeypatch.setattr(writer, "_write", rows.extend)
+        writers.append(writer)
+        return writer
+    
+    monkeypatch.setattr(score_week, "score_writer", recording_writer)
+    
+    results = score_models(matrix.week_start, ["baseline", "missing-model"], top_n=3, matrix=matrix,
+                           skip_failed_shadows=True)
+    
+    assert len(writers) == 1
+    assert [row[2] for row in rows] == ["baseline"] * 20
+    assert len(results["baseline"]) == 3
+    assert "missing-model" not in results
+    
+    # A failing primary version, or shadow version without the opt-in, is an error
+    rows.clear()
+    with pytest.raises(FileNotFoundError):
+        score_models(matrix.week_start, ["missing-model", "baseline"], matrix=matrix, skip_failed_shadows=True)
+    with pytest.raises(FileNotFoundError):
+        score_models(matrix.week_start, ["baseline", "missing-model"], matrix=matrix)
+    assert rows == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])